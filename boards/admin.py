@@ -1,10 +1,175 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models.functions import Substr
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 # Register your models here.
 
-from .models import Board,Topic,Post
+from . import deletion, revisions, sharding, signals
+from .models import Board,Topic,Post,DeletionJob
 
-admin.site.register(Board)
 
-admin.site.register(Topic)
-admin.site.register(Post)
\ No newline at end of file
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that never runs an exact COUNT(*) over a huge table.
+
+    Unfiltered lists on PostgreSQL use the planner's row estimate; everything
+    else counts at most COUNT_LIMIT rows and reports the limit when it is hit.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.COUNT_LIMIT:
+                return row[0]
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # skip the second, unfiltered COUNT(*)
+    ordering = ('-pk',)  # primary key order walks the index, no sort step
+
+
+class BackgroundDeletionMixin:
+    """
+    Deleting marks the objects deleted and leaves the rows below them to the
+    deletion worker (boards/deletion.py), instead of collecting and deleting
+    every related row inside the request.
+    """
+    def get_deleted_objects(self, objs, request):
+        # the confirmation page lists the objects themselves, not every related row
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        deletion.schedule(obj, requested_by=request.user)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            deletion.schedule(obj, requested_by=request.user)
+
+
+class MoveTopicsForm(forms.Form):
+    board = forms.ModelChoiceField(queryset=Board.objects.order_by('name'))
+
+
+@admin.register(Board)
+class BoardAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
+    list_display = ('name', 'description')
+    search_fields = ('name',)  # needed by the Topic autocomplete widget
+    ordering = ('name',)
+
+
+@admin.register(Topic)
+class TopicAdmin(BackgroundDeletionMixin, ScalableModelAdmin):
+    list_display = ('id', 'subject', 'board', 'starter', 'last_update', 'hot_score')
+    list_select_related = ('board', 'starter')
+    list_filter = ('board',)
+    autocomplete_fields = ('board',)
+    raw_id_fields = ('starter',)
+    exclude = ('views',)  # a <select> of every user who ever opened the topic
+    date_hierarchy = 'last_update'
+    actions = ('move_to_board', 'reset_trending_score')
+
+    @admin.action(description='Move selected topics to another board')
+    def move_to_board(self, request, queryset):
+        form = MoveTopicsForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid() and sharding.db_for_board(form.cleaned_data['board'].pk) != queryset.db:
+            self.message_user(request, 'The target board lives on another shard, use the move_board command.', messages.ERROR)
+            return None
+        if form.is_valid():
+            topics = list(queryset.values_list('pk', 'board_id'))
+            moved = queryset.update(board=form.cleaned_data['board'])
+            for topic_id, board_id in topics:
+                signals.expire_topic(topic_id, board_id)
+            signals.expire_board(form.cleaned_data['board'].pk)
+            self.message_user(request, f'Moved {moved} topics to {form.cleaned_data["board"]}.', messages.SUCCESS)
+            return None
+        return render(request, 'admin/boards/topic/move_to_board.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Move topics to another board',
+            'opts': self.model._meta,
+            'form': form,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'action': 'move_to_board',
+        })
+
+    @admin.action(description='Reset trending score')
+    def reset_trending_score(self, request, queryset):
+        updated = queryset.update(hot_score=0)
+        self.message_user(request, f'Reset the trending score of {updated} topics.', messages.SUCCESS)
+
+
+@admin.register(Post)
+class PostAdmin(ScalableModelAdmin):
+    list_display = ('id', 'excerpt', 'topic', 'created_by', 'created_at')
+    list_select_related = ('topic', 'created_by')
+    raw_id_fields = ('topic', 'created_by', 'updated_by')
+    date_hierarchy = 'created_at'
+    actions = ('remove_messages',)
+
+    REMOVED_MESSAGE = '[removed by a moderator]'
+
+    def get_queryset(self, request):
+        # Only the first 30 characters are shown, don't fetch 5,000
+        queryset = super().get_queryset(request)
+        return queryset.defer('message').annotate(message_excerpt=Substr('message', 1, 30))
+
+    @admin.display(description='message')
+    def excerpt(self, obj):
+        return obj.message_excerpt
+
+    @admin.action(description='Remove message of selected posts')
+    def remove_messages(self, request, queryset):
+        # one save per post, so post_saved expires the topic's figures and pages; the removal is
+        # a revision by the moderator, updated_by isn't set (see deletion.user_rows)
+        now = timezone.now()
+        posts = queryset.model._base_manager.using(queryset.db).filter(pk__in=queryset.values('pk')).select_related('topic')
+        removed = 0
+        for post in posts.exclude(message=self.REMOVED_MESSAGE).iterator():
+            old_message = post.message
+            post.message, post.updated_at = self.REMOVED_MESSAGE, now
+            delta = revisions.make_delta(old_message, post.message)
+            with transaction.atomic(using=queryset.db):
+                post.save(update_fields=['message', 'updated_at'])
+                revisions.record_edit(post, old_message, request.user, now, delta)
+            removed += 1
+        self.message_user(request, f'Removed the message of {removed} posts.', messages.SUCCESS)
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(BackgroundDeletionMixin, BaseUserAdmin):
+    pass
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(ScalableModelAdmin):
+    """Progress of the background deletions, read-only"""
+    list_display = ('id', 'kind', 'label', 'requested_by', 'created_at', 'deleted_rows', 'step', 'finished_at')
+    list_filter = ('kind',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class BoardsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "boards"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import sharding, signals, slow_queries, sql_comments  # noqa: F401
+        post_migrate.connect(sharding.seed_id_sequences, sender=self)
+        # in this order: the slow-query log times and logs statements before they get their comment
+        connection_created.connect(slow_queries.install)
+        connection_created.connect(sql_comments.install)
+        if getattr(settings, 'MEMORY_PROFILING', False):
+            from . import memory_profile
+            memory_profile.install_signal()
@@ -0,0 +1,188 @@
+"""
+Cold-topic archive.
+
+Topics whose ``last_update`` is older than a threshold have their posts moved
+out of the Post table into a single zlib-compressed JSON blob on
+ArchivedTopic, which keeps the hot Post indexes small.  The edit history of
+the posts goes into the blob with them.  The Topic row stays,
+so board listings and URLs are unchanged: PostListView reads archived threads
+from the blob (read-only), and replying restores the posts, with their
+original primary keys, in one transaction.  Deleting a user removes their
+posts from the blobs too (``strip_user``).
+"""
+import json
+import logging
+import zlib
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, When
+from django.utils.dateparse import parse_datetime
+
+from . import revisions, signals
+from .models import ArchivedTopic, Post, PostRevision, ReplyNotification, Topic, render_message
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+FIELDS = ('id', 'message', 'created_at', 'updated_at', 'created_by_id', 'updated_by_id')
+# next to FIELDS, each row has its edit history as revisions.dump() rows (absent from older archives)
+REVISIONS = 'revisions'
+
+
+def _encode(rows):
+    for row in rows:
+        for field in ('created_at', 'updated_at'):
+            if row[field] is not None:
+                row[field] = row[field].isoformat()
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def _decode(data):
+    rows = json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+    for row in rows:
+        for field in ('created_at', 'updated_at'):
+            if row[field] is not None:
+                row[field] = parse_datetime(row[field])
+    return rows
+
+
+def archive_topic(topic, cutoff=None):
+    """
+    Move the posts of ``topic`` into the archive; returns the number of posts,
+    0 when it was skipped: updated since ``cutoff``, or with replies whose
+    digests aren't sent yet (archiving would drop their ReplyNotification).
+    """
+    db = topic._state.db
+    with transaction.atomic(using=db):
+        # a reply updates the topic row in its transaction (reply_topic): holding the row
+        # keeps new posts out until the blob is written and the archived rows deleted
+        locked = Topic.all_objects.using(db).select_for_update().filter(pk=topic.pk)
+        if cutoff is not None:
+            locked = locked.filter(last_update__lt=cutoff)
+        if not locked.exists():
+            return 0
+        if ReplyNotification.objects.using(db).filter(post__topic=topic).exists():
+            return 0
+        rows = list(topic.posts.order_by('pk').values(*FIELDS))
+        if not rows:
+            return 0
+        # deleting the posts cascades to their revisions: keep them in the blob
+        history = revisions.dump(PostRevision.objects.using(db).filter(post__topic=topic))
+        for row in rows:
+            if row['id'] in history:
+                row[REVISIONS] = history[row['id']]
+        ArchivedTopic.objects.using(db).create(
+            topic=topic, data=_encode(rows), post_count=len(rows),
+            first_post_id=rows[0]['id'], last_post_id=rows[-1]['id'],
+        )
+        # only what went into the blob
+        Post.objects.using(db).filter(pk__in=[row['id'] for row in rows]).delete()
+    signals.expire_topic(topic.pk, topic.board_id)
+    logger.info("Archived topic %s (%s posts)", topic.pk, len(rows))
+    return len(rows)
+
+
+def cold_topics(cutoff, using='default'):
+    return Topic.objects.using(using).filter(last_update__lt=cutoff, archive__isnull=True).order_by('pk')
+
+
+def load_posts(topic):
+    """
+    Unsaved Post instances for an archived topic, oldest first.  Authors are
+    fetched with a single query; the author of a post whose user is gone is
+    None.
+    """
+    rows = _decode(topic.archive.data)
+    user_ids = {row['created_by_id'] for row in rows} | {row['updated_by_id'] for row in rows}
+    users = User.objects.in_bulk(user_ids - {None})
+    posts = []
+    for row in rows:
+        row.pop(REVISIONS, None)
+        post = Post(topic=topic, **row)
+        post.created_by = users.get(row['created_by_id'])
+        posts.append(post)
+    return posts
+
+
+def sort_replies(replies):
+    """Sort archived replies in place in REPLY_ORDERING, as the Post table serves them"""
+    replies.sort(key=lambda post: (post.updated_at.timestamp() if post.updated_at else 0, post.created_at, post.pk), reverse=True)
+
+
+def find_topic(post_id, board_id, using='default'):
+    """
+    The live topic of ``board_id`` whose archive holds post ``post_id``, or
+    None.  Post ids of different topics interleave, so the id range only
+    narrows the archives down; the blob says whether the post is there.
+    """
+    archives = ArchivedTopic.objects.using(using).select_related('topic').filter(
+        topic__board_id=board_id, topic__deleted_at__isnull=True,
+        first_post_id__lte=post_id, last_post_id__gte=post_id,
+    )
+    for archive in archives:
+        if any(row['id'] == post_id for row in _decode(archive.data)):
+            return archive.topic
+    return None
+
+
+def strip_user(user_id, using='default', batch_size=BATCH_SIZE):
+    """
+    Remove the posts a user wrote, with their history, from the archives on
+    ``using``, as deleting the user does with live rows; returns the number of
+    posts removed.
+    """
+    removed = 0
+    last_pk = 0
+    while True:
+        batch = list(ArchivedTopic.objects.using(using).filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'data')[:batch_size])
+        if not batch:
+            return removed
+        last_pk = batch[-1][0]
+        for pk, data in batch:
+            if any(row['created_by_id'] == user_id for row in _decode(data)):
+                removed += _strip_archive(pk, user_id, using)
+
+
+def _strip_archive(pk, user_id, using):
+    with transaction.atomic(using=using):
+        # locked and read again: a reply may have restored the topic meanwhile
+        archive = ArchivedTopic.objects.using(using).select_for_update().select_related('topic').filter(pk=pk).first()
+        if archive is None:
+            return 0
+        rows = _decode(archive.data)
+        kept = [row for row in rows if row['created_by_id'] != user_id]
+        if kept:
+            archive.data = _encode(kept)
+            archive.post_count = len(kept)
+            archive.first_post_id, archive.last_post_id = kept[0]['id'], kept[-1]['id']
+            archive.save(update_fields=['data', 'post_count', 'first_post_id', 'last_post_id'])
+        else:
+            archive.delete()
+    signals.expire_topic(archive.topic_id, archive.topic.board_id)
+    return len(rows) - len(kept)
+
+
+def restore_topic(topic):
+    """Put an archived topic's posts back into the Post table; False if not archived"""
+    db = topic._state.db
+    with transaction.atomic(using=db):
+        archive = ArchivedTopic.objects.using(db).select_for_update().filter(topic=topic).first()
+        if archive is None:
+            return False
+        rows = _decode(archive.data)
+        history = [revision for row in rows for revision in revisions.load(row['id'], row.pop(REVISIONS, []))]
+        posts = (Post(topic=topic, message_html=render_message(row['message']), **row) for row in rows)
+        Post.objects.using(db).bulk_create(posts, batch_size=BATCH_SIZE)
+        PostRevision.objects.using(db).bulk_create(history, batch_size=BATCH_SIZE)
+        # auto_now_add overwrote created_at on insert, put the originals back
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            Post.objects.using(db).filter(pk__in=[row['id'] for row in batch]).update(
+                created_at=Case(*(When(pk=row['id'], then=row['created_at']) for row in batch))
+            )
+        archive.delete()
+    signals.expire_topic(topic.pk, topic.board_id)
+    logger.info("Restored archived topic %s (%s posts)", topic.pk, len(rows))
+    return True
@@ -0,0 +1,79 @@
+"""
+In-process read model of the board index (home page).
+
+Every worker keeps an immutable snapshot of the board summaries (name,
+description, topic and post counts, last post date) tagged with the version
+it was built from.  Writes bump the version in the shared cache
+(``settings.BOARDS_CACHE``, see boards/signals.py); a request only reads the
+version and rebuilds the snapshot when it has changed or is older than
+MAX_AGE, so BoardlistView normally serves the index from memory.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from . import caching, summaries
+from .models import Board
+
+VERSION_KEY = 'boards:index:version'
+MAX_AGE = 60  # seconds; the figures it is built from may be served stale
+
+
+class BoardSummary(NamedTuple):
+    pk: int
+    name: str
+    description: str
+    topics_count: int
+    posts_count: int
+    last_post_at: Optional[datetime]
+
+
+class Snapshot(NamedTuple):
+    version: Optional[int]
+    built_at: float
+    boards: tuple
+
+
+_snapshot = Snapshot(None, 0, ())
+_lock = threading.Lock()
+
+
+def version():
+    cache = caching.get_cache()
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        # never set or evicted: a new stamp makes every worker rebuild
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        current = cache.get(VERSION_KEY)
+    return current
+
+
+def bump():
+    """The board index changed: every worker rebuilds its snapshot on its next request"""
+    cache = caching.get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def _build():
+    return tuple(
+        BoardSummary(board.pk, board.name, board.description, board.topics_count, board.posts_count, board.last_post_at)
+        for board in summaries.summarize_boards(Board.objects.order_by('pk'))
+    )
+
+
+def boards():
+    """Summaries of every board, from this worker's snapshot"""
+    global _snapshot
+    current = version()
+    snapshot = _snapshot
+    if snapshot.version == current and time.monotonic() - snapshot.built_at < MAX_AGE:
+        return snapshot.boards
+    with _lock:
+        # another thread may have rebuilt it while we waited
+        if _snapshot.version != current or time.monotonic() - _snapshot.built_at >= MAX_AGE:
+            _snapshot = Snapshot(current, time.monotonic(), _build())
+        return _snapshot.boards
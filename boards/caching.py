@@ -0,0 +1,100 @@
+"""
+Cache helper for expensive computations (board figures, topic statistics,
+trending list).
+
+``get_or_compute`` keeps a busy key from turning into a stampede of identical
+``Count``/last-post queries when it expires:
+
+- probabilistic early refresh: every read may recompute the value a little
+  before it expires, with a probability that grows as expiry gets closer and
+  with the time the computation took, so busy keys rarely expire at all;
+- single flight: the worker that decides to recompute takes a short lock with
+  ``cache.add``; the others keep serving the previous value or, when there is
+  none yet, wait briefly for the lock holder's result;
+- stale while revalidate: entries stay in the cache ``stale_ttl`` seconds past
+  their expiry and are served while one worker refreshes them.
+
+After a write, ``expire`` marks entries stale instead of deleting them, so the
+next read refreshes them once rather than every reader recomputing at once.
+
+The cache alias is ``settings.BOARDS_CACHE``; it must be shared between
+workers (memcached, Redis...) for the lock to be single flight site-wide.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+BETA = 1.0  # > 1 favours earlier refreshes
+LOCK_TIMEOUT = 10  # seconds: a crashed worker can't hold a key forever
+WAIT_TIMEOUT = 2  # longest a reader waits for a value that isn't cached yet
+WAIT_INTERVAL = 0.05
+
+
+def get_cache():
+    return caches[getattr(settings, 'BOARDS_CACHE', 'default')]
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _store(cache, key, value, delta, ttl, stale_ttl):
+    # the entry carries what readers need to decide on a refresh
+    cache.set(key, (value, delta, time.time() + ttl, stale_ttl), ttl + stale_ttl)
+
+
+def _refresh(cache, key, compute, ttl, stale_ttl):
+    start = time.monotonic()
+    value = compute()
+    _store(cache, key, value, time.monotonic() - start, ttl, stale_ttl)
+    return value
+
+
+def _wait(cache, key):
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_compute(key, compute, ttl, stale_ttl=None, beta=BETA):
+    """
+    Return the cached value of ``key``, calling ``compute()`` when it must be
+    (re)computed.  ``ttl`` is how long a value is fresh, ``stale_ttl`` (default
+    ``ttl``) how long it may still be served afterwards while being refreshed.
+    """
+    cache = get_cache()
+    stale_ttl = ttl if stale_ttl is None else stale_ttl
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires_at, _ = entry
+        # XFetch: -log(u) is exponentially distributed, so the refresh starts
+        # on average delta * beta seconds before expiry
+        if time.time() - delta * beta * math.log(1 - random.random()) < expires_at:
+            return value
+        if not cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+            return value  # another worker is refreshing it
+    elif not cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+        entry = _wait(cache, key)
+        if entry is not None:
+            return entry[0]
+        # the lock holder is slow or gone: don't keep the request waiting
+        return compute()
+    try:
+        return _refresh(cache, key, compute, ttl, stale_ttl)
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def expire(*keys):
+    """Mark entries stale: served until the next read has refreshed them"""
+    cache = get_cache()
+    for key, entry in cache.get_many(keys).items():
+        value, delta, _, stale_ttl = entry
+        cache.set(key, (value, delta, 0, stale_ttl), stale_ttl)
@@ -0,0 +1,33 @@
+"""
+The request being served, for code far from the view.
+
+RequestContextMiddleware sets it around each request; instrumentation such
+as the slow-query log, the request id log filter and the SQL comments
+(boards/sql_comments.py) read it with ``current()``.  It is a context
+variable, so threads and async tasks each see their own request, and
+management commands and workers see None.
+"""
+from contextvars import ContextVar
+from typing import NamedTuple
+
+
+class RequestInfo(NamedTuple):
+    path: str
+    url_name: str  # '' when the path matches no URL
+    request_id: str  # from the X-Request-ID header when the proxy sent a usable one
+
+
+_current = ContextVar('boards_request', default=None)
+
+
+def current():
+    return _current.get()
+
+
+def activate(info):
+    """Returns the token to ``deactivate()`` with"""
+    return _current.set(info)
+
+
+def deactivate(token):
+    _current.reset(token)
@@ -0,0 +1,192 @@
+"""
+Background deletion of boards, topics and users.
+
+Deleting a big board or a prolific user through ``Model.delete()`` makes the
+collector load every dependent row and remove them all in one transaction.
+Instead, ``schedule`` marks the object deleted right away (``deleted_at`` on
+boards and topics, which their default managers then hide; ``is_active=False``
+on users) and queues a DeletionJob.  The ``process_deletions`` worker runs
+``run_job``: for every shard it walks the dependent tables leaves first and
+deletes BATCH_SIZE rows per statement, each batch committing on its own, so
+memory use and lock times stay bounded.  A user's posts inside topic archives
+are cut out of the archive blobs.  The job row records the progress, and
+cached board and topic figures are expired as rows disappear.
+
+Workers take a job with ``claim_job`` the way tasks/queue.py claims tasks:
+skipping locked rows where the database can, and with an UPDATE conditional
+on the heartbeat they read everywhere, so two workers never run the same job.
+Every batch stamps ``heartbeat_at``; a job whose worker has been silent for
+CLAIM_TIMEOUT is taken over by the next worker.
+"""
+import logging
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import archive, sharding, signals
+from .models import (
+    ArchivedTopic, Board, BoardPlacement, BoardReadMark, DeletionJob, Post, PostRevision,
+    ReplyNotification, Subscription, Topic, TopicReadMark,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+CLAIM_TIMEOUT = timedelta(minutes=5)  # without a batch done
+
+
+def schedule(obj, requested_by=None):
+    """Mark a Board, Topic or User deleted now and queue the removal of its rows"""
+    now = timezone.now()
+    with transaction.atomic():
+        if isinstance(obj, Board):
+            Board.all_objects.filter(pk=obj.pk).update(deleted_at=now)
+            job = DeletionJob(kind=DeletionJob.BOARD, object_id=obj.pk)
+            signals.expire_board(obj.pk)
+        elif isinstance(obj, Topic):
+            Topic.all_objects.using(obj._state.db).filter(pk=obj.pk).update(deleted_at=now)
+            job = DeletionJob(kind=DeletionJob.TOPIC, object_id=obj.pk, board_id=obj.board_id)
+            signals.expire_topic(obj.pk, obj.board_id)
+        elif isinstance(obj, User):
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+            job = DeletionJob(kind=DeletionJob.USER, object_id=obj.pk)
+        else:
+            raise TypeError(f'Cannot schedule the deletion of {obj!r}')
+        job.label = str(obj)[:500]
+        job.requested_by = requested_by
+        job.save()
+    logger.info("Scheduled deletion of %s", job)
+    return job
+
+
+def topic_rows(topics):
+    """Rows below a set of topics (a Q on Topic), leaves first"""
+    prefix = lambda path: Q(**{f'{path}__in': Topic.all_objects.filter(topics).values('pk')})
+    return [
+        (Topic.views.through, prefix('topic')),
+        (TopicReadMark, prefix('topic')),
+        (Subscription, prefix('topic')),
+        (ReplyNotification, prefix('post__topic')),
+        (PostRevision, prefix('post__topic')),
+        (Post, prefix('topic')),
+        (ArchivedTopic, prefix('topic')),
+        (Topic, topics),
+    ]
+
+
+def user_rows(user_id):
+    """
+    Rows of a user on one shard, leaves first; topics they started go with
+    their replies.  Posts of others they edited or moderated, and the
+    revisions recording that, stay.
+    """
+    posts = Q(created_by_id=user_id)
+    return topic_rows(Q(starter_id=user_id)) + [
+        (ReplyNotification, Q(post__in=Post.objects.filter(posts).values('pk'))),
+        (PostRevision, Q(post__in=Post.objects.filter(posts).values('pk'))),
+        (Post, posts),
+        (Topic.views.through, Q(user_id=user_id)),
+        (TopicReadMark, Q(user_id=user_id)),
+        (BoardReadMark, Q(user_id=user_id)),
+        (Subscription, Q(user_id=user_id)),
+    ]
+
+
+def plan(job):
+    """``(alias, model, filter)`` steps of a job, in order"""
+    if job.kind == DeletionJob.BOARD:
+        alias = sharding.db_for_board(job.object_id)
+        rows = topic_rows(Q(board_id=job.object_id)) + [
+            (BoardReadMark, Q(board_id=job.object_id)),
+            (Subscription, Q(board_id=job.object_id)),
+        ]
+        return [(alias, model, rows) for model, rows in rows]
+    if job.kind == DeletionJob.TOPIC:
+        alias = sharding.db_for_board(job.board_id)
+        return [(alias, model, rows) for model, rows in topic_rows(Q(pk=job.object_id))]
+    return [(alias, model, rows) for alias in sharding.shard_aliases() for model, rows in user_rows(job.object_id)]
+
+
+def _expire(model, alias, pks):
+    # keep the cached figures of the boards and topics losing rows consistent
+    if model is Post:
+        affected = Post.objects.using(alias).filter(pk__in=pks).values_list('topic_id', 'topic__board_id').distinct()
+    elif model is Topic:
+        affected = Topic.all_objects.using(alias).filter(pk__in=pks).values_list('pk', 'board_id')
+    else:
+        return
+    for topic_id, board_id in affected:
+        signals.expire_topic(topic_id, board_id)
+
+
+def delete_rows(job, alias, model, rows, batch_size=BATCH_SIZE):
+    """Delete the rows of one step, batch by batch; returns the number of rows deleted"""
+    queryset = model._base_manager.using(alias).filter(rows).order_by('pk')
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        _expire(model, alias, pks)
+        # the steps run leaves first, so the collector finds nothing left to cascade to
+        count, _ = model._base_manager.using(alias).filter(pk__in=pks).delete()
+        deleted += count
+        job.deleted_rows += count
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=['deleted_rows', 'step', 'heartbeat_at'])
+
+
+def run_job(job, batch_size=BATCH_SIZE):
+    """Remove everything below the job's object, then the object itself"""
+    for alias, model, rows in plan(job):
+        job.step = f'{alias}: {model._meta.label}'
+        deleted = delete_rows(job, alias, model, rows, batch_size)
+        if deleted:
+            logger.info("Deletion of %s: %s rows of %s removed", job, deleted, job.step)
+    if job.kind == DeletionJob.BOARD:
+        BoardPlacement.objects.filter(board_id=job.object_id).delete()
+        Board.all_objects.filter(pk=job.object_id).delete()
+        sharding.forget(job.object_id)
+        signals.expire_board(job.object_id)
+    elif job.kind == DeletionJob.USER:
+        for alias in sharding.shard_aliases():
+            job.step = f'{alias}: archived posts'
+            stripped = archive.strip_user(job.object_id, alias, batch_size)
+            if stripped:
+                job.deleted_rows += stripped
+                job.heartbeat_at = timezone.now()
+                job.save(update_fields=['deleted_rows', 'step', 'heartbeat_at'])
+                logger.info("Deletion of %s: %s archived posts removed on %s", job, stripped, alias)
+        # nothing of theirs is left on the shards, the collector only sees auth rows
+        User.objects.filter(pk=job.object_id).delete()
+    job.step = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['step', 'finished_at'])
+    logger.info("Deletion of %s finished: %s rows removed", job, job.deleted_rows)
+
+
+def pending_jobs():
+    return DeletionJob.objects.filter(finished_at__isnull=True).order_by('pk')
+
+
+def claim_job(worker):
+    """The oldest pending job no live worker runs, now run by ``worker``; None if there is none"""
+    db = router.db_for_write(DeletionJob)
+    now = timezone.now()
+    with transaction.atomic(using=db):
+        free = pending_jobs().using(db).filter(Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=now - CLAIM_TIMEOUT))
+        if connections[db].features.has_select_for_update_skip_locked:
+            free = free.select_for_update(skip_locked=True)
+        job = free.first()
+        # the heartbeat filter keeps the claim exclusive where rows can't be locked
+        if job is None or not DeletionJob.objects.using(db).filter(pk=job.pk, heartbeat_at=job.heartbeat_at).update(
+            worker=worker, heartbeat_at=now,
+        ):
+            return None
+    if job.worker:
+        logger.warning("Deletion of %s taken over from %s", job, job.worker)
+    job.worker, job.heartbeat_at = worker, now
+    return job
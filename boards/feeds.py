@@ -0,0 +1,142 @@
+"""
+RSS and Atom feeds: latest topics of a board, latest posts of a topic.
+
+Feed readers poll often, so every feed answers conditional requests.  The
+ETag and Last-Modified come from ``Topic.last_update``, read with one indexed
+query (the newest topic of the board, or the topic itself); an unchanged feed
+is answered 304 without building it.  Edits don't touch ``last_update``, so a
+topic feed also goes by its newest ``Post.updated_at`` and its ETag carries
+the topic's page cache version, bumped by every write to its posts
+(boards/signals.py).  Feeds of a board marked for deletion are 404, 304s
+included.  Post bodies come from the stored ``Post.message_html``.
+"""
+from django.contrib.syndication.views import Feed
+from django.db.models import Max, prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from . import page_cache, sharding
+from .models import Board, Topic
+from .views import live_board_db
+
+ITEMS = 20
+
+
+class BoardFeed(Feed):
+    def get_object(self, request, pk):
+        return get_object_or_404(Board, pk=pk)
+
+    def title(self, board):
+        return f'{board.name}: latest topics'
+
+    def link(self, board):
+        return reverse('board_topics', kwargs={'pk': board.pk})
+
+    def description(self, board):
+        return board.description
+
+    def items(self, board):
+        topics = list(
+            Topic.objects.using(sharding.db_for_board(board.pk)).filter(board=board).order_by('-last_update')[:ITEMS]
+        )
+        prefetch_related_objects(topics, 'starter')
+        return topics
+
+    def item_title(self, topic):
+        return topic.subject
+
+    def item_description(self, topic):
+        return topic.subject
+
+    def item_link(self, topic):
+        return reverse('topic_posts', kwargs={'pk': topic.board_id, 'topic_pk': topic.pk})
+
+    def item_author_name(self, topic):
+        return topic.starter.username
+
+    def item_updateddate(self, topic):
+        return topic.last_update
+
+
+class AtomBoardFeed(BoardFeed):
+    feed_type = Atom1Feed
+    subtitle = BoardFeed.description
+
+
+class TopicFeed(Feed):
+    def get_object(self, request, pk, topic_pk):
+        return get_object_or_404(Topic.objects.using(live_board_db(pk)), board__pk=pk, pk=topic_pk)
+
+    def title(self, topic):
+        return topic.subject
+
+    def link(self, topic):
+        return reverse('topic_posts', kwargs={'pk': topic.board_id, 'topic_pk': topic.pk})
+
+    def description(self, topic):
+        return f'Latest posts in {topic.subject}'
+
+    def items(self, topic):
+        # posts of the related manager already know their topic
+        posts = list(topic.posts.order_by('-created_at')[:ITEMS])
+        prefetch_related_objects(posts, 'created_by')
+        return posts
+
+    def item_title(self, post):
+        return f'{post.created_by.username} in {post.topic.subject}'
+
+    def item_description(self, post):
+        return post.get_message_as_markdown()
+
+    def item_link(self, post):
+        return post.get_absolute_url()
+
+    def item_author_name(self, post):
+        return post.created_by.username
+
+    def item_pubdate(self, post):
+        return post.created_at
+
+    def item_updateddate(self, post):
+        return post.updated_at or post.created_at
+
+
+class AtomTopicFeed(TopicFeed):
+    feed_type = Atom1Feed
+    subtitle = TopicFeed.description
+
+
+def _validators(request, pk, topic_pk=None):
+    # read once per request, shared by the ETag and Last-Modified checks
+    if not hasattr(request, '_feed_validators'):
+        topics = Topic.objects.using(live_board_db(pk)).filter(board_id=pk)
+        if topic_pk is None:
+            request._feed_validators = (topics.order_by('-last_update').values_list('last_update', flat=True).first(), 0)
+        else:
+            # the newest edit is one seek of the (topic, updated_at, created_at) index
+            dates = topics.filter(pk=topic_pk).annotate(edited=Max('posts__updated_at')).values_list('last_update', 'edited').first()
+            last_modified = max(date for date in dates if date is not None) if dates else None
+            request._feed_validators = (last_modified, page_cache.version(f'topic:{topic_pk}'))
+    return request._feed_validators
+
+
+def _last_modified(request, pk, topic_pk=None):
+    return _validators(request, pk, topic_pk)[0]
+
+
+def _etag(request, pk, topic_pk=None):
+    last_modified, version = _validators(request, pk, topic_pk)
+    if last_modified is None:
+        return None
+    # the URL differs between RSS and Atom, so the tag only needs the data version
+    return f'{pk}-{topic_pk or 0}-{last_modified.timestamp()}-{version}'
+
+
+conditional = condition(etag_func=_etag, last_modified_func=_last_modified)
+
+board_rss = conditional(BoardFeed())
+board_atom = conditional(AtomBoardFeed())
+topic_rss = conditional(TopicFeed())
+topic_atom = conditional(AtomTopicFeed())
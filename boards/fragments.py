@@ -0,0 +1,28 @@
+"""
+Partial-page responses.
+
+A request carrying ``X-Fragment: 1`` (sent by static/js/fragments.js) gets
+only the part of the page that changes instead of the whole document:
+
+- the topic list and thread pages answer with their list and pagination
+  (``includes/topic_list.html``, ``includes/reply_list.html``), leaving out
+  the base layout, the breadcrumbs, the board header and the main post, and
+  the queries only those need;
+- ``reply_topic`` answers a valid POST with the card of the new post (201)
+  rather than a redirect to a full page, and the form alone otherwise.
+
+Elements of a fragment carry the id of the element they replace.  The same
+URL returns both forms, so these responses vary on the header.
+"""
+from django.utils.cache import patch_vary_headers
+
+HEADER = 'X-Fragment'
+
+
+def requested(request):
+    return request.headers.get(HEADER) == '1'
+
+
+def vary(response):
+    patch_vary_headers(response, (HEADER,))
+    return response
@@ -0,0 +1,134 @@
+"""
+Live thread updates.
+
+Views publish "post" and "edit" events for a topic to the hub, and the hub fans
+them out to every Server-Sent Events stream watching that topic.  The card HTML
+is rendered once, when the event is published, so watchers never touch the
+database: an idle subscriber is just a coroutine parked on an asyncio.Queue.
+
+Publishing goes through a backend.  The default ``InProcessBackend`` delivers
+to the subscribers of the current process; to fan out across several worker
+processes point ``BOARDS_LIVE_BACKEND`` at a class with the same interface that
+ships messages over a broker and calls ``hub.dispatch()`` on every process.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100  # events buffered per slow subscriber before the oldest are dropped
+KEEPALIVE = 15  # seconds between comment lines on an idle stream
+
+
+class InProcessBackend:
+    """Deliver messages to the subscribers of this process only"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, message):
+        self.hub.dispatch(channel, message)
+
+
+class Subscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, message):
+        """Called on the subscriber's event loop"""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._ids = itertools.count(1)
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            path = getattr(settings, 'BOARDS_LIVE_BACKEND', 'boards.live.InProcessBackend')
+            self._backend = import_string(path)(self)
+        return self._backend
+
+    def publish(self, channel, event, data):
+        """Safe to call from any thread"""
+        message = {'id': next(self._ids), 'event': event, 'data': data}
+        self.backend.publish(channel, message)
+
+    def dispatch(self, channel, message):
+        """Hand a message to every local subscriber of ``channel``"""
+        with self._lock:
+            subscriptions = list(self._subscribers.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.offer, message)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+hub = Hub()
+
+
+def topic_channel(topic_id):
+    return f'topic:{topic_id}'
+
+
+def publish_post(post, event):
+    """Publish a new ('post') or edited ('edit') post once the transaction commits"""
+    def send():
+        html = render_to_string('includes/post_card.html', {'post': post})
+        hub.publish(topic_channel(post.topic_id), event, {'id': post.pk, 'html': html})
+        logger.debug("Published %s event for post %s", event, post.pk)
+    transaction.on_commit(send, using=post._state.db)
+
+
+def format_event(message):
+    """Encode a hub message in the text/event-stream wire format"""
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+        message['id'], message['event'], json.dumps(message['data'])
+    )
+
+
+async def event_stream(channel):
+    async with hub.subscribe(channel) as subscription:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(message)
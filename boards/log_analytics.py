@@ -0,0 +1,177 @@
+"""
+Traffic and latency reports from the application log.
+
+RequestContextMiddleware writes one ``boards.access`` line per request to
+logs/django_app.log (method, path, status, duration, URL name and user).
+``Report`` streams through the log and its rotations, gzipped or not, one line
+at a time, and keeps only aggregates:
+
+- per view: requests, 4xx and 5xx responses, and a latency histogram with
+  fixed buckets, from which percentiles are read;
+- the most active users, boards and topics, in ``TopK`` counters of bounded
+  size;
+- per time window: requests, 5xx responses and ERROR records.
+
+Memory is thus bounded by the number of views, windows and TOP_CAPACITY, never
+by the size of the logs.  Lines are matched with precompiled patterns, and the
+many lines that are neither access lines nor errors are skipped by a plain
+substring test before any regex runs.  ``manage.py log_report`` prints the
+report.
+"""
+import bisect
+import gzip
+import heapq
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TOP_CAPACITY = 1000  # keys kept by each TopK counter
+
+_ACCESS = re.compile(
+    r'(?P<minute>\d{4}-\d\d-\d\d \d\d:\d\d):\d\d,\d+ \[INFO\] (?:\[[^\]]*\] )?boards\.access '
+    r'"[A-Z]+ (?P<path>.*?)" (?P<status>\d{3}) (?P<duration>\d+\.\d+)s view=(?P<view>\S+) user=(?P<user>\S+)'
+)
+_ERROR = re.compile(r'(?P<minute>\d{4}-\d\d-\d\d \d\d:\d\d):\d\d,\d+ \[(?:ERROR|CRITICAL)\] ')
+_BOARD_PATH = re.compile(r'/boards/(\d+)/(?:topics/(\d+)/)?')
+_ROTATION = re.compile(r'\.(\d+)(?:\.gz)?$')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))  # upper bounds, seconds
+
+
+def log_files(path):
+    """``path`` and its rotations (``path.1``, ``path.2.gz``...), oldest first"""
+    path = Path(path)
+    rotations = []
+    for rotated in path.parent.glob(f'{path.name}.*'):
+        match = _ROTATION.search(rotated.name)
+        if match and rotated.name[:match.start()] == path.name:
+            rotations.append((int(match.group(1)), rotated))
+    files = [rotated for _, rotated in sorted(rotations, reverse=True)]
+    return files + [path] if path.exists() else files
+
+
+def read_lines(files):
+    for name in files:
+        opener = gzip.open if str(name).endswith('.gz') else open
+        with opener(name, 'rt', encoding='utf-8', errors='replace') as file:
+            yield from file
+
+
+class TopK:
+    """
+    Approximate counts of the most frequent keys.  When more than twice
+    ``capacity`` keys are tracked the least counted ones are dropped, so a key
+    appearing late may be undercounted; the heavy ones aren't affected.
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key):
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if len(self.counts) > 2 * self.capacity:
+            self.counts = dict(self.most_common(self.capacity))
+
+    def most_common(self, n):
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+
+class Latency:
+    """Histogram of durations over LATENCY_BUCKETS"""
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the ``fraction`` quantile (the max for the last one)"""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+        return self.max
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.latency = Latency()
+
+
+class Window:
+    def __init__(self):
+        self.requests = 0
+        self.server_errors = 0
+        self.error_records = 0
+
+
+class Report:
+    def __init__(self, window=timedelta(hours=1), capacity=TOP_CAPACITY):
+        self.window_minutes = max(1, int(window.total_seconds() // 60))
+        self.views = {}
+        self.users = TopK(capacity)
+        self.boards = TopK(capacity)
+        self.topics = TopK(capacity)
+        self.windows = {}
+        self.requests = 0
+        self._minute = self._window = None
+
+    def window(self, minute):
+        # lines come in order, so most of them fall in the same minute as the previous one
+        if minute != self._minute:
+            moment = datetime.fromisoformat(minute)
+            offset = (moment.hour * 60 + moment.minute) // self.window_minutes * self.window_minutes
+            start = moment.replace(hour=0, minute=0) + timedelta(minutes=offset)
+            self._minute, self._window = minute, self.windows.setdefault(start, Window())
+        return self._window
+
+    def add(self, line):
+        if ' boards.access ' in line:
+            access = _ACCESS.match(line)
+            if access is not None:
+                self.add_request(access)
+        elif '[ERROR]' in line or '[CRITICAL]' in line:
+            error = _ERROR.match(line)
+            if error is not None:
+                self.window(error['minute']).error_records += 1
+
+    def add_request(self, access):
+        status = int(access['status'])
+        window = self.window(access['minute'])
+        window.requests += 1
+        self.requests += 1
+        stats = self.views.get(access['view'])
+        if stats is None:
+            stats = self.views[access['view']] = ViewStats()
+        stats.requests += 1
+        stats.latency.add(float(access['duration']))
+        if status >= 500:
+            stats.server_errors += 1
+            window.server_errors += 1
+        elif status >= 400:
+            stats.client_errors += 1
+        if access['user'] != '-':
+            self.users.add(access['user'])
+        board = _BOARD_PATH.match(access['path'])
+        if board:
+            self.boards.add(int(board[1]))
+            if board[2]:
+                self.topics.add((int(board[1]), int(board[2])))
+
+    def feed(self, lines):
+        for line in lines:
+            self.add(line)
+        return self
@@ -0,0 +1,35 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from . import context
+
+
+class RequestIdFilter(logging.Filter):
+    """Give records a ``request_id`` attribute: the id of the request being served, '-' outside requests"""
+
+    def filter(self, record):
+        request = context.current()
+        record.request_id = request.request_id if request else '-'
+        return True
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    Rotating file handler whose writes happen on a background thread: the
+    logging thread only formats the record and puts it on a queue, it never
+    waits on the disk.  Queued records are written out on close (logging
+    closes its handlers at exit).
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0):
+        super().__init__(queue.SimpleQueue())
+        self.target = RotatingFileHandler(filename, maxBytes=maxBytes, backupCount=backupCount, delay=True)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from boards.archive import archive_topic, cold_topics
+from boards.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = 'Move the posts of topics not updated for DAYS days into the compressed archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--limit', type=int, default=None, help='Archive at most LIMIT topics')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        archived = posts = 0
+        for alias in shard_aliases():
+            topics = cold_topics(cutoff, using=alias)
+            if options['limit']:
+                topics = topics[:options['limit'] - archived]
+            for topic in topics.iterator():
+                count = archive_topic(topic, cutoff)
+                if count:
+                    archived += 1
+                    posts += count
+            if options['limit'] and archived >= options['limit']:
+                break
+        self.stdout.write(f'Archived {archived} topics ({posts} posts)')
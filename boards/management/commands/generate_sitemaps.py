@@ -0,0 +1,59 @@
+import glob
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from boards import sitemaps
+from boards.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = 'Write gzip-compressed topic sitemaps and their index (sitemap.xml) to DIRECTORY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--base-url', default=settings.SITE_URL, help='Site the topic URLs point to')
+        parser.add_argument('--files-url', default=None,
+                            help='URL the sitemap files are served from (default: the base URL)')
+        parser.add_argument('--max-urls', type=int, default=sitemaps.MAX_URLS)
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        base_url = options['base_url'].rstrip('/')
+        files_url = (options['files_url'] or base_url).rstrip('/')
+
+        # files are written under temporary names and swapped in at the end,
+        # so the web server never serves a half-written set
+        names = []
+        sitemap = None
+        count = 0
+        for alias in shard_aliases():
+            for entry in sitemaps.url_entries(sitemaps.topic_rows(alias), base_url):
+                if sitemap is None or count == options['max_urls']:
+                    if sitemap is not None:
+                        self.close(sitemap)
+                    names.append(f'sitemap-{len(names)}.xml.gz')
+                    sitemap = gzip.open(os.path.join(directory, names[-1] + '.tmp'), 'wt', encoding='utf-8')
+                    sitemap.write(sitemaps.XML_HEADER + sitemaps.URLSET_OPEN)
+                    count = 0
+                sitemap.write(entry)
+                count += 1
+        if sitemap is not None:
+            self.close(sitemap)
+
+        with open(os.path.join(directory, 'sitemap.xml.tmp'), 'w', encoding='utf-8') as index:
+            index.writelines(sitemaps.index_lines(f'{files_url}/{name}' for name in names))
+        for name in names + ['sitemap.xml']:
+            os.replace(os.path.join(directory, name + '.tmp'), os.path.join(directory, name))
+        # files of a longer previous run are no longer in the index
+        for path in glob.glob(os.path.join(glob.escape(directory), 'sitemap-*.xml.gz')):
+            if os.path.basename(path) not in names:
+                os.remove(path)
+        self.stdout.write(f'Wrote {len(names)} sitemap files to {directory}')
+
+    def close(self, sitemap):
+        sitemap.write(sitemaps.URLSET_CLOSE)
+        sitemap.close()
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from boards.log_analytics import Report, log_files, read_lines
+
+
+class Command(BaseCommand):
+    help = 'Traffic and latency report from the access lines of the application log and its rotations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*',
+                            help='Logs to read with their rotations, gzipped or not (default: logs/django_app.log)')
+        parser.add_argument('--window', type=int, default=60, help='Minutes per line of the error report')
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        logs = options['files'] or [Path(settings.BASE_DIR, 'logs', 'django_app.log')]
+        files = [file for log in logs for file in log_files(log)]
+        report = Report(window=timedelta(minutes=options['window'])).feed(read_lines(files))
+        if not report.requests:
+            self.stdout.write('No requests logged')
+            return
+        top = options['top']
+
+        self.stdout.write(f'{report.requests} requests\n')
+        self.stdout.write(f'{"view":<28} {"requests":>9} {"4xx":>6} {"5xx":>6} {"avg":>9} {"p50":>9} {"p95":>9} {"max":>9}')
+        for view, stats in sorted(report.views.items(), key=lambda item: item[1].requests, reverse=True):
+            latency = stats.latency
+            self.stdout.write(
+                f'{view:<28} {stats.requests:>9} {stats.client_errors:>6} {stats.server_errors:>6} '
+                f'{latency.total / latency.count * 1000:>7.1f}ms {latency.percentile(0.5) * 1000:>7.1f}ms '
+                f'{latency.percentile(0.95) * 1000:>7.1f}ms {latency.max * 1000:>7.1f}ms'
+            )
+
+        for title, counter, label in (
+            ('Most active users', report.users, str),
+            ('Top boards', report.boards, lambda board: f'board {board}'),
+            ('Top topics', report.topics, lambda key: f'board {key[0]} topic {key[1]}'),
+        ):
+            entries = counter.most_common(top)
+            if entries:
+                self.stdout.write(f'\n{title}')
+                for key, count in entries:
+                    self.stdout.write(f'{count:>9}  {label(key)}')
+
+        self.stdout.write(f'\n{"window":<17} {"requests":>9} {"5xx":>6} {"rate":>7} {"errors":>7}')
+        for start, window in sorted(report.windows.items()):
+            rate = window.server_errors / window.requests if window.requests else 0
+            self.stdout.write(
+                f'{start:%Y-%m-%d %H:%M} {window.requests:>9} {window.server_errors:>6} {rate:>7.1%} {window.error_records:>7}'
+            )
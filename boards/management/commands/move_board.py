@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from boards import sharding, signals
+from boards.models import (
+    ArchivedTopic, Board, BoardPlacement, BoardReadMark, Post, PostRevision,
+    ReplyNotification, Subscription, Topic, TopicReadMark,
+)
+
+
+# unique on every shard (sharding.next_id(), an archive shares its topic's id) and referenced by URLs and rows
+KEEP_IDS = (Topic, Post, ArchivedTopic)
+
+
+def board_rows(board_id):
+    """Every board-scoped model with the filter selecting the board's rows, parents first"""
+    return [
+        (Topic, Q(board_id=board_id)),
+        (Topic.views.through, Q(topic__board_id=board_id)),
+        (Post, Q(topic__board_id=board_id)),
+        (ArchivedTopic, Q(topic__board_id=board_id)),
+        (PostRevision, Q(post__topic__board_id=board_id)),
+        (ReplyNotification, Q(post__topic__board_id=board_id)),
+        (TopicReadMark, Q(topic__board_id=board_id)),
+        (BoardReadMark, Q(board_id=board_id)),
+        (Subscription, Q(board_id=board_id) | Q(topic__board_id=board_id)),
+    ]
+
+
+def batches(queryset, batch_size):
+    """Keyset pagination over the primary key"""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        batch = list((queryset if last is None else queryset.filter(pk__gt=last))[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1].pk
+
+
+class Command(BaseCommand):
+    help = 'Move a board, with all its topics and posts, to another shard while the site stays up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('board_id', type=int)
+        parser.add_argument('alias', help='Target database alias, one of BOARD_SHARDS')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--wait', type=int, default=sharding.PLACEMENT_TTL,
+                            help='Seconds to let every worker see a placement change')
+
+    def handle(self, *args, **options):
+        board = Board.objects.filter(pk=options['board_id']).first()
+        if board is None:
+            raise CommandError(f'Board {options["board_id"]} does not exist')
+        target = options['alias']
+        if target not in sharding.shard_aliases():
+            raise CommandError(f'Unknown shard {target!r}, expected one of {sharding.shard_aliases()}')
+        source = sharding.db_for_board(board.pk)
+        if source == target:
+            self.stdout.write(f'Board {board} already lives on {target}')
+            return
+
+        placement, _ = BoardPlacement.objects.get_or_create(board=board, defaults={'alias': source})
+        self.set_placement(placement, options['wait'], read_only=True)
+        try:
+            with transaction.atomic(using=target):
+                for model, rows in board_rows(board.pk):
+                    self.copy(model, rows, source, target, options['batch_size'])
+        except Exception:
+            self.set_placement(placement, 0, read_only=False)
+            raise
+
+        # readers switch to the target; give slow ones time before removing the source rows
+        self.set_placement(placement, options['wait'], alias=target)
+        for model, rows in reversed(board_rows(board.pk)):
+            for batch in batches(model._base_manager.using(source).filter(rows), options['batch_size']):
+                model._base_manager.using(source).filter(pk__in=[obj.pk for obj in batch]).delete()
+        self.set_placement(placement, 0, read_only=False)
+        signals.expire_board(board.pk)  # cached last post points at the source shard
+        self.stdout.write(self.style.SUCCESS(f'Moved board {board} from {source} to {target}'))
+
+    def set_placement(self, placement, wait, **changes):
+        for name, value in changes.items():
+            setattr(placement, name, value)
+        placement.save()
+        sharding.forget(placement.board_id)
+        if wait:
+            self.stdout.write(f'Waiting {wait}s for workers to see the placement change')
+            time.sleep(wait)
+
+    def copy(self, model, rows, source, target, batch_size):
+        fields = model._meta.concrete_fields
+        if model not in KEEP_IDS:
+            # ids of these rows may be taken on the target, and nothing refers to them
+            fields = [field for field in fields if not field.primary_key]
+        copied = 0
+        for batch in batches(model._base_manager.using(source).filter(rows), batch_size):
+            # raw inserts keep auto_now/auto_now_add values as they are
+            model._base_manager._insert(batch, fields=fields, raw=True, using=target)
+            copied += len(batch)
+        self.stdout.write(f'  {model._meta.label}: {copied} rows')
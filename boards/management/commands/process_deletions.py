@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from boards.deletion import BATCH_SIZE, claim_job, run_job
+from tasks.queue import worker_name
+
+
+class Command(BaseCommand):
+    help = 'Remove boards, topics and users marked deleted, with their rows, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, looking for new jobs every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        while True:
+            # other workers may run jobs too: each one is claimed first
+            while (job := claim_job(worker)) is not None:
+                self.stdout.write(f'Deleting {job}')
+                run_job(job, options['batch_size'])
+                self.stdout.write(f'  {job.deleted_rows} rows removed')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from boards import startup
+
+
+class Command(BaseCommand):
+    help = 'Time django.setup(), the first request and every import in a fresh interpreter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/', help="URL of the first request, '' to skip it")
+        parser.add_argument('--top', type=int, default=20, help='Number of slowest imports to list')
+
+    def handle(self, *args, **options):
+        timings = startup.measure(options['url'])
+        self.stdout.write(f'django.setup(): {timings["setup"] * 1000:.0f} ms (budget {startup.SETUP_BUDGET * 1000:.0f} ms)')
+        if timings['first_request'] is not None:
+            self.stdout.write(
+                f'first request to {options["url"]}: {timings["first_request"] * 1000:.0f} ms (status {timings["status"]})'
+            )
+
+        self.stdout.write('\nSlowest top-level imports (cumulative):')
+        top_level = [entry for entry in timings['imports'] if entry[3] == 0]
+        for name, _, cumulative, _ in sorted(top_level, key=lambda entry: entry[2], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {cumulative * 1000:8.1f} ms  {name}')
+
+        self.stdout.write('\nSlowest modules (own time):')
+        for name, own, _, _ in sorted(timings['imports'], key=lambda entry: entry[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {own * 1000:8.1f} ms  {name}')
+
+        eager = [name for name in startup.LAZY_MODULES if name in timings['loaded']]
+        if eager:
+            self.stdout.write(self.style.WARNING(f'\nImported by django.setup() but meant to be lazy: {", ".join(eager)}'))
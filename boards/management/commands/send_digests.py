@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from boards.notifications import BATCH_SIZE, send_digests
+from boards.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = 'Send queued reply notifications to subscribers as one digest email per user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, draining the queue every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            for alias in shard_aliases():
+                while True:
+                    processed = send_digests(options['batch_size'], using=alias)
+                    total += processed
+                    if not processed:
+                        break
+            self.stdout.write(f'Processed {total} queued posts')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
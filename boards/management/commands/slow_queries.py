@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from boards.slow_queries import summarize
+
+GROUPINGS = {
+    'statement': ('sql', 'origin', 'template'),
+    'origin': ('origin', 'template'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Sum up the slow-query log: statements or origins taking the most total time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*',
+                            help='Log files to read (default: logs/slow_queries.log and its rotations)')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--by', choices=sorted(GROUPINGS), default='statement')
+
+    def handle(self, *args, **options):
+        files = options['files'] or sorted(Path(settings.BASE_DIR, 'logs').glob('slow_queries.log*'))
+        lines = (line for name in files for line in Path(name).read_text().splitlines())
+        groups = summarize(lines, GROUPINGS[options['by']])
+        if not groups:
+            self.stdout.write('No slow queries logged')
+        for group in groups[:options['top']]:
+            self.stdout.write(
+                f'{group["total"]:9.3f}s total  {group["count"]:6} queries  '
+                f'{group["total"] / group["count"] * 1000:8.1f}ms avg  {group["max"] * 1000:8.1f}ms max'
+            )
+            self.stdout.write(f'    from {group["origin"] or "?"}')
+            if group['template']:
+                self.stdout.write(f'    in {group["template"]}')
+            if group['url_names']:
+                self.stdout.write(f'    on {", ".join(sorted(group["url_names"]))}')
+            if 'sql' in group:
+                self.stdout.write(f'    {group["sql"][:300]}')
@@ -0,0 +1,184 @@
+"""
+Memory profiling of a worker.
+
+With ``settings.MEMORY_PROFILING`` on, MemoryProfileMiddleware is installed,
+the staff-only ``memory_profile`` view answers and SIGUSR2 is handled, but
+nothing is traced until profiling is started from the view (POST
+``action=start``) or by the signal, which toggles it.  While it runs:
+
+- each request resets the tracemalloc peak, and its view is credited with the
+  peak and with what was still allocated once the response was returned;
+- every ``EVERY`` requests a snapshot is compared with the previous one: the
+  growth is summed up per allocation site in our own code (boards/,
+  accounts/), on the innermost of our frames of each traceback, and model
+  instances still alive after a full garbage collection are counted per model.
+
+The view returns the report as JSON; stopping from the signal logs it.  The
+tracemalloc peak is process wide, so with threaded workers a view's peak may
+include allocations of requests running at the same time.
+"""
+import gc
+import logging
+import os
+import signal
+import threading
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Model
+
+logger = logging.getLogger(__name__)
+
+EVERY = 50  # requests between snapshots
+FRAMES = 25  # frames kept per allocation, enough to reach our code from Django's
+TOP = 20  # allocation sites and models reported
+
+
+class ViewMemory:
+    def __init__(self):
+        self.requests = 0
+        self.max_peak = 0
+        self.total_peak = 0
+        self.retained = 0
+
+    def add(self, peak, retained):
+        self.requests += 1
+        self.max_peak = max(self.max_peak, peak)
+        self.total_peak += peak
+        self.retained += retained
+
+
+def _our_site(traceback, roots):
+    for frame in reversed(traceback):  # innermost first
+        if frame.filename.startswith(roots) and frame.filename != __file__:
+            return f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:{frame.lineno}'
+    return None
+
+
+def alive_instances():
+    """Model instances left after a full collection, per model label"""
+    gc.collect()
+    # type(), not isinstance(): that reads __class__, which would evaluate lazy objects
+    return Counter(type(obj)._meta.label for obj in gc.get_objects() if issubclass(type(obj), Model))
+
+
+class Profiler:
+    def __init__(self, every=EVERY):
+        self.every = every
+        self.active = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.active:
+                return
+            tracemalloc.start(FRAMES)
+            self.views = {}
+            self.requests = 0
+            self.sites = []
+            self.instances = alive_instances()
+            self.instance_changes = Counter()
+            self._snapshot = tracemalloc.take_snapshot()
+            self.active = True
+        logger.info("Memory profiling started")
+
+    def stop(self):
+        """Stop tracing; returns the last report"""
+        with self._lock:
+            if not self.active:
+                return None
+            report = self._report()
+            self.active = False
+            tracemalloc.stop()
+        logger.info("Memory profiling stopped")
+        return report
+
+    def toggle(self):
+        if self.active:
+            report = self.stop()
+            logger.info("Memory profile:\n%s", format_report(report))
+        else:
+            self.start()
+
+    def begin_request(self):
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def end_request(self, view, before):
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            if not self.active:
+                return
+            self.views.setdefault(view, ViewMemory()).add(peak - before, current - before)
+            self.requests += 1
+            if self.requests % self.every == 0:
+                self._compare()
+
+    def compare(self):
+        with self._lock:
+            if self.active:
+                self._compare()
+
+    def _compare(self):
+        snapshot = tracemalloc.take_snapshot()
+        roots = tuple(os.path.join(settings.BASE_DIR, app) + os.sep for app in ('boards', 'accounts'))
+        sizes, counts = Counter(), Counter()
+        for diff in snapshot.compare_to(self._snapshot, 'traceback'):
+            site = _our_site(diff.traceback, roots)
+            if site:
+                sizes[site] += diff.size_diff
+                counts[site] += diff.count_diff
+        self.sites = [(site, size, counts[site]) for site, size in sizes.most_common(TOP)]
+        self._snapshot = snapshot
+        instances = alive_instances()
+        self.instance_changes = Counter({label: instances[label] - self.instances[label] for label in instances | self.instances})
+        self.instances = instances
+
+    def report(self):
+        with self._lock:
+            return self._report() if self.active else None
+
+    def _report(self):
+        current, peak = tracemalloc.get_traced_memory()
+        views = sorted(self.views.items(), key=lambda item: item[1].max_peak, reverse=True)
+        return {
+            'requests': self.requests,
+            'traced': current,
+            'peak': peak,
+            'views': [
+                {'view': view, 'requests': stats.requests, 'max_peak': stats.max_peak,
+                 'avg_peak': stats.total_peak // stats.requests, 'retained': stats.retained}
+                for view, stats in views
+            ],
+            'sites': [{'site': site, 'size_diff': size, 'count_diff': count} for site, size, count in self.sites],
+            'instances': [
+                {'model': label, 'alive': count, 'change': self.instance_changes[label]}
+                for label, count in self.instances.most_common(TOP)
+            ],
+        }
+
+
+def format_report(report):
+    if report is None:
+        return 'Memory profiling is off'
+    lines = [f'{report["requests"]} requests, {report["traced"] / 1024:.0f} KiB traced, {report["peak"] / 1024:.0f} KiB peak']
+    for view in report['views']:
+        lines.append(
+            f'{view["view"]:<28} {view["requests"]:>6} requests  {view["max_peak"] / 1024:>9.1f} KiB max peak  '
+            f'{view["avg_peak"] / 1024:>9.1f} KiB avg  {view["retained"] / 1024:>9.1f} KiB retained'
+        )
+    for site in report['sites']:
+        lines.append(f'{site["size_diff"] / 1024:>+10.1f} KiB {site["count_diff"]:>+8} blocks  {site["site"]}')
+    for model in report['instances']:
+        lines.append(f'{model["alive"]:>10} alive {model["change"]:>+8}  {model["model"]}')
+    return '\n'.join(lines)
+
+
+profiler = Profiler()
+
+
+def install_signal():
+    """Toggle profiling on SIGUSR2; the work happens on a thread, not in the handler"""
+    if hasattr(signal, 'SIGUSR2') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR2, lambda signum, frame: threading.Thread(target=profiler.toggle).start())
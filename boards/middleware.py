@@ -0,0 +1,334 @@
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from . import context, memory_profile, nplusone
+from .sharding import BoardReadOnly
+
+try:
+    import brotli
+except ImportError:  # optional, responses are gzipped without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('boards.access')
+
+
+class TokenBucket:
+    """
+    Per-key token buckets holding at most ``burst`` tokens and refilling
+    ``burst`` tokens every ``period`` seconds, in process memory.
+
+    With a Django ``cache`` (shared by the workers of a host) a bucket can't
+    be read and written back atomically, so the shared state is a counter per
+    key and ``period`` window instead, moved with the cache's atomic
+    add()/incr(): at most ``burst`` requests per window, whatever the number
+    of workers.
+    """
+
+    def __init__(self, burst, period, cache=None):
+        self.burst = burst
+        self.period = period
+        self.rate = burst / period
+        self.cache = cache
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Spend one token; returns 0 if allowed, else seconds until a token is available"""
+        if self.cache is not None:
+            return self._take_shared(key)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._state.get(key) or (self.burst, now)
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._state[key] = (tokens - 1, now)
+                return 0
+            self._state[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+    def _take_shared(self, key):
+        now = time.time()
+        window = int(now // self.period)
+        counter = f'{key}:{window}'
+        self.cache.add(counter, 0, timeout=math.ceil(self.period) + 1)
+        try:
+            count = self.cache.incr(counter)
+        except ValueError:  # expired between add() and incr()
+            self.cache.add(counter, 1, timeout=math.ceil(self.period) + 1)
+            count = 1
+        if count <= self.burst:
+            return 0
+        return (window + 1) * self.period - now
+
+
+class RequestContextMiddleware:
+    """
+    Make the request's path, URL name and id available to instrumentation
+    (boards/context.py).  The id comes from the ``X-Request-ID`` header set by
+    the proxy when it is a plain token, so our logs join the proxy's; otherwise
+    a new one is drawn.  It is sent back in the same header.
+
+    Each request then gets an access line on the ``boards.access`` logger,
+    which ``manage.py log_report`` reads (boards/log_analytics.py).
+    """
+    HEADER = 'X-Request-ID'
+    VALID_ID = re.compile(r'[A-Za-z0-9._:-]{1,64}')  # it ends up in log lines and SQL comments
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            url_name = resolve(request.path_info).url_name or ''
+        except Resolver404:
+            url_name = ''
+        request_id = request.headers.get(self.HEADER, '')
+        if not self.VALID_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        request.id = request_id
+        token = context.activate(context.RequestInfo(request.path, url_name, request_id))
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            response[self.HEADER] = request_id
+            user = getattr(request, 'user', None)
+            access_logger.info(
+                '"%s %s" %s %.3fs view=%s user=%s', request.method, request.path, response.status_code,
+                time.perf_counter() - start, url_name or '-',
+                user.get_username() if user and user.is_authenticated else '-',
+            )
+            return response
+        finally:
+            context.deactivate(token)
+
+
+class NPlusOneMiddleware:
+    """
+    Report requests running the same query shape more than NPLUSONE_THRESHOLD
+    times (boards/nplusone.py).  ``NPLUSONE_DETECTION = 'log'`` logs them,
+    ``'raise'`` fails them; unset, the middleware drops out of the chain.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, 'NPLUSONE_DETECTION', None)
+        if not self.mode:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        with nplusone.Detector() as detector:
+            response = self.get_response(request)
+        if detector.repeated():
+            url_name = request.resolver_match.url_name if request.resolver_match else request.path
+            if self.mode == 'raise':
+                raise nplusone.NPlusOneError(f'Repeated queries on {url_name}:\n{detector.report()}')
+            logger.warning("Repeated queries on %s (%s queries):\n%s", url_name, detector.total, detector.report())
+        return response
+
+
+class MemoryProfileMiddleware:
+    """
+    Credit each view with the memory its requests allocate while profiling
+    runs (boards/memory_profile.py).  Unless ``MEMORY_PROFILING`` is on, the
+    middleware drops out of the chain.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, 'MEMORY_PROFILING', False):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        profiler = memory_profile.profiler
+        if not profiler.active:
+            return self.get_response(request)
+        before = profiler.begin_request()
+        response = self.get_response(request)
+        url_name = request.resolver_match.url_name if request.resolver_match else '-'
+        profiler.end_request(url_name or '-', before)
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Shed load instead of queuing it.
+
+    ``ADMISSION_CONCURRENCY`` caps how many expensive requests per URL name run
+    at once (POSTs, and list pages past ``ADMISSION_DEEP_PAGE``); the overflow
+    gets an immediate 503.  ``ADMISSION_RATE_LIMITS`` gives each user a token
+    bucket of ``(burst, period)`` for POSTs to a URL name; the overflow gets a
+    429.  Both carry ``Retry-After``, and rejections are counted in
+    ``rejections`` and logged so the limits can be tuned.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.deep_page = getattr(settings, 'ADMISSION_DEEP_PAGE', 10)
+        self.slots = {
+            name: threading.BoundedSemaphore(limit)
+            for name, limit in getattr(settings, 'ADMISSION_CONCURRENCY', {}).items()
+        }
+        cache_alias = getattr(settings, 'ADMISSION_CACHE', None)
+        cache = caches[cache_alias] if cache_alias else None
+        self.buckets = {
+            name: TokenBucket(burst, period, cache)
+            for name, (burst, period) in getattr(settings, 'ADMISSION_RATE_LIMITS', {}).items()
+        }
+        self.rejections = Counter()
+        self._rejections_lock = threading.Lock()
+
+    def __call__(self, request):
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return self.get_response(request)
+
+        if request.method == 'POST' and url_name in self.buckets:
+            client = request.user.pk if request.user.is_authenticated else request.META.get('REMOTE_ADDR')
+            wait = self.buckets[url_name].take(f'admission:{url_name}:{client}')
+            if wait:
+                return self.reject(429, 'rate_limited', url_name, wait)
+
+        slot = self.slots.get(url_name)
+        if slot is None or not self.is_expensive(request):
+            return self.get_response(request)
+        if not slot.acquire(blocking=False):
+            return self.reject(503, 'overloaded', url_name, 1)
+        try:
+            return self.get_response(request)
+        finally:
+            slot.release()
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, BoardReadOnly):
+            # the board is being moved to another shard, which only takes a moment
+            return self.reject(503, 'board_moving', request.resolver_match.url_name, 5)
+        return None
+
+    def is_expensive(self, request):
+        if request.method == 'POST':
+            return True
+        try:
+            return int(request.GET.get('page', 1)) > self.deep_page
+        except ValueError:
+            return False
+
+    def reject(self, status, reason, url_name, retry_after):
+        with self._rejections_lock:
+            self.rejections[(reason, url_name)] += 1
+            count = self.rejections[(reason, url_name)]
+        logger.warning("Rejected %s request (%s), %s so far", url_name, reason, count)
+        response = HttpResponse(
+            'Too many requests, please retry shortly.' if status == 429 else 'Server busy, please retry shortly.',
+            status=status, content_type='text/plain',
+        )
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor()
+    for chunk in sequence:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when the ``brotli`` package is installed)
+    or gzip, whichever the client accepts, brotli first.  Like Django's
+    GZipMiddleware it skips short and already encoded responses and weakens
+    ETags; event streams are left alone, compressing would buffer them.
+
+    Brotli output has no random padding, so HTML holding a CSRF token (a form,
+    the logout button of the nav) or streamed HTML, which can't be checked,
+    gets padded gzip instead, or stays uncompressed: the BREACH mitigation of
+    GZipMiddleware, on top of the per-response masking of the token.
+    """
+    MIN_LENGTH = 200
+    GZIP_PADDING = 100  # random bytes in the gzip header against BREACH, as GZipMiddleware
+    CSRF_MARKER = b'name="csrfmiddlewaretoken"'
+    COMPRESSIBLE = (
+        'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml', 'application/javascript',
+        'application/json', 'application/xml', 'application/rss+xml', 'application/atom+xml', 'image/svg+xml',
+    )
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in self.COMPRESSIBLE or response.has_header('Content-Encoding'):
+            return response
+        if response.streaming and response.is_async:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_encodings(request)
+        if brotli is not None and 'br' in accepted and not self.may_hold_token(response, content_type):
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            if encoding == 'br':
+                response.streaming_content = _brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.GZIP_PADDING
+                )
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < self.MIN_LENGTH:
+                return response
+            if encoding == 'br':
+                compressed = brotli.compress(response.content)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.GZIP_PADDING)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def may_hold_token(self, response, content_type):
+        return content_type == 'text/html' and (response.streaming or self.CSRF_MARKER in response.content)
+
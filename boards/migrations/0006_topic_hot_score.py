@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0005_alter_topic_subject_remove_topic_views_topic_views"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="topic",
+            name="hot_score",
+            field=models.FloatField(db_index=True, default=0),
+        ),
+    ]
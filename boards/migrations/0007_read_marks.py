@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0006_topic_hot_score"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BoardReadMark",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("last_read_post_id", models.PositiveBigIntegerField(default=0)),
+                ("board", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="read_marks", to="boards.board")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("user", "board"), name="unique_board_read_mark")],
+            },
+        ),
+        migrations.CreateModel(
+            name="TopicReadMark",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("last_read_post_id", models.PositiveBigIntegerField(default=0)),
+                ("topic", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="read_marks", to="boards.topic")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("user", "topic"), name="unique_topic_read_mark")],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0007_read_marks"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReplyNotification",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("post", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="boards.post")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Subscription",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("board", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="subscriptions", to="boards.board")),
+                ("topic", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="subscriptions", to="boards.topic")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="subscriptions", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "constraints": [models.CheckConstraint(condition=models.Q(models.Q(("board__isnull", True), ("topic__isnull", False)), models.Q(("board__isnull", False), ("topic__isnull", True)), _connector="OR"), name="subscription_board_xor_topic"), models.UniqueConstraint(fields=("user", "board"), name="unique_board_subscription"), models.UniqueConstraint(fields=("user", "topic"), name="unique_topic_subscription")],
+            },
+        ),
+    ]
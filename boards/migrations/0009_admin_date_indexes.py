@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0008_subscriptions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="topic",
+            name="last_update",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
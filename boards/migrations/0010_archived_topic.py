@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0009_admin_date_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTopic",
+            fields=[
+                ("topic", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="archive", serialize=False, to="boards.topic")),
+                ("data", models.BinaryField()),
+                ("post_count", models.PositiveIntegerField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
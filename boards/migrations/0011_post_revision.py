@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0010_archived_topic"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostRevision",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("number", models.PositiveIntegerField()),
+                ("is_snapshot", models.BooleanField(default=False)),
+                ("data", models.BinaryField()),
+                ("created_at", models.DateTimeField()),
+                ("created_by", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+                ("post", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="revisions", to="boards.post")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("post", "number"), name="unique_post_revision")],
+            },
+        ),
+    ]
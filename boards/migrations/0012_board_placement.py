@@ -0,0 +1,79 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0011_post_revision"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BoardPlacement",
+            fields=[
+                ("board", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="placement", serialize=False, to="boards.board")),
+                ("alias", models.CharField(default="default", max_length=100)),
+                ("read_only", models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="boardreadmark",
+            name="board",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="read_marks", to="boards.board"),
+        ),
+        migrations.AlterField(
+            model_name="boardreadmark",
+            name="user",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="created_by",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="created_posts", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="updated_by",
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="postrevision",
+            name="created_by",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="subscription",
+            name="board",
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="subscriptions", to="boards.board"),
+        ),
+        migrations.AlterField(
+            model_name="subscription",
+            name="user",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="subscriptions", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="topic",
+            name="board",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="topics", to="boards.board"),
+        ),
+        migrations.AlterField(
+            model_name="topic",
+            name="starter",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="started_topics", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="topic",
+            name="views",
+            field=models.ManyToManyField(blank=True, db_constraint=False, related_name="viewed_topics", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name="topicreadmark",
+            name="user",
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0012_board_placement"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["topic", "updated_at", "created_at"], name="post_thread_order_idx"),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def render_messages(apps, schema_editor):
+    from markdown import markdown
+
+    Post = apps.get_model("boards", "Post")
+    posts = Post.objects.using(schema_editor.connection.alias).only("id", "message").order_by("pk")
+    last = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            break
+        for post in batch:
+            post.message_html = markdown(post.message, safe_mode="escape")
+        Post.objects.using(schema_editor.connection.alias).bulk_update(batch, ["message_html"])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0013_post_thread_order_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="message_html",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_messages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="topic",
+            index=models.Index(fields=["board", "last_update"], name="topic_board_last_update_idx"),
+        ),
+    ]
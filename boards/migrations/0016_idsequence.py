@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0015_deletion_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdSequence",
+            fields=[
+                ("name", models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ("last_id", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:30
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def fill_post_range(apps, schema_editor):
+    ArchivedTopic = apps.get_model("boards", "ArchivedTopic")
+    archives = ArchivedTopic.objects.using(schema_editor.connection.alias).only("pk", "data").order_by("pk")
+    last = 0
+    while True:
+        batch = list(archives.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            break
+        for archive in batch:
+            ids = [row["id"] for row in json.loads(zlib.decompress(bytes(archive.data)).decode("utf-8"))]
+            archive.first_post_id = min(ids, default=None)
+            archive.last_post_id = max(ids, default=None)
+        ArchivedTopic.objects.using(schema_editor.connection.alias).bulk_update(batch, ["first_post_id", "last_post_id"])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0017_keep_edits_of_deleted_users"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivedtopic",
+            name="first_post_id",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="archivedtopic",
+            name="last_post_id",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(fill_post_range, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="archivedtopic",
+            index=models.Index(fields=["first_post_id", "last_post_id"], name="archive_post_range_idx"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0018_archive_post_range"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="deletionjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="deletionjob",
+            name="worker",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -4,67 +4,289 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
-from markdown import markdown
 from django.utils.html import mark_safe
 
+from . import caching, sharding
+
+# Boards, users and board placements live in the default database; everything
+# else in this app lives on the shard of the board it belongs to (see
+# boards/sharding.py), so foreign keys to Board and User are not enforced by
+# the database.
+
+STATS_TTL = 60  # seconds the cached board and topic figures stay fresh
+
+
+def board_stats_key(board_id):
+    return f'boards:board:{board_id}:stats'
+
+
+def topic_stats_key(topic_id):
+    return f'boards:topic:{topic_id}:stats'
+
+
+def render_message(message):
+    from markdown import markdown  # heavy, imported on first use rather than at startup
+    return markdown(message, safe_mode='escape')
+
+
+class AliveManager(models.Manager):
+    """Hides rows marked for deletion; boards/deletion.py removes them in the background"""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 class Board(models.Model):
     name=models.CharField(max_length=30,unique=True)
     description=models.CharField(max_length=100)
+    deleted_at=models.DateTimeField(null=True,blank=True,editable=False)
+
+    objects=AliveManager()
+    all_objects=models.Manager()
+
     def __str__(self):
         return self.name
 
+    def get_stats(self):
+        """Posts count and last post of the board, cached (see boards/caching.py)"""
+        def compute():
+            posts = Post.objects.using(sharding.db_for_board(self.pk)).filter(topic__board=self, topic__deleted_at__isnull=True)
+            return {'posts_count': posts.count(), 'last_post': posts.order_by('-created_at').first()}
+        return caching.get_or_compute(board_stats_key(self.pk), compute, STATS_TTL)
+
     def get_posts_count(self):
-        return Post.objects.filter(topic__board=self).count()
+        return self.get_stats()['posts_count']
 
     def get_last_post(self):
-        return Post.objects.filter(topic__board=self).order_by('-created_at').first()
+        return self.get_stats()['last_post']
+
+
+class BoardPlacement(models.Model):
+    """Database alias holding a board's topics and posts; boards without a row live on 'default'"""
+    board=models.OneToOneField(Board,primary_key=True,related_name='placement',on_delete=models.CASCADE)
+    alias=models.CharField(max_length=100,default='default')
+    read_only=models.BooleanField(default=False)  # set while the board is being moved
+
+
+class IdSequence(models.Model):
+    """Last id handed out for a model whose rows are spread over the shards; see sharding.next_id()"""
+    name=models.CharField(max_length=100,primary_key=True)
+    last_id=models.BigIntegerField(default=0)
 
 
 class Topic(models.Model):
     subject=models.CharField(max_length=500)
-    last_update=models.DateTimeField(auto_now=True)
-    board=models.ForeignKey(Board,related_name='topics',on_delete=models.CASCADE)
-    starter=models.ForeignKey(User,related_name='started_topics',on_delete=models.CASCADE)
-    views = models.ManyToManyField(User, related_name='viewed_topics', blank=True)
+    last_update=models.DateTimeField(auto_now=True,db_index=True)
+    board=models.ForeignKey(Board,related_name='topics',on_delete=models.CASCADE,db_constraint=False)
+    starter=models.ForeignKey(User,related_name='started_topics',on_delete=models.CASCADE,db_constraint=False)
+    views = models.ManyToManyField(User, related_name='viewed_topics', blank=True, db_constraint=False)
+    hot_score = models.FloatField(default=0, db_index=True)  # see boards/trending.py
+    deleted_at=models.DateTimeField(null=True,blank=True,editable=False)
+
+    objects=AliveManager()
+    all_objects=models.Manager()
+
+    class Meta:
+        indexes = [
+            # topic lists and the Last-Modified of board feeds
+            models.Index(fields=['board', 'last_update'], name='topic_board_last_update_idx'),
+        ]
 
     def __str__(self):
         return self.subject
 
+    def get_stats(self):
+        """Replies count and last post of the topic, cached (see boards/caching.py)"""
+        def compute():
+            return {
+                'replies_count': max(self.posts.count() - 1, 0),
+                'last_post': self.posts.order_by('-created_at').first(),
+            }
+        return caching.get_or_compute(topic_stats_key(self.pk), compute, STATS_TTL)
+
     def get_replies_count(self):
         """Number of replies (excluding the first post)"""
-        return max(self.posts.count() - 1, 0)
+        return self.get_stats()['replies_count']
 
     def get_last_post(self):
         """Return the latest post in this topic"""
-        return self.posts.order_by('-created_at').first()
+        return self.get_stats()['last_post']
 
     def get_last_post_url(self):
         """URL to view the last post"""
         last_post = self.get_last_post()
         if last_post:
-            return reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.pk}) + f"#post-{last_post.pk}"
+            return reverse('post_permalink', kwargs={'pk': self.board_id, 'post_pk': last_post.pk})
         return '#'
 
 
 
 
+# Order of the replies in a thread: edited posts first, then newest first.
+# boards/permalinks.py relies on it to find the page of a post.
+REPLY_ORDERING = (models.F('updated_at').desc(nulls_last=True), '-created_at', '-pk')
+
+
 class Post(models.Model):
     message=models.TextField(max_length=5000)
-    created_at=models.DateTimeField(auto_now_add=True)
+    message_html=models.TextField(blank=True,editable=False)  # rendered on save, see render_message()
+    created_at=models.DateTimeField(auto_now_add=True,db_index=True)
     updated_at=models.DateTimeField(null=True)
     topic=models.ForeignKey(Topic,related_name="posts",on_delete=models.CASCADE)
-    created_by=models.ForeignKey(User,related_name="created_posts",on_delete=models.CASCADE)
-    updated_by=models.ForeignKey(User,related_name="+",null=True,on_delete=models.CASCADE)
+    created_by=models.ForeignKey(User,related_name="created_posts",on_delete=models.CASCADE,db_constraint=False)
+    updated_by=models.ForeignKey(User,related_name="+",null=True,on_delete=models.DO_NOTHING,db_constraint=False)  # edits outlive their editor
+
+    class Meta:
+        indexes = [
+            # thread pages and permalink ranks
+            models.Index(fields=['topic', 'updated_at', 'created_at'], name='post_thread_order_idx'),
+        ]
 
     def __str__(self):
         return self.message[:30]
 
     def get_absolute_url(self):
-        """Anchor link for this post, useful for 'last post' links"""
-        return reverse('topic_posts', kwargs={'pk': self.topic.board.pk, 'topic_pk': self.topic.pk}) + f"#post-{self.pk}"
+        """Permalink: redirects to the page of the thread showing this post"""
+        return reverse('post_permalink', kwargs={'pk': self.topic.board_id, 'post_pk': self.pk})
+
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # saves of other fields only (moves, edit stamps) keep the stored rendering
+        if update_fields is None or 'message' in update_fields:
+            self.message_html = render_message(self.message)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'message_html'}
+        super().save(*args, **kwargs)
 
     def get_message_as_markdown(self):
-        return mark_safe(markdown(self.message,safe_mode='escape'))
-    
+        # rows written before message_html existed, and archived posts, render on the fly
+        return mark_safe(self.message_html or render_message(self.message))
+
+    def get_author_posts_count(self):
+        """Posts the author wrote on this post's database; see set_author_posts_counts()"""
+        if not hasattr(self, 'author_posts_count'):
+            set_author_posts_counts([self])
+        return self.author_posts_count
+
+
+def set_author_posts_counts(posts):
+    """Count the posts of the authors of ``posts`` with one grouped query per database, for a whole page"""
+    by_db = {}
+    for post in posts:
+        by_db.setdefault(post._state.db or 'default', []).append(post)
+    for alias, page in by_db.items():
+        authors = Post.objects.using(alias).filter(created_by_id__in={post.created_by_id for post in page})
+        counts = dict(authors.values_list('created_by_id').annotate(models.Count('pk')).order_by())
+        for post in page:
+            post.author_posts_count = counts.get(post.created_by_id, 0)
+
+
+class TopicReadMark(models.Model):
+    """Read watermark: the highest post id of a topic the user has seen"""
+    user=models.ForeignKey(User,related_name='+',on_delete=models.CASCADE,db_constraint=False)
+    topic=models.ForeignKey(Topic,related_name='read_marks',on_delete=models.CASCADE)
+    last_read_post_id=models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic'], name='unique_topic_read_mark'),
+        ]
+
+
+class BoardReadMark(models.Model):
+    """'Mark board as read': one watermark covering every topic of the board"""
+    user=models.ForeignKey(User,related_name='+',on_delete=models.CASCADE,db_constraint=False)
+    board=models.ForeignKey(Board,related_name='read_marks',on_delete=models.CASCADE,db_constraint=False)
+    last_read_post_id=models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'board'], name='unique_board_read_mark'),
+        ]
+
+
+class Subscription(models.Model):
+    """A user following either a whole board or a single topic"""
+    user=models.ForeignKey(User,related_name='subscriptions',on_delete=models.CASCADE,db_constraint=False)
+    board=models.ForeignKey(Board,related_name='subscriptions',null=True,blank=True,on_delete=models.CASCADE,db_constraint=False)
+    topic=models.ForeignKey(Topic,related_name='subscriptions',null=True,blank=True,on_delete=models.CASCADE)
+    created_at=models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(board__isnull=True, topic__isnull=False) | models.Q(board__isnull=False, topic__isnull=True),
+                name='subscription_board_xor_topic',
+            ),
+            models.UniqueConstraint(fields=['user', 'board'], name='unique_board_subscription'),
+            models.UniqueConstraint(fields=['user', 'topic'], name='unique_topic_subscription'),
+        ]
+
+
+class ReplyNotification(models.Model):
+    """
+    Queue row written once per new post, whatever the number of followers.
+    The digest worker (boards/notifications.py) fans it out to subscribers.
+    """
+    post=models.ForeignKey(Post,related_name='+',on_delete=models.CASCADE)
+    created_at=models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedTopic(models.Model):
+    """Posts of a cold topic moved out of the Post table into one compressed blob"""
+    topic=models.OneToOneField(Topic,primary_key=True,related_name='archive',on_delete=models.CASCADE)
+    data=models.BinaryField()
+    post_count=models.PositiveIntegerField()
+    archived_at=models.DateTimeField(auto_now_add=True)
+    # id range of the archived posts, to find the archive of a post (permalinks)
+    first_post_id=models.BigIntegerField(null=True)
+    last_post_id=models.BigIntegerField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['first_post_id', 'last_post_id'], name='archive_post_range_idx'),
+        ]
+
+
+class PostRevision(models.Model):
+    """
+    One version of a post's message, stored compressed either in full
+    (snapshot) or as a delta against the previous revision.  See boards/revisions.py
+    """
+    post=models.ForeignKey(Post,related_name='revisions',on_delete=models.CASCADE)
+    number=models.PositiveIntegerField()
+    is_snapshot=models.BooleanField(default=False)
+    data=models.BinaryField()
+    created_at=models.DateTimeField()
+    created_by=models.ForeignKey(User,related_name='+',on_delete=models.DO_NOTHING,db_constraint=False)  # kept when a moderator is deleted
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'number'], name='unique_post_revision'),
+        ]
+
+
+class DeletionJob(models.Model):
+    """
+    A board, topic or user marked deleted and waiting for the deletion worker
+    to remove it and everything below it in batches (boards/deletion.py)
+    """
+    BOARD = 'board'
+    TOPIC = 'topic'
+    USER = 'user'
+    KIND_CHOICES = [(BOARD, 'Board'), (TOPIC, 'Topic'), (USER, 'User')]
+
+    kind=models.CharField(max_length=10,choices=KIND_CHOICES)
+    object_id=models.BigIntegerField()
+    board_id=models.BigIntegerField(null=True)  # topic jobs: the shard to look on
+    label=models.CharField(max_length=500)  # str() of the object, for progress reports
+    requested_by=models.ForeignKey(User,related_name='+',null=True,on_delete=models.SET_NULL)
+    created_at=models.DateTimeField(auto_now_add=True)
+    finished_at=models.DateTimeField(null=True)
+    deleted_rows=models.PositiveBigIntegerField(default=0)
+    step=models.CharField(max_length=100,blank=True)  # model being deleted right now
+    worker=models.CharField(max_length=100,blank=True)  # process_deletions running it
+    heartbeat_at=models.DateTimeField(null=True)  # last batch of that worker
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.label}'
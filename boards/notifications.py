@@ -0,0 +1,96 @@
+"""
+Subscriptions and reply digests.
+
+Posting only writes one ReplyNotification row, so a reply costs the same
+whether nobody or ten thousand people follow the topic.  ``send_digests`` (run
+periodically by ``manage.py send_digests``) drains the queue in batches: it
+loads the posts and the matching subscriptions with one query each, groups the
+posts per user and sends one digest email per user over a single connection.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+
+from . import sharding
+from .models import Post, ReplyNotification, Subscription
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def queue_reply(post):
+    ReplyNotification.objects.using(post._state.db).create(post=post)
+
+
+def _subscriptions(board, topic, write=False):
+    return Subscription.objects.using(sharding.db_for_board(board.pk if board else topic.board_id, write))
+
+
+def toggle_subscription(user, board=None, topic=None):
+    """Follow or unfollow; returns True when the user is now subscribed"""
+    subscriptions = _subscriptions(board, topic, write=True)
+    deleted, _ = subscriptions.filter(user=user, board=board, topic=topic).delete()
+    if deleted:
+        return False
+    subscriptions.create(user=user, board=board, topic=topic)
+    return True
+
+
+def is_subscribed(user, board=None, topic=None):
+    return _subscriptions(board, topic).filter(user=user, board=board, topic=topic).exists()
+
+
+def build_digests(posts):
+    """Map each subscribed user to the posts they should hear about"""
+    by_topic = defaultdict(list)
+    by_board = defaultdict(list)
+    for post in posts:
+        by_topic[post.topic_id].append(post)
+        by_board[post.topic.board_id].append(post)
+
+    subscriptions = Subscription.objects.using(posts.db).filter(
+        Q(topic_id__in=by_topic) | Q(board_id__in=by_board)
+    ).prefetch_related('user')
+
+    digests = defaultdict(dict)  # user -> {post pk: post}, following a topic and its board counts once
+    users = {}
+    for subscription in subscriptions:
+        user = users.setdefault(subscription.user_id, subscription.user)
+        matched = by_topic[subscription.topic_id] if subscription.topic_id else by_board[subscription.board_id]
+        for post in matched:
+            if post.created_by_id != user.pk:
+                digests[user][post.pk] = post
+    return {user: sorted(posts.values(), key=lambda post: post.pk) for user, posts in digests.items() if posts}
+
+
+def send_digests(batch_size=BATCH_SIZE, using='default'):
+    """Drain one batch of the queue of shard ``using``; returns the number of queue rows processed"""
+    queue = ReplyNotification.objects.using(using)
+    queued = list(queue.order_by('pk').values_list('pk', 'post_id')[:batch_size])
+    if not queued:
+        return 0
+    # boards and users live in the default database: prefetch rather than join
+    posts = Post.objects.using(using).filter(pk__in=[post_id for _, post_id in queued]).select_related('topic').prefetch_related('topic__board', 'created_by')
+    digests = build_digests(posts)
+
+    site_url = getattr(settings, 'SITE_URL', 'http://localhost:8000')
+    messages = [
+        EmailMessage(
+            subject=settings.EMAIL_SUBJECT_PREFIX + f'{len(user_posts)} new posts in topics you follow',
+            body=render_to_string('digest_email.txt', {'user': user, 'posts': user_posts, 'site_url': site_url}),
+            to=[user.email],
+        )
+        for user, user_posts in digests.items() if user.email
+    ]
+    sent = 0
+    if messages:
+        with get_connection() as connection:
+            sent = connection.send_messages(messages) or 0
+    queue.filter(pk__in=[pk for pk, _ in queued]).delete()
+    logger.info("Sent %s digests for %s queued posts", sent, len(queued))
+    return len(queued)
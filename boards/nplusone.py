@@ -0,0 +1,75 @@
+"""
+N+1 query detection.
+
+A ``Detector`` wraps the execution of every query on every database
+connection of the current thread.  It fingerprints each statement with the
+slow-query log's normalization (so the same query for different ids counts
+as one shape) and, when a shape runs for the second time, records where it
+came from: the code frame and the template tag or variable being rendered
+(see boards/slow_queries.py).  ``repeated()`` lists the shapes run more than
+``settings.NPLUSONE_THRESHOLD`` times: typically a query issued once per
+item of a list.
+
+NPlusOneMiddleware runs a detector around each request when
+``settings.NPLUSONE_DETECTION`` is set: ``'log'`` (staging) logs a warning
+per offending request, ``'raise'`` makes the request fail.  The test runner
+(boards/test_runner.py) turns on ``'raise'`` with ``--detect-nplusone``.
+Queries made by the content iterator of a streaming response run after the
+middleware returned and aren't counted.
+"""
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .slow_queries import normalize, origin
+
+DEFAULT_THRESHOLD = 5
+
+
+class NPlusOneError(AssertionError):
+    """A request ran the same query shape too many times"""
+
+
+class Detector:
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, query_context):
+        shape = normalize(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == 2:
+            # the loop issuing it is on the stack now
+            self.origins[shape] = origin(sys._getframe(1))
+        return execute(sql, params, many, query_context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def repeated(self):
+        """``(shape, count, code, template)`` of the shapes run more than ``threshold`` times"""
+        return [
+            (shape, count, *self.origins[shape])
+            for shape, count in self.counts.most_common() if count > self.threshold
+        ]
+
+    def report(self):
+        lines = []
+        for shape, count, code, template in self.repeated():
+            lines.append(f'{count} x {shape[:300]}')
+            lines.append(f'    from {code or "?"}' + (f' in {template}' if template else ''))
+        return '\n'.join(lines)
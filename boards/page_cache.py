@@ -0,0 +1,114 @@
+"""
+Shared page cache with hole punching.
+
+A page is rendered once for every reader and cached under its path, the
+query parameters the view reads (``page_params``) and a version naming what
+the page shows: the board index version for the home page, the versions of
+its board and topic for a thread, bumped by the writes to them (see
+boards/signals.py).  Other query strings share the entry, so they can neither
+fill the cache nor get around it.  The few parts that depend on the reader (navigation,
+Edit and History links, Follow button, CSRF tokens) are written with the
+``{% hole %}`` tag of the ``holes`` library: while the shared copy is being
+rendered the tag leaves a marker and records the fragment template and its
+arguments; ``respond()`` then renders those small fragments for the current
+request and splices them in.  A logged-in reader costs a handful of fragment
+renders instead of the whole page, anonymous ones none at all.
+
+Markers carry a random token drawn for each cached copy, so text in a post
+can't pass for one.  Outside cached views the tag renders the fragment in
+place, so the fragments can be used from any template.
+"""
+import hashlib
+import re
+import secrets
+import time
+from typing import NamedTuple
+
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import caching, fragments
+
+PAGE_TTL = 60  # seconds; writes change the key, this only bounds other staleness (user names...)
+HOLES_VAR = 'page_holes'  # context variable the hole tag records into
+
+
+class Holes:
+    """The fragments left out of a page being rendered for the cache"""
+
+    def __init__(self):
+        self.token = secrets.token_hex(8)
+        self.fragments = []
+
+    def punch(self, template_name, kwargs):
+        self.fragments.append((template_name, kwargs))
+        return mark_safe(f'<!--hole:{self.token}:{len(self.fragments) - 1}-->')
+
+
+class Page(NamedTuple):
+    content: str
+    content_type: str
+    token: str
+    fragments: tuple
+    data: dict  # whatever the view needs to handle later hits (ids, ...)
+
+
+def _version_key(scope):
+    return f'boards:pages:version:{scope}'
+
+
+def version(scope):
+    """Version of the pages showing ``scope`` ('board:1', 'topic:2'...)"""
+    cache = caching.get_cache()
+    current = cache.get(_version_key(scope))
+    if current is None:
+        # never set or evicted: a new stamp leaves the old pages behind
+        cache.add(_version_key(scope), time.time_ns(), None)
+        current = cache.get(_version_key(scope))
+    return current
+
+
+def bump(scope):
+    cache = caching.get_cache()
+    try:
+        cache.incr(_version_key(scope))
+    except ValueError:
+        cache.add(_version_key(scope), time.time_ns(), None)
+
+
+def _param(value):
+    # ?page=01 is page 1
+    return str(int(value)) if value.isdigit() else value
+
+
+def page_key(request, version, params=()):
+    query = '&'.join(f'{name}={_param(request.GET[name])}' for name in params if name in request.GET)
+    path = hashlib.md5(f'{request.path}?{query}'.encode(), usedforsecurity=False).hexdigest()
+    kind = 'fragment' if fragments.requested(request) else 'page'
+    return f'boards:{kind}:{version}:{path}'
+
+
+def lookup(key):
+    return caching.get_cache().get(key)
+
+
+def store(key, response, data):
+    """Cache a rendered TemplateResponse whose context carried a Holes"""
+    holes = response.context_data[HOLES_VAR]
+    page = Page(response.content.decode(response.charset), response['Content-Type'], holes.token, tuple(holes.fragments), data)
+    caching.get_cache().set(key, page, PAGE_TTL)
+    return page
+
+
+def fill(page, request, context):
+    """The page with its fragments rendered for ``request``"""
+    def render(match):
+        template_name, kwargs = page.fragments[int(match.group(1))]
+        return render_to_string(template_name, {**context, **kwargs}, request)
+
+    return re.sub(rf'<!--hole:{page.token}:(\d+)-->', render, page.content)
+
+
+def respond(request, page, context):
+    return HttpResponse(fill(page, request, context), content_type=page.content_type)
@@ -0,0 +1,54 @@
+"""
+Page of a post within its paginated thread.
+
+A thread page shows the first post followed by ``per_page`` replies in
+REPLY_ORDERING.  A reply's page comes from its rank: the number of replies
+listed before it.  An OR across the ordering columns would defeat the
+(topic, updated_at, created_at) index, so the rank is summed from three
+counts that are each one range of it: replies edited later (or edited at
+all, for an unedited reply), replies with the same ``updated_at`` created
+later, and ties on both broken by pk.  Archived threads have no index and are
+ranked from the blob.
+"""
+from . import archive
+from .models import Post
+
+
+def rank(post):
+    """Position of a reply in its thread, starting at 0; None for the first post"""
+    posts = Post.objects.using(post._state.db).filter(topic_id=post.topic_id)
+    first_post_id = posts.order_by('pk').values_list('pk', flat=True).first()
+    if post.pk == first_post_id:
+        return None
+    replies = posts.exclude(pk=first_post_id)
+    if post.updated_at is None:
+        # edited posts come first, then unedited ones newest first
+        edited_later = replies.filter(updated_at__isnull=False)
+        same_edit = replies.filter(updated_at__isnull=True)
+    else:
+        edited_later = replies.filter(updated_at__gt=post.updated_at)
+        same_edit = replies.filter(updated_at=post.updated_at)
+    ranges = (
+        edited_later,
+        same_edit.filter(created_at__gt=post.created_at),
+        same_edit.filter(created_at=post.created_at, pk__gt=post.pk),
+    )
+    # one round trip
+    first, *others = (queryset.values('pk') for queryset in ranges)
+    return first.union(*others, all=True).count()
+
+
+def page_number(post, per_page):
+    """Page of the thread showing ``post``, starting at 1"""
+    position = rank(post)
+    return 1 if position is None else position // per_page + 1
+
+
+def archived_page_number(topic, post_id, per_page):
+    """page_number() of post ``post_id`` in the archived thread of ``topic``"""
+    first, *replies = archive.load_posts(topic)
+    if first.pk == post_id:
+        return 1
+    archive.sort_replies(replies)
+    position = next(i for i, reply in enumerate(replies) if reply.pk == post_id)
+    return position // per_page + 1
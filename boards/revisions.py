@@ -0,0 +1,145 @@
+"""
+Post edit history.
+
+Revision 0 is the original message and revision n the message after the nth
+edit.  Every SNAPSHOT_INTERVAL-th revision (0 included) stores the full text;
+the others store a delta against the revision before them.  Both are zlib
+compressed.  Rebuilding a revision therefore starts at the nearest snapshot
+at or below it and applies fewer than SNAPSHOT_INTERVAL deltas.
+
+A delta is a list of operations that rebuild the new text from the old one:
+``[start, end]`` copies ``old[start:end]`` and a string is inserted as is.
+It comes from a word diff, computed before the transaction storing the edit;
+an edit the diff can't handle cheaply is stored as a snapshot.
+"""
+import difflib
+import itertools
+import json
+import re
+import zlib
+
+from django.utils.dateparse import parse_datetime
+
+from .models import PostRevision
+
+SNAPSHOT_INTERVAL = 10
+MAX_DELTA_WORDS = 1000  # bounds the diff's work; longer texts are stored whole
+MIN_DELTA_RATIO = 0.5  # below this similarity a delta saves little over a snapshot
+
+_WORDS = re.compile(r'\S+\s*|\s+')
+
+
+def make_delta(old, new):
+    """
+    Operations rebuilding ``new`` from ``old``, or None when a delta isn't
+    worth it (texts too long or too different): store a snapshot then.
+    """
+    # words, not characters: a character diff is quadratic on repetitive text
+    a, b = _WORDS.findall(old), _WORDS.findall(new)
+    if max(len(a), len(b)) > MAX_DELTA_WORDS:
+        return None
+    matcher = difflib.SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < MIN_DELTA_RATIO or matcher.quick_ratio() < MIN_DELTA_RATIO:
+        return None
+    starts = list(itertools.accumulate(map(len, a), initial=0))  # offset of each word in old
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([starts[i1], starts[i2]])
+        elif j2 > j1:  # replace or insert
+            ops.append(''.join(b[j1:j2]))
+    return ops
+
+
+def apply_delta(old, ops):
+    return ''.join(old[op[0]:op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def record_edit(post, old_message, user, when, delta=None):
+    """
+    Store the new ``post.message`` as a revision.  ``old_message`` is the text
+    being replaced, i.e. the latest revision, so no history is read back.
+    ``delta`` is ``make_delta(old_message, post.message)``, None for a snapshot.
+    """
+    last = post.revisions.order_by('-number').values_list('number', flat=True).first()
+    if last is None:
+        # first edit: keep the original message as revision 0
+        PostRevision.objects.using(post._state.db).create(
+            post=post, number=0, is_snapshot=True, data=_pack(old_message),
+            created_at=post.created_at, created_by_id=post.created_by_id,
+        )
+        last = 0
+    number = last + 1
+    is_snapshot = delta is None or number % SNAPSHOT_INTERVAL == 0
+    return PostRevision.objects.using(post._state.db).create(
+        post=post, number=number, is_snapshot=is_snapshot,
+        data=_pack(post.message if is_snapshot else delta),
+        created_at=when, created_by=user,
+    )
+
+
+def _replay(revisions):
+    """Yield (revision, text) for consecutive revisions starting at a snapshot"""
+    text = None
+    for revision in revisions:
+        value = _unpack(revision.data)
+        text = value if revision.is_snapshot else apply_delta(text, value)
+        yield revision, text
+
+
+def get_revision_text(post, number):
+    """Message of ``post`` at revision ``number``, touching at most SNAPSHOT_INTERVAL rows"""
+    base = number - number % SNAPSHOT_INTERVAL
+    revisions = post.revisions.filter(number__gte=base, number__lte=number).order_by('number')
+    text = None
+    for _, text in _replay(revisions):
+        pass
+    return text
+
+
+def history(post):
+    """Every revision of ``post`` with its unified diff against the previous one"""
+    entries = []
+    previous = ''
+    for revision, text in _replay(post.revisions.prefetch_related('created_by').order_by('number')):
+        diff = difflib.unified_diff(
+            previous.splitlines(), text.splitlines(),
+            f'revision {revision.number - 1}', f'revision {revision.number}', lineterm='',
+        )
+        entries.append({'revision': revision, 'text': text, 'diff': list(diff)[2:] if revision.number else []})
+        previous = text
+    return entries
+
+
+def dump(revisions):
+    """
+    ``{post_id: rows}`` of plain JSON rows for the ``revisions`` queryset, to
+    keep edit history in an archive blob; ``load()`` turns rows back into
+    revisions.
+    """
+    dumped = {}
+    for revision in revisions.order_by('post_id', 'number'):
+        dumped.setdefault(revision.post_id, []).append([
+            revision.number, revision.is_snapshot, _unpack(revision.data),
+            revision.created_at.isoformat(), revision.created_by_id,
+        ])
+    return dumped
+
+
+def load(post_id, rows):
+    """Unsaved PostRevisions of ``post_id`` from ``dump()`` rows"""
+    return [
+        PostRevision(
+            post_id=post_id, number=number, is_snapshot=is_snapshot, data=_pack(value),
+            created_at=parse_datetime(created_at), created_by_id=created_by_id,
+        )
+        for number, is_snapshot, value, created_at, created_by_id in rows
+    ]
@@ -0,0 +1,216 @@
+"""
+Board-based sharding.
+
+Boards, users and the BoardPlacement table live in the default database.
+Every other model of this app (topics, posts, read marks, subscriptions, ...)
+lives on the shard of the board it belongs to.  BoardPlacement maps a board to
+a database alias; boards without a placement row live on 'default', so with no
+extra databases configured nothing changes.
+
+BoardShardRouter sends queries that carry an instance hint (``instance.save()``,
+related managers such as ``board.topics`` or ``topic.posts``) to the right
+shard.  Queries without a hint, ``Model.objects.create()`` included, must say
+where they go, with ``Model.objects.using(db_for_board(board_id))`` or
+``using(topic._state.db)``.
+
+Every shard would hand out its own auto-increment ids, so topic and post ids
+would repeat across shards: a move would collide with the target's rows, and
+cache keys and live channels named after a topic would be shared by two
+topics.  New topics and posts take their id from ``next_id()`` instead (a
+pre_save receiver, see signals.py), one sequence kept in the default database
+for every shard and moved above the rows of each database it migrates.  Code
+bulk-creating them must set their ids the same way.  The other rows of a
+board aren't referenced by id from anywhere else and keep their shard's own
+ids; a move gives them new ones.
+
+Placements are cached for PLACEMENT_TTL seconds.  ``move_board`` relies on
+that: it marks the board read-only, waits one TTL so every worker has seen it,
+copies the rows, flips the alias, waits again and deletes the source rows.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, transaction
+from django.db.models import F, Max
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_TTL = 30  # seconds
+
+# models of this app that stay in the default database
+GLOBAL_MODELS = {'board', 'boardplacement', 'deletionjob', 'idsequence'}
+
+
+class BoardReadOnly(Exception):
+    """The board is being moved between shards and does not accept writes"""
+
+
+def shard_aliases():
+    return list(getattr(settings, 'BOARD_SHARDS', ['default']))
+
+
+def is_board_scoped(model):
+    return model._meta.app_label == 'boards' and model._meta.model_name not in GLOBAL_MODELS
+
+
+def _placement_key(board_id):
+    return f'boards:placement:{board_id}'
+
+
+def placement(board_id):
+    """(alias, read_only) for a board"""
+    key = _placement_key(board_id)
+    value = cache.get(key)
+    if value is None:
+        BoardPlacement = apps.get_model('boards', 'BoardPlacement')
+        row = BoardPlacement.objects.using('default').filter(board_id=board_id).values_list('alias', 'read_only').first()
+        value = tuple(row) if row else ('default', False)
+        cache.set(key, value, PLACEMENT_TTL)
+    return value
+
+
+def placements(board_ids):
+    """``{board_id: placement}`` for many boards: one cache round trip and at most one query"""
+    keys = {board_id: _placement_key(board_id) for board_id in board_ids}
+    cached = cache.get_many(keys.values())
+    values = {board_id: cached[key] for board_id, key in keys.items() if key in cached}
+    missing = [board_id for board_id in keys if board_id not in values]
+    if missing:
+        BoardPlacement = apps.get_model('boards', 'BoardPlacement')
+        rows = BoardPlacement.objects.using('default').filter(board_id__in=missing).values_list('board_id', 'alias', 'read_only')
+        found = {board_id: (alias, read_only) for board_id, alias, read_only in rows}
+        fresh = {board_id: found.get(board_id, ('default', False)) for board_id in missing}
+        cache.set_many({keys[board_id]: value for board_id, value in fresh.items()}, PLACEMENT_TTL)
+        values.update(fresh)
+    return values
+
+
+def forget(board_id):
+    cache.delete(_placement_key(board_id))
+
+
+def db_for_board(board_id, write=False):
+    alias, read_only = placement(board_id)
+    if write and read_only:
+        raise BoardReadOnly(board_id)
+    return alias
+
+
+def boards_by_shard(board_ids):
+    shards = {}
+    for board_id, (alias, _) in placements(board_ids).items():
+        shards.setdefault(alias, []).append(board_id)
+    return shards
+
+
+def deleted_board_ids():
+    """
+    Boards marked deleted whose rows may still be on their shard until the
+    deletion worker is done.  Boards are in the default database, so a shard
+    query can't join them: site-wide listings exclude these ids instead.
+    """
+    Board = apps.get_model('boards', 'Board')
+    return list(Board.all_objects.filter(deleted_at__isnull=False).values_list('pk', flat=True))
+
+
+SEQUENCED_MODELS = ('Topic', 'Post')  # ids handed out by next_id()
+
+
+def next_id(model):
+    """A primary key for a new ``model`` row that is unused on every shard"""
+    IdSequence = apps.get_model('boards', 'IdSequence')
+    sequence = IdSequence.objects.using('default').filter(name=model._meta.label)
+    # the UPDATE locks the row until the caller's transaction ends, so the read sees our own increment
+    with transaction.atomic(using='default', savepoint=False):
+        if not sequence.update(last_id=F('last_id') + 1):
+            # not seeded by migrate (see seed_id_sequences), so only default holds rows
+            last = model._base_manager.using('default').aggregate(last=Max('pk'))['last'] or 0
+            IdSequence.objects.using('default').get_or_create(name=model._meta.label, defaults={'last_id': last})
+            sequence.update(last_id=F('last_id') + 1)
+        return sequence.values_list('last_id', flat=True).get()
+
+
+def seed_id_sequences(using, **kwargs):
+    """
+    post_migrate receiver: move the sequences above the ids already on the
+    migrated database, so shards holding rows from before next_id() existed
+    don't get their ids handed out again.  Migrate 'default' first.
+    """
+    if 'boards_idsequence' not in connections['default'].introspection.table_names():
+        return
+    IdSequence = apps.get_model('boards', 'IdSequence')
+    for name in SEQUENCED_MODELS:
+        model = apps.get_model('boards', name)
+        last = model._base_manager.using(using).aggregate(last=Max('pk'))['last'] or 0
+        sequence, _ = IdSequence.objects.using('default').get_or_create(name=model._meta.label)
+        if sequence.last_id < last:
+            IdSequence.objects.using('default').filter(pk=sequence.pk, last_id__lt=last).update(last_id=last)
+
+
+def map_shards(func, shards):
+    """
+    Run ``func(alias, items)`` for every ``{alias: items}`` entry and return
+    ``{alias: result}``.  Several shards are queried in parallel threads, each
+    closing its own connection when done, unless the caller is inside a
+    transaction: other threads could not see its uncommitted rows.
+    """
+    if len(shards) <= 1 or any(connections[alias].in_atomic_block for alias in shards):
+        return {alias: func(alias, items) for alias, items in shards.items()}
+
+    def run(alias, items):
+        try:
+            return func(alias, items)
+        finally:
+            connections[alias].close()
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        futures = {alias: executor.submit(run, alias, items) for alias, items in shards.items()}
+        return {alias: future.result() for alias, future in futures.items()}
+
+
+def _instance_db(instance):
+    """Shard of a board-scoped instance, following cached relations up to its board"""
+    Board = apps.get_model('boards', 'Board')
+    if isinstance(instance, Board):
+        return db_for_board(instance.pk) if instance.pk else None
+    if instance._state.db:
+        return instance._state.db
+    if getattr(instance, 'board_id', None):
+        return db_for_board(instance.board_id)
+    for name in ('topic', 'post'):
+        try:
+            field = instance._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.is_cached(instance):
+            related = field.get_cached_value(instance)
+            if related is not None:
+                return _instance_db(related)
+    return None
+
+
+class BoardShardRouter:
+    def db_for_read(self, model, **hints):
+        if not is_board_scoped(model):
+            return 'default'
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if is_board_scoped(instance.__class__) or isinstance(instance, apps.get_model('boards', 'Board')):
+            return _instance_db(instance)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # boards and users are referenced from every shard
+        if is_board_scoped(obj1.__class__) or is_board_scoped(obj2.__class__):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # every database gets every table, unused ones simply stay empty
+        return None
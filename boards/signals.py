@@ -0,0 +1,51 @@
+"""
+Mark cached figures stale when boards, topics or posts are written (see
+boards/caching.py).  Queryset updates, bulk inserts and post deletions don't
+send these signals (a post_delete receiver on Post would cost a topic query
+per deleted post), so the code doing them calls ``expire_board`` or
+``expire_topic`` itself.
+
+New topics and posts get their id from the sequence shared by every shard
+before they are saved (see boards/sharding.py).
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import board_index, caching, page_cache, sharding, summaries, trending
+from .models import Board, Post, Topic, board_stats_key, topic_stats_key
+
+
+def expire_board(board_id):
+    caching.expire(board_stats_key(board_id), summaries.CACHE_KEY, trending.CACHE_KEY)
+    board_index.bump()
+    page_cache.bump(f'board:{board_id}')
+
+
+def expire_topic(topic_id, board_id):
+    caching.expire(topic_stats_key(topic_id), board_stats_key(board_id), summaries.CACHE_KEY, trending.CACHE_KEY)
+    board_index.bump()
+    page_cache.bump(f'topic:{topic_id}')
+
+
+@receiver(pre_save, sender=Topic)
+@receiver(pre_save, sender=Post)
+def assign_id(sender, instance, raw=False, **kwargs):
+    if instance.pk is None and not raw:
+        instance.pk = sharding.next_id(sender)
+
+
+@receiver(post_save, sender=Board)
+@receiver(post_delete, sender=Board)
+def board_changed(sender, instance, **kwargs):
+    expire_board(instance.pk)
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def topic_changed(sender, instance, **kwargs):
+    expire_topic(instance.pk, instance.board_id)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    expire_topic(instance.topic_id, instance.topic.board_id)
@@ -0,0 +1,98 @@
+"""
+Topic sitemaps.
+
+Sitemap pages are keyset pages of one shard: a page is named after the last
+topic pk of the page before it (0 for the first) and lists the next MAX_URLS
+topics in pk order.  Topic ids come from the sequence shared by every shard,
+so fixed pk windows would be mostly empty on each of them; keyset pages are
+full whatever the ids.  A page never exceeds the 50,000 URL limit of the
+protocol, the index finds where each page starts with one index lookup per
+page, and every page is one keyset-ordered range scan streamed in BATCH_SIZE
+chunks, whatever the size of the forum.
+
+The ``generate_sitemaps`` command writes the same URLs to gzip files for the
+web server to serve statically, filling each file up to MAX_URLS.
+"""
+from django.urls import reverse
+
+from . import sharding
+from .models import Topic
+
+MAX_URLS = 50000  # per sitemap page, the protocol's limit
+BATCH_SIZE = 2000
+MAX_AGE = 6 * 60 * 60  # seconds crawlers and proxies may cache the views
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+
+def topic_url_format():
+    """``str.format`` pattern of topic URLs: reverse() once instead of once per topic"""
+    return reverse('topic_posts', kwargs={'pk': 1, 'topic_pk': 2}).replace('/1/', '/{board}/', 1).replace('/2/', '/{topic}/', 1)
+
+
+def live_topics(alias):
+    return Topic.objects.using(alias).exclude(board_id__in=sharding.deleted_board_ids()).order_by('pk')
+
+
+def topic_rows(alias, after=0, limit=None):
+    """``(pk, board_id, last_update)`` of the first ``limit`` live topics with ``pk > after``, in pk order"""
+    topics = live_topics(alias)
+    last = after
+    left = limit
+    while left is None or left > 0:
+        size = BATCH_SIZE if left is None else min(BATCH_SIZE, left)
+        rows = list(topics.filter(pk__gt=last).values_list('pk', 'board_id', 'last_update')[:size])
+        yield from rows
+        if len(rows) < size:
+            return
+        last = rows[-1][0]
+        if left is not None:
+            left -= len(rows)
+
+
+def url_entries(rows, base_url):
+    url_format = base_url + topic_url_format()
+    for pk, board_id, last_update in rows:
+        url = url_format.format(board=board_id, topic=pk)
+        yield f'<url><loc>{url}</loc><lastmod>{last_update.isoformat()}</lastmod></url>\n'
+
+
+def page_starts(alias):
+    """The pk each sitemap page of the shard starts after"""
+    topics = live_topics(alias).values_list('pk', flat=True)
+    if not topics.exists():
+        return
+    after = 0
+    while True:
+        yield after
+        # the last pk of this page and the first of the next one, if any
+        bounds = list(topics.filter(pk__gt=after)[MAX_URLS - 1:MAX_URLS + 1])
+        if len(bounds) < 2:
+            return
+        after = bounds[0]
+
+
+def pages():
+    """``(shard number, pk the page starts after)`` of every sitemap page"""
+    for shard, alias in enumerate(sharding.shard_aliases()):
+        for after in page_starts(alias):
+            yield shard, after
+
+
+def index_lines(locations):
+    yield XML_HEADER + INDEX_OPEN
+    for location in locations:
+        yield f'<sitemap><loc>{location}</loc></sitemap>\n'
+    yield INDEX_CLOSE
+
+
+def page_lines(shard, after, base_url):
+    """XML of one sitemap page, generated as it is streamed"""
+    alias = sharding.shard_aliases()[shard]
+    yield XML_HEADER + URLSET_OPEN
+    yield from url_entries(topic_rows(alias, after, MAX_URLS), base_url)
+    yield URLSET_CLOSE
@@ -0,0 +1,122 @@
+"""
+Slow-query log.
+
+``install`` adds ``record`` to the execute wrappers of every database
+connection when it opens (see apps.py), so the queries of views, templates,
+commands and workers are all timed.  A query slower than
+``settings.SLOW_QUERY_THRESHOLD`` seconds is logged to the
+``boards.slow_queries`` logger as one JSON line with:
+
+- its duration and normalized SQL (literals and IN lists folded, so the same
+  statement with different values groups together);
+- its origin: the innermost frame of our own code that issued it (a model
+  method, a view...) and, when it ran while a template was rendered, the
+  template and the tag or variable being rendered;
+- the path, URL name and id of the request (boards/context.py).
+
+The logger writes through a QueuedFileHandler (settings.LOGGING), so logging
+a slow query never adds disk I/O to the request.  ``manage.py slow_queries``
+sums the log up by statement and origin.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from django.conf import settings
+from django.template.base import Node, TokenType
+
+from . import context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.1  # seconds
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.DOTALL)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_TOKEN_FORMATS = {TokenType.VAR: '{{{{ {} }}}}', TokenType.BLOCK: '{{% {} %}}'}
+
+
+def normalize(sql):
+    sql = _COMMENTS.sub('', sql)
+    sql = _LITERALS.sub('?', sql)
+    sql = _LISTS.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+# our frames that only pass the query, the request or the command through
+_PASS_THROUGH = (
+    'boards/slow_queries.py', 'boards/sql_comments.py', 'boards/nplusone.py', 'boards/middleware.py', 'manage.py',
+)
+
+
+def _is_ours(filename):
+    if not filename.startswith(str(settings.BASE_DIR)) or 'site-packages' in filename:
+        return False
+    return os.path.relpath(filename, settings.BASE_DIR) not in _PASS_THROUGH
+
+
+def origin(frame):
+    """``(code, template)`` where the query issued from ``frame`` comes from; either may be None"""
+    code = template = None
+    while frame is not None and (code is None or template is None):
+        if code is None and _is_ours(frame.f_code.co_filename):
+            path = os.path.relpath(frame.f_code.co_filename, settings.BASE_DIR)
+            # co_qualname is new in Python 3.11
+            name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+            code = f'{path}:{frame.f_lineno} {name}'
+        node = frame.f_locals.get('self') if frame.f_code.co_name == 'render_annotated' else None
+        if template is None and isinstance(node, Node) and node.token is not None:
+            # line numbers don't survive template minification, the tag's text does
+            text = _TOKEN_FORMATS.get(node.token.token_type, '{}').format(node.token.contents)
+            template = f'{node.origin.template_name or node.origin.name} {text}'
+        frame = frame.f_back
+    return code, template
+
+
+def record(execute, sql, params, many, query_context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, query_context)
+    finally:
+        duration = time.perf_counter() - start
+        if duration >= getattr(settings, 'SLOW_QUERY_THRESHOLD', DEFAULT_THRESHOLD):
+            code, template = origin(sys._getframe(1))
+            request = context.current()
+            logger.info(json.dumps({
+                'duration': round(duration, 6),
+                'sql': normalize(sql),
+                'db': query_context['connection'].alias,
+                'origin': code,
+                'template': template,
+                'path': request.path if request else None,
+                'url_name': request.url_name if request else None,
+                'request_id': request.request_id if request else None,
+            }))
+
+
+def summarize(lines, by=('sql', 'origin', 'template')):
+    """Log lines grouped on the ``by`` fields, the most total time first"""
+    groups = {}
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # a line cut short by a rotation
+        key = tuple(entry.get(field) for field in by)
+        group = groups.setdefault(key, {**dict(zip(by, key)), 'count': 0, 'total': 0.0, 'max': 0.0, 'url_names': set()})
+        group['count'] += 1
+        group['total'] += entry['duration']
+        group['max'] = max(group['max'], entry['duration'])
+        if entry.get('url_name'):
+            group['url_names'].add(entry['url_name'])
+    return sorted(groups.values(), key=lambda group: group['total'], reverse=True)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
@@ -0,0 +1,31 @@
+"""
+Request ids in SQL.
+
+``install`` (a connection_created receiver, see apps.py) adds ``comment`` to
+the execute wrappers of every connection.  While a request is served, each
+statement gets ``/* request_id=..., view=... */`` appended, so the database's
+own slow query log and activity views point back to the request and the view
+(boards/context.py); the same id is in the application's log lines.
+Statements of commands and workers are left alone.  ``SQL_COMMENTS = False``
+turns it off.
+
+The slow-query log's wrapper is installed first, so it runs outside this one
+and logs statements without the comment.
+"""
+from django.conf import settings
+
+from . import context
+
+
+def comment(execute, sql, params, many, query_context):
+    request = context.current()
+    if request is not None:
+        # both values are plain tokens: ids are checked by the middleware, url names are ours
+        sql = f'{sql} /* request_id={request.request_id}, view={request.url_name or "-"} */'
+    return execute(sql, params, many, query_context)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if getattr(settings, 'SQL_COMMENTS', True) and comment not in connection.execute_wrappers:
+        connection.execute_wrappers.append(comment)
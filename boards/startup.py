@@ -0,0 +1,64 @@
+"""
+Cold-start measurements.
+
+Workers are started and stopped by the autoscaler, so the time from process
+start to the first response matters.  ``measure()`` runs a fresh interpreter
+with ``-X importtime``, times ``django.setup()`` and, optionally, a first
+request, and returns the import tree.  The ``profile_startup`` command prints
+it; the test suite checks setup against SETUP_BUDGET and which modules it
+imports: none of LAZY_MODULES, and the apps' admin modules, which
+autodiscover() loads so that ``manage.py check`` validates the ModelAdmin
+classes.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+SETUP_BUDGET = 1.5  # seconds; generous, the test only catches real regressions
+# heavy modules that must be imported on first use, not by django.setup()
+LAZY_MODULES = ('markdown', 'django.contrib.syndication.views')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - start
+loaded = sorted(sys.modules)
+first_request = status = None
+if sys.argv[1]:
+    from django.conf import settings
+    from django.test import Client
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host.strip('.*')]
+    start = time.perf_counter()
+    status = Client(HTTP_HOST=hosts[0] if hosts else 'localhost').get(sys.argv[1]).status_code
+    first_request = time.perf_counter() - start
+print(json.dumps({'setup': setup, 'first_request': first_request, 'status': status, 'loaded': loaded}))
+"""
+
+
+def parse_importtime(lines):
+    """``(module, self seconds, cumulative seconds, depth)`` for each line of ``-X importtime`` output"""
+    imports = []
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return imports
+
+
+def measure(url=''):
+    """Start a fresh interpreter, set Django up and optionally request ``url`` in it"""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'myproject.settings')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, url],
+        capture_output=True, text=True, env=env, cwd=settings.BASE_DIR, check=True,
+    )
+    timings = json.loads(result.stdout.splitlines()[-1])
+    timings['imports'] = parse_importtime(result.stderr.splitlines())
+    return timings
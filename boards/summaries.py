@@ -0,0 +1,56 @@
+"""
+Board index figures (topics, posts and last post date per board).
+
+The topics of different boards may live on different shards, so the figures
+are computed with one grouped query per shard, the shards running in parallel.
+The figures of every board are cached together under CACHE_KEY for the home
+page (see boards/caching.py); writes mark them stale (boards/signals.py).
+"""
+from django.db.models import Count, Max
+
+from . import caching, sharding
+from .models import Board, Post, Topic
+
+CACHE_KEY = 'boards:summaries'
+CACHE_TTL = 60
+
+EMPTY = {'topics_count': 0, 'posts_count': 0, 'last_post_at': None}
+
+
+def _shard_summary(alias, board_ids):
+    topics = dict(
+        Topic.objects.using(alias).filter(board_id__in=board_ids)
+        .values_list('board_id').annotate(Count('pk')).order_by()
+    )
+    posts = {
+        board_id: (count, last_post_at)
+        for board_id, count, last_post_at in Post.objects.using(alias).filter(topic__board_id__in=board_ids, topic__deleted_at__isnull=True)
+        .values_list('topic__board_id').annotate(Count('pk'), Max('created_at')).order_by()
+    }
+    return {
+        board_id: {
+            'topics_count': topics.get(board_id, 0),
+            'posts_count': posts.get(board_id, (0, None))[0],
+            'last_post_at': posts.get(board_id, (0, None))[1],
+        }
+        for board_id in board_ids
+    }
+
+
+def _all_summaries():
+    board_ids = Board.objects.values_list('pk', flat=True)
+    summaries = {}
+    for shard in sharding.map_shards(_shard_summary, sharding.boards_by_shard(board_ids)).values():
+        summaries.update(shard)
+    return summaries
+
+
+def summarize_boards(boards):
+    """Set ``topics_count``, ``posts_count`` and ``last_post_at`` on each board"""
+    boards = list(boards)
+    summaries = caching.get_or_compute(CACHE_KEY, _all_summaries, CACHE_TTL)
+    for board in boards:
+        # a board created since the last refresh has no figures yet
+        for name, value in summaries.get(board.pk, EMPTY).items():
+            setattr(board, name, value)
+    return boards
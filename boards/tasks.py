@@ -0,0 +1,15 @@
+"""Background tasks of the boards app, run by ``manage.py runworker`` (see tasks/queue.py)"""
+from django.utils.dateparse import parse_datetime
+
+from tasks.queue import task
+
+from . import trending
+from .models import Topic
+
+
+@task
+def record_reply(db, topic_pk, replied_at):
+    """Hot score of a topic that was replied to at ``replied_at`` (ISO 8601)"""
+    topic = Topic.all_objects.using(db).filter(pk=topic_pk).first()
+    if topic is not None:
+        trending.score_reply(topic, parse_datetime(replied_at))
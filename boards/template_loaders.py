@@ -0,0 +1,50 @@
+"""
+Template loader that minifies HTML templates when they are loaded.
+
+Wrapped in the cached loader, each template, and so each fragment included in
+a page, is minified once per process rather than once per response.  Only what
+browsers ignore is removed: indentation and trailing blanks on each line, blank
+lines, and HTML comments.  Line breaks stay, so inline text keeps its spacing,
+and <pre>, <textarea> and <script> blocks are left untouched.
+"""
+import re
+
+from django.template import Origin
+from django.template.loaders.base import Loader as BaseLoader
+
+PRESERVE = re.compile(r'(<(?:pre|textarea|script)\b.*?</(?:pre|textarea|script)>)', re.S | re.I)
+# comments holding template tags are kept: removing them would unbalance blocks
+COMMENT = re.compile(r'<!--(?!\[if)(?:(?!{%).)*?-->', re.S)
+LINE_BLANKS = re.compile(r'^[ \t]+|[ \t]+$', re.M)
+BLANK_LINES = re.compile(r'\n{2,}')
+
+
+def minify(source):
+    parts = PRESERVE.split(source)
+    for i in range(0, len(parts), 2):
+        part = COMMENT.sub('', parts[i])
+        part = LINE_BLANKS.sub('', part)
+        parts[i] = BLANK_LINES.sub('\n', part)
+    return ''.join(parts)
+
+
+class MinifyingLoader(BaseLoader):
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            for origin in loader.get_template_sources(template_name):
+                minified = Origin(name=origin.name, template_name=origin.template_name, loader=self)
+                minified.source = origin
+                yield minified
+
+    def get_contents(self, origin):
+        contents = origin.source.loader.get_contents(origin.source)
+        return minify(contents) if origin.template_name.endswith('.html') else contents
+
+    def reset(self):
+        for loader in self.loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
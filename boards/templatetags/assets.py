@@ -0,0 +1,28 @@
+import hashlib
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _digest(path):
+    found = finders.find(path)
+    if found is None:
+        return None
+    with open(found, 'rb') as file:
+        return hashlib.md5(file.read(), usedforsecurity=False).hexdigest()[:12]
+
+
+@register.simple_tag
+def fingerprint(path):
+    """
+    Static URL with a hash of the file's content, so browsers and proxies can
+    cache it for good and still get a new version after every change.
+    Usage in template: {% fingerprint 'css/boardhub.css' %}
+    """
+    digest = _digest(path)
+    return f'{static(path)}?v={digest}' if digest else static(path)
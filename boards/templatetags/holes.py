@@ -0,0 +1,20 @@
+from django import template
+from django.template.loader import render_to_string
+
+from ..page_cache import HOLES_VAR
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **kwargs):
+    """
+    Per-reader fragment of a shared page (see boards/page_cache.py).  The
+    fragment only sees its arguments and the context processors' variables
+    (user, csrf_token...), plus the view's personal context in cached pages.
+    Usage in template: {% hole 'includes/personal/post_edit.html' post_id=post.pk %}
+    """
+    holes = context.get(HOLES_VAR)
+    if holes is not None:
+        return holes.punch(template_name, kwargs)
+    return render_to_string(template_name, kwargs, getattr(context, 'request', None))
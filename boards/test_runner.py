@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner as BaseRunner
+
+
+class DiscoverRunner(BaseRunner):
+    """Django's runner, with ``--detect-nplusone`` to fail the tests whose requests run N+1 queries"""
+
+    def __init__(self, detect_nplusone=False, **kwargs):
+        super().__init__(**kwargs)
+        self.detect_nplusone = detect_nplusone
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--detect-nplusone', action='store_true',
+                            help='Fail requests running the same query shape more than NPLUSONE_THRESHOLD times')
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if self.detect_nplusone:
+            # read by NPlusOneMiddleware when each test client loads the middleware
+            settings.NPLUSONE_DETECTION = 'raise'
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import revisions
+from ..admin import EstimatedCountPaginator, PostAdmin
+from ..models import Board, Post, Topic
+
+
+class AdminTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@doe.com', password='123')
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.other_board = Board.objects.create(name='Python', description='Python board.')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.admin)
+        self.post = Post.objects.create(message='Lorem ipsum dolor sit amet ' * 10, topic=self.topic, created_by=self.admin)
+        self.client.force_login(self.admin)
+
+
+class ChangelistTests(AdminTestCase):
+    def test_changelists_load(self):
+        for name in ('board', 'topic', 'post'):
+            response = self.client.get(reverse(f'admin:boards_{name}_changelist'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_post_changelist_shows_excerpt(self):
+        response = self.client.get(reverse('admin:boards_post_changelist'))
+        self.assertContains(response, 'Lorem ipsum dolor sit amet Lor')
+
+    def test_change_forms_do_not_list_users(self):
+        response = self.client.get(reverse('admin:boards_post_change', args=[self.post.pk]))
+        self.assertNotContains(response, '<option value="{}"'.format(self.admin.pk))
+
+    def test_count_is_capped(self):
+        paginator = EstimatedCountPaginator(Post.objects.order_by('pk'), 10)
+        paginator.COUNT_LIMIT = 0
+        self.assertEqual(paginator.count, 0)
+
+
+class ModerationActionTests(AdminTestCase):
+    def test_remove_messages(self):
+        self.client.post(reverse('admin:boards_post_changelist'), {
+            'action': 'remove_messages', '_selected_action': [self.post.pk],
+        })
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.message, PostAdmin.REMOVED_MESSAGE)
+        self.assertIsNone(self.post.updated_by)
+        revision = self.post.revisions.get(number=1)
+        self.assertEqual(revision.created_by, self.admin)
+        self.assertEqual(revisions.get_revision_text(self.post, 0), 'Lorem ipsum dolor sit amet ' * 10)
+
+    def test_removed_message_leaves_cached_page(self):
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.assertContains(self.client.get(url), 'Lorem ipsum')
+        self.client.post(reverse('admin:boards_post_changelist'), {
+            'action': 'remove_messages', '_selected_action': [self.post.pk],
+        })
+        self.assertContains(self.client.get(url), PostAdmin.REMOVED_MESSAGE)
+
+    def test_move_to_board_asks_for_board(self):
+        response = self.client.post(reverse('admin:boards_topic_changelist'), {
+            'action': 'move_to_board', '_selected_action': [self.topic.pk],
+        })
+        self.assertContains(response, 'Move 1 selected topic to')
+
+    def test_move_to_board(self):
+        self.client.post(reverse('admin:boards_topic_changelist'), {
+            'action': 'move_to_board', '_selected_action': [self.topic.pk],
+            'apply': '1', 'board': self.other_board.pk,
+        })
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.board, self.other_board)
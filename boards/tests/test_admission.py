@@ -0,0 +1,80 @@
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..middleware import AdmissionControlMiddleware, TokenBucket
+from ..models import Board, Post, Topic
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(burst=2, period=60)
+        self.assertEqual(bucket.take('key'), 0)
+        self.assertEqual(bucket.take('key'), 0)
+        self.assertAlmostEqual(bucket.take('key'), 30, delta=1)
+
+    def test_keys_are_independent(self):
+        bucket = TokenBucket(burst=1, period=60)
+        self.assertEqual(bucket.take('a'), 0)
+        self.assertEqual(bucket.take('b'), 0)
+
+    def test_shared_counter_across_workers(self):
+        cache = caches['default']
+        cache.clear()
+        # two workers of a host, each with its own bucket over the same cache
+        workers = [TokenBucket(burst=3, period=60, cache=cache) for _ in range(2)]
+        allowed = [worker.take('key') == 0 for _ in range(3) for worker in workers]
+        self.assertEqual(allowed.count(True), 3)
+        self.assertGreater(workers[0].take('key'), 0)
+
+
+@override_settings(ADMISSION_RATE_LIMITS={'reply_topic': (2, 60)})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        topic = Topic.objects.create(subject='Hello, world', board=board, starter=self.user)
+        Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        self.url = reverse('reply_topic', kwargs={'pk': board.pk, 'topic_pk': topic.pk})
+        self.client.force_login(self.user)
+
+    def test_over_limit_gets_429(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.url, {'message': 'Hello'}).status_code, 302)
+        response = self.client.post(self.url, {'message': 'Hello'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_get_is_not_limited(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+@override_settings(ADMISSION_CONCURRENCY={'board_topics': 1}, ADMISSION_DEEP_PAGE=5)
+class ConcurrencyLimitTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = AdmissionControlMiddleware(lambda request: HttpResponse())
+
+    def get(self, page):
+        request = self.factory.get('/boards/1/', {'page': page})
+        request.user = AnonymousUser()
+        return self.middleware(request)
+
+    def test_slot_is_released_after_response(self):
+        self.assertEqual(self.get(page=9).status_code, 200)
+        self.assertEqual(self.get(page=9).status_code, 200)
+
+    def test_deep_page_over_limit_gets_503(self):
+        self.middleware.slots['board_topics'].acquire()  # a request already in flight
+        response = self.get(page=9)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.middleware.rejections[('overloaded', 'board_topics')], 1)
+
+    def test_shallow_pages_are_not_limited(self):
+        self.middleware.slots['board_topics'].acquire()
+        self.assertEqual(self.get(page=1).status_code, 200)
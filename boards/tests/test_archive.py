@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive, notifications, revisions
+from ..models import ArchivedTopic, Board, Post, ReplyNotification, Topic
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message=f'Message {i}', topic=self.topic, created_by=self.user)
+            for i in range(3)
+        ]
+        self.created = {post.pk: post.created_at for post in self.posts}
+        Topic.objects.filter(pk=self.topic.pk).update(last_update=timezone.now() - timedelta(days=400))
+        self.url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+
+class ArchiveCommandTests(ArchiveTestCase):
+    databases = '__all__'
+    def test_cold_topic_is_archived(self):
+        call_command('archive_topics', '--days', '365', stdout=StringIO())
+        archived = ArchivedTopic.objects.get(topic=self.topic)
+        self.assertEqual(archived.post_count, 3)
+        self.assertEqual((archived.first_post_id, archived.last_post_id), (self.posts[0].pk, self.posts[-1].pk))
+        self.assertFalse(Post.objects.filter(topic=self.topic).exists())
+
+    def test_recent_topic_is_kept(self):
+        call_command('archive_topics', '--days', '500', stdout=StringIO())
+        self.assertFalse(ArchivedTopic.objects.exists())
+
+    def test_topic_updated_since_listing_is_kept(self):
+        topic = Topic.objects.get(pk=self.topic.pk)
+        Topic.objects.filter(pk=topic.pk).update(last_update=timezone.now())
+        self.assertEqual(archive.archive_topic(topic, timezone.now() - timedelta(days=365)), 0)
+        self.assertEqual(Post.objects.filter(topic=self.topic).count(), 3)
+
+    def test_pending_digests_keep_the_topic_live(self):
+        notifications.queue_reply(self.posts[-1])
+        self.assertEqual(archive.archive_topic(self.topic), 0)
+        self.assertTrue(ReplyNotification.objects.exists())
+        notifications.send_digests()
+        self.assertEqual(archive.archive_topic(self.topic), 3)
+
+
+class ArchivedTopicViewTests(ArchiveTestCase):
+    def setUp(self):
+        super().setUp()
+        archive.archive_topic(self.topic)
+
+    def test_thread_served_from_archive(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertEqual(response.context['main_post'].message, 'Message 0')
+        self.assertContains(response, 'Message 2')
+
+    def test_archived_thread_is_read_only(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertNotContains(response, '/edit/')
+
+    def test_replies_count_includes_archived_posts(self):
+        response = self.client.get(reverse('board_topics', kwargs={'pk': self.board.pk}))
+        self.assertEqual(response.context['topics'][0].replies, 2)
+
+
+class RestoreTests(ArchiveTestCase):
+    def setUp(self):
+        super().setUp()
+        archive.archive_topic(self.topic)
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk}),
+            {'message': 'Back from the dead'},
+        )
+
+    def test_archive_row_removed(self):
+        self.assertFalse(ArchivedTopic.objects.exists())
+
+    def test_posts_restored_with_original_keys_and_dates(self):
+        restored = Post.objects.filter(pk__in=self.created)
+        self.assertEqual({post.pk: post.created_at for post in restored}, self.created)
+        self.assertEqual(self.topic.posts.count(), 4)
+
+    def test_edit_history_restored(self):
+        post = self.posts[0]
+        for text in ('Edited once', 'Edited twice'):
+            old, post.message = post.message, text
+            post.save()
+            revisions.record_edit(post, old, self.user, timezone.now(), revisions.make_delta(old, text))
+        topic = Topic.objects.get(pk=self.topic.pk)
+        archive.archive_topic(topic)
+        archive.restore_topic(topic)
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual([entry['text'] for entry in revisions.history(post)], ['Message 0', 'Edited once', 'Edited twice'])
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import board_index, caching
+from ..models import Board, Post, Topic
+
+
+class BoardIndexTests(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+
+    def test_snapshot_served_from_memory(self):
+        board_index.boards()
+        with self.assertNumQueries(0):
+            boards = board_index.boards()
+        self.assertEqual([board.name for board in boards], ['Django'])
+
+    def test_write_bumps_version(self):
+        version = board_index.version()
+        topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.assertNotEqual(board_index.version(), version)
+        Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        board, = board_index.boards()
+        self.assertEqual((board.topics_count, board.posts_count), (1, 1))
+
+    def test_new_board_listed_on_home_page(self):
+        self.client.get(reverse('home'))
+        Board.objects.create(name='Python', description='Python board.')
+        response = self.client.get(reverse('home'))
+        self.assertEqual([board.name for board in response.context['boards']], ['Django', 'Python'])
+
+    def test_evicted_version_rebuilds(self):
+        board_index.boards()
+        Board.objects.filter(pk=self.board.pk).update(name='Flask')  # sends no signal
+        caching.get_cache().delete(board_index.VERSION_KEY)
+        self.assertEqual(board_index.boards()[0].name, 'Flask')
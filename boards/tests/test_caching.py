@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Board, Post, Topic
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_value_is_computed_once(self):
+        self.assertEqual(caching.get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(caching.get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_value_is_refreshed(self):
+        caching.get_or_compute('key', self.compute, 60)
+        caching.expire('key')
+        self.assertEqual(caching.get_or_compute('key', self.compute, 60), 2)
+        self.assertEqual(caching.get_or_compute('key', self.compute, 60), 2)
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        caching.get_or_compute('key', self.compute, 60)
+        caching.expire('key')
+        caching.get_cache().add(caching._lock_key('key'), True)
+        self.assertEqual(caching.get_or_compute('key', self.compute, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_early_refresh(self):
+        # a value that took 10s to compute, fresh for another minute
+        caching.get_cache().set('key', (0, 10.0, caching.time.time() + 60, 60))
+        with mock.patch('random.random', return_value=0.5):
+            self.assertEqual(caching.get_or_compute('key', self.compute, 60), 0)
+        # an unlucky draw refreshes it ahead of expiry: -log(1e-6) * 10s > 60s
+        with mock.patch('random.random', return_value=1 - 1e-6):
+            self.assertEqual(caching.get_or_compute('key', self.compute, 60), 1)
+
+    def test_waits_for_the_lock_holder_then_computes(self):
+        caching.get_cache().add(caching._lock_key('key'), True)
+        with mock.patch.object(caching, 'WAIT_TIMEOUT', 0.1):
+            self.assertEqual(caching.get_or_compute('key', self.compute, 60), 1)
+
+
+class CachedFiguresTests(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=self.user)
+
+    def test_figures_are_cached(self):
+        self.assertEqual(self.board.get_posts_count(), 1)
+        self.topic.get_stats()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.board.get_posts_count(), 1)
+            self.assertEqual(self.topic.get_replies_count(), 0)
+            self.topic.get_last_post()
+
+    def test_new_post_expires_figures(self):
+        self.board.get_posts_count()
+        self.topic.get_replies_count()
+        post = Post.objects.create(message='Reply', topic=self.topic, created_by=self.user)
+        self.assertEqual(self.board.get_posts_count(), 2)
+        self.assertEqual(self.topic.get_replies_count(), 1)
+        self.assertEqual(self.topic.get_last_post(), post)
+
+    def test_home_page_counts_follow_new_posts(self):
+        self.client.get(reverse('home'))
+        Post.objects.create(message='Reply', topic=self.topic, created_by=self.user)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['boards'][0].posts_count, 2)
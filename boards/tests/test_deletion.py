@@ -0,0 +1,133 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive, deletion, revisions, unread
+from ..models import ArchivedTopic, Board, DeletionJob, Post, PostRevision, Topic, TopicReadMark
+
+
+class DeletionTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.john = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.jane = User.objects.create_user(username='jane', email='jane@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.john)
+        self.other = Topic.objects.create(subject='Another topic', board=self.board, starter=self.jane)
+        for topic in (self.topic, self.other):
+            for user in (self.john, self.jane, self.jane):
+                Post.objects.create(message='Lorem ipsum', topic=topic, created_by=user)
+        self.topic.views.add(self.jane)
+        unread.mark_topic_read(self.jane, self.topic, 1)
+
+
+class BoardDeletionTests(DeletionTestCase):
+    def test_board_hidden_right_away(self):
+        deletion.schedule(self.board)
+        response = self.client.get(reverse('board_topics', kwargs={'pk': self.board.pk}))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(self.client.get(reverse('home')), 'Django')
+
+    def test_topics_hidden_right_away(self):
+        deletion.schedule(self.board)
+        kwargs = {'pk': self.board.pk, 'topic_pk': self.topic.pk}
+        self.assertEqual(self.client.get(reverse('topic_posts', kwargs=kwargs)).status_code, 404)
+        self.client.force_login(self.jane)
+        response = self.client.post(reverse('reply_topic', kwargs=kwargs), {'message': 'Still there?'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Post.objects.filter(topic=self.topic).count(), 3)
+
+    def test_worker_removes_everything_in_batches(self):
+        job = deletion.schedule(self.board)
+        deletion.run_job(job, batch_size=2)
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.deleted_rows, 2 + 6 + 1 + 1)  # topics, posts, a view, a read mark
+        self.assertFalse(Board.all_objects.filter(pk=self.board.pk).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(TopicReadMark.objects.exists())
+        self.assertFalse(Topic.views.through.objects.exists())
+
+
+class TopicDeletionTests(DeletionTestCase):
+    def test_counters_follow_deletion(self):
+        self.assertEqual(self.board.get_posts_count(), 6)
+        job = deletion.schedule(self.topic)
+        self.assertEqual(self.board.get_posts_count(), 3)
+        deletion.run_job(job)
+        self.assertEqual(self.board.get_posts_count(), 3)
+        self.assertEqual(list(Topic.all_objects.all()), [self.other])
+
+
+class UserDeletionTests(DeletionTestCase):
+    databases = '__all__'
+    def test_user_and_their_rows_removed(self):
+        job = deletion.schedule(self.john)
+        self.assertFalse(User.objects.get(pk=self.john.pk).is_active)
+        deletion.run_job(job)
+        self.assertFalse(User.objects.filter(pk=self.john.pk).exists())
+        # the topic john started goes with its replies, his post elsewhere goes alone
+        self.assertEqual(list(Topic.all_objects.all()), [self.other])
+        self.assertEqual(Post.objects.filter(topic=self.other).count(), 2)
+        self.assertFalse(PostRevision.objects.exists())
+
+
+    def test_posts_they_moderated_stay(self):
+        post = Post.objects.filter(topic=self.other, created_by=self.jane).first()
+        old_message, post.message = post.message, 'Edited by john'
+        post.updated_by = self.john
+        post.save()
+        revisions.record_edit(post, old_message, self.john, timezone.now(), revisions.make_delta(old_message, post.message))
+        deletion.run_job(deletion.schedule(self.john))
+        self.assertEqual(Post.objects.get(pk=post.pk).message, 'Edited by john')
+        self.assertEqual(revisions.get_revision_text(post, 1), 'Edited by john')
+
+    def test_archived_posts_removed(self):
+        archive.archive_topic(self.other)
+        job = deletion.schedule(self.john)
+        deletion.run_job(job)
+        self.assertEqual(ArchivedTopic.objects.get(topic=self.other).post_count, 2)
+        posts = archive.load_posts(Topic.objects.get(pk=self.other.pk))
+        self.assertEqual({post.created_by_id for post in posts}, {self.jane.pk})
+        self.assertEqual(job.deleted_rows, 1 + 3 + 1 + 1 + 1)  # the topic, its posts, a view, a read mark, the archived post
+
+    def test_archived_post_of_missing_author(self):
+        archive.archive_topic(self.other)
+        User.objects.filter(pk=self.john.pk).delete()
+        response = self.client.get(reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.other.pk}))
+        self.assertContains(response, 'deleted user')
+
+
+class AdminDeletionTests(DeletionTestCase):
+    def test_admin_delete_schedules_a_job(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@doe.com', password='123')
+        self.client.force_login(admin)
+        url = reverse('admin:boards_board_delete', args=[self.board.pk])
+        self.assertContains(self.client.get(url), 'Django')
+        self.client.post(url, {'post': 'yes'})
+        job = DeletionJob.objects.get()
+        self.assertEqual((job.kind, job.object_id, job.requested_by), (DeletionJob.BOARD, self.board.pk, admin))
+        self.assertTrue(Topic.objects.filter(board_id=self.board.pk).exists())  # left to the worker
+
+
+class ClaimTests(DeletionTestCase):
+    def test_job_runs_on_one_worker(self):
+        job = deletion.schedule(self.topic)
+        self.assertEqual(deletion.claim_job('w1'), job)
+        self.assertIsNone(deletion.claim_job('w2'))
+
+    def test_job_of_a_silent_worker_taken_over(self):
+        job = deletion.schedule(self.topic)
+        deletion.claim_job('w1')
+        DeletionJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - deletion.CLAIM_TIMEOUT * 2)
+        self.assertEqual(deletion.claim_job('w2').worker, 'w2')
+
+    def test_batches_keep_the_claim(self):
+        deletion.schedule(self.topic)
+        job = deletion.claim_job('w1')
+        claimed_at = job.heartbeat_at
+        deletion.run_job(job, batch_size=2)
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, claimed_at)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(deletion.claim_job('w2'))
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from ..models import Board, Post, Topic
+
+
+class FeedTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.post = Post.objects.create(message='Some **bold** text', topic=self.topic, created_by=self.user)
+        self.topic.refresh_from_db()
+
+
+class BoardFeedTests(FeedTestCase):
+    def test_rss_lists_topics(self):
+        response = self.client.get(reverse('board_feed_rss', kwargs={'pk': self.board.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<title>Hello, world</title>')
+
+    def test_atom(self):
+        response = self.client.get(reverse('board_feed_atom', kwargs={'pk': self.board.pk}))
+        self.assertEqual(response['Content-Type'], 'application/atom+xml; charset=utf-8')
+
+    def test_unchanged_feed_is_not_modified(self):
+        url = reverse('board_feed_rss', kwargs={'pk': self.board.pk})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2):  # the board is alive, its newest topic
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_topic_changes_etag(self):
+        url = reverse('board_feed_rss', kwargs={'pk': self.board.pk})
+        etag = self.client.get(url)['ETag']
+        Topic.objects.create(subject='Another one', board=self.board, starter=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleted_board(self):
+        url = reverse('board_feed_rss', kwargs={'pk': self.board.pk})
+        etag = self.client.get(url)['ETag']
+        Board.objects.filter(pk=self.board.pk).update(deleted_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+class TopicFeedTests(FeedTestCase):
+    def test_uses_stored_html(self):
+        Post.objects.filter(pk=self.post.pk).update(message_html='<p>stored</p>')
+        response = self.client.get(reverse('topic_feed_rss', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk}))
+        self.assertContains(response, '&lt;p&gt;stored&lt;/p&gt;')
+
+    def test_if_modified_since(self):
+        url = reverse('topic_feed_atom', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(self.topic.last_update.timestamp() + 1))
+        self.assertEqual(response.status_code, 304)
+
+    def test_edit_changes_validators(self):
+        url = reverse('topic_feed_rss', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        etag = self.client.get(url)['ETag']
+        self.post.message = 'Edited'
+        self.post.updated_at = timezone.now() + timedelta(minutes=1)  # HTTP dates are in seconds
+        self.post.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        since = http_date(self.topic.last_update.timestamp() + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_deleted_board(self):
+        url = reverse('topic_feed_rss', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        etag = self.client.get(url)['ETag']
+        Board.objects.filter(pk=self.board.pk).update(deleted_at=timezone.now())
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+class MessageHtmlTests(FeedTestCase):
+    def test_rendered_on_save(self):
+        self.assertIn('<strong>bold</strong>', self.post.message_html)
+        self.post.message = 'Now *italic*'
+        self.post.save(update_fields=['message'])
+        self.post.refresh_from_db()
+        self.assertIn('<em>italic</em>', self.post.message_html)
+
+    def test_other_fields_saved_without_rendering(self):
+        with mock.patch('boards.models.render_message') as render_message:
+            self.post.save(update_fields=['updated_at'])
+        render_message.assert_not_called()
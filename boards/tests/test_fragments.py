@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Board, Post, Topic
+
+FRAGMENT = {'HTTP_X_FRAGMENT': '1'}
+
+
+class FragmentTestCase(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        Post.objects.create(message='The first post', topic=self.topic, created_by=self.user)
+        for i in range(3):
+            Post.objects.create(message=f'Reply {i}', topic=self.topic, created_by=self.user)
+        self.client.login(username='john', password='123')
+
+
+class ListFragmentTests(FragmentTestCase):
+    def test_topic_list(self):
+        url = reverse('board_topics', kwargs={'pk': self.board.pk})
+        response = self.client.get(url, **FRAGMENT)
+        self.assertContains(response, 'id="topics"')
+        self.assertContains(response, 'Hello, world')
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Mark all as read')
+        self.assertIn('X-Fragment', response['Vary'])
+
+    def test_thread_page(self):
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        response = self.client.get(f'{url}?page=2', **FRAGMENT)
+        self.assertContains(response, 'id="replies"')
+        self.assertContains(response, 'id="pagination"')
+        self.assertContains(response, 'Reply 0')
+        self.assertNotContains(response, 'The first post')
+        self.assertNotContains(response, '<html')
+
+    def test_page_and_fragment_cached_apart(self):
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.client.get(url, **FRAGMENT)
+        response = self.client.get(url)
+        self.assertContains(response, '<html')
+        self.assertIn('X-Fragment', response['Vary'])
+
+
+class ReplyFragmentTests(FragmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def test_new_post_card(self):
+        response = self.client.post(self.url, {'message': 'A quick reply'}, **FRAGMENT)
+        post = Post.objects.latest('pk')
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(response, f'id="post-{post.pk}"', status_code=201)
+        self.assertContains(response, 'A quick reply', status_code=201)
+        self.assertNotContains(response, '<html', status_code=201)
+
+    def test_invalid_form(self):
+        response = self.client.post(self.url, {}, **FRAGMENT)
+        self.assertContains(response, '<form')
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'The first post')
+
+    def test_page_has_the_targets_of_the_script(self):
+        # static/js/fragments.js posts the form in #reply-form and adds the card to #reply-posts
+        response = self.client.get(self.url)
+        self.assertContains(response, 'id="reply-form"')
+        self.assertContains(response, 'id="reply-posts"')
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import live
+from ..models import Board, Post, Topic
+
+
+class HubTests(SimpleTestCase):
+    def test_fan_out_from_another_thread(self):
+        async def scenario():
+            hub = live.Hub()
+            async with hub.subscribe('topic:1') as first, hub.subscribe('topic:1') as second:
+                async with hub.subscribe('topic:2') as other:
+                    publisher = threading.Thread(target=hub.publish, args=('topic:1', 'post', {'id': 7}))
+                    publisher.start()
+                    publisher.join()
+                    messages = [await asyncio.wait_for(s.get(), 1) for s in (first, second)]
+                    self.assertTrue(other.queue.empty())
+            self.assertEqual(hub.subscriber_count('topic:1'), 0)
+            return messages
+        messages = asyncio.run(scenario())
+        self.assertEqual([m['data'] for m in messages], [{'id': 7}, {'id': 7}])
+
+    def test_slow_subscriber_drops_oldest(self):
+        subscription = live.Subscription(loop=None)
+        for i in range(live.QUEUE_SIZE + 1):
+            subscription.offer(i)
+        self.assertEqual(subscription.queue.get_nowait(), 1)
+
+    def test_format_event(self):
+        message = {'id': 3, 'event': 'edit', 'data': {'id': 5}}
+        self.assertEqual(live.format_event(message), 'id: 3\nevent: edit\ndata: {"id": 5}\n\n')
+
+
+class TopicStreamTests(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=self.user)
+        self.url = reverse('topic_stream', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    async def test_stream_headers(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    async def test_not_found(self):
+        response = await self.async_client.get(
+            reverse('topic_stream', kwargs={'pk': self.board.pk, 'topic_pk': 99})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_reply_publishes_rendered_card(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(live.hub, 'dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk}),
+                    {'message': 'Hello, world!'},
+                )
+        channel, message = dispatch.call_args.args
+        self.assertEqual(channel, live.topic_channel(self.topic.pk))
+        self.assertEqual(message['event'], 'post')
+        self.assertIn('Hello, world!', message['data']['html'])
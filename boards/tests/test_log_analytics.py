@@ -0,0 +1,95 @@
+import gzip
+import os
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..log_analytics import Latency, Report, TopK, log_files, read_lines
+
+OLD = [
+    '2026-03-01 09:58:02,101 [INFO] [a1] boards.access "GET /" 200 0.012s view=home user=-\n',
+    '2026-03-01 09:59:40,300 [INFO] [a2] boards.views User john viewing topic ID 7 on board 2\n',
+    '2026-03-01 09:59:40,310 [INFO] [a2] boards.access "GET /boards/2/topics/7/" 200 0.040s view=topic_posts user=john\n',
+]
+CURRENT = [
+    '2026-03-01 10:01:00,000 [ERROR] [a3] django.request Internal Server Error: /boards/2/topics/7/reply/\n',
+    'Traceback (most recent call last):\n',
+    '2026-03-01 10:01:00,001 [INFO] [a3] boards.access "POST /boards/2/topics/7/reply/" 500 0.300s view=reply_topic user=john\n',
+    '2026-03-01 10:02:00,000 [INFO] [a4] boards.access "GET /boards/2/" 200 0.020s view=board_topics user=mary\n',
+    '2026-03-01 10:03:00,000 [INFO] [a5] boards.access "GET /nope/" 404 0.002s view=- user=-\n',
+    '2026-03-01 10:04:00,000 [INFO] django.server "GET / HTTP/1.1" 200 7552\n',
+]
+
+
+class LogReportTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'django_app.log')
+        with gzip.open(self.path + '.2.gz', 'wt') as file:
+            file.write(OLD[0])
+        with open(self.path + '.1', 'w') as file:
+            file.writelines(OLD[1:])
+        with open(self.path, 'w') as file:
+            file.writelines(CURRENT)
+        with open(self.path + '.lock', 'w'):
+            pass
+
+    def test_rotations_oldest_first(self):
+        names = [os.path.basename(name) for name in log_files(self.path)]
+        self.assertEqual(names, ['django_app.log.2.gz', 'django_app.log.1', 'django_app.log'])
+        self.assertEqual(list(read_lines(log_files(self.path))), OLD + CURRENT)
+
+    def test_report(self):
+        report = Report(window=timedelta(minutes=30)).feed(read_lines(log_files(self.path)))
+        self.assertEqual(report.requests, 5)
+        self.assertEqual(report.views['reply_topic'].server_errors, 1)
+        self.assertEqual(report.views['-'].client_errors, 1)
+        self.assertEqual(report.users.most_common(2), [('john', 2), ('mary', 1)])
+        self.assertEqual(report.boards.most_common(1), [(2, 3)])
+        self.assertEqual(report.topics.most_common(1), [((2, 7), 2)])
+        before, after = (report.windows[datetime(2026, 3, 1, hour, minute)] for hour, minute in ((9, 30), (10, 0)))
+        self.assertEqual((before.requests, before.server_errors, before.error_records), (2, 0, 0))
+        self.assertEqual((after.requests, after.server_errors, after.error_records), (3, 1, 1))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('log_report', self.path, '--window', '30', stdout=out)
+        output = out.getvalue()
+        self.assertIn('5 requests', output)
+        self.assertRegex(output, r'reply_topic +1 +0 +1 +300\.0ms')
+        self.assertIn('2026-03-01 10:00         3      1   33.3%       1', output)
+        self.assertIn('board 2 topic 7', output)
+
+
+class AggregateTests(SimpleTestCase):
+    def test_percentiles_from_buckets(self):
+        latency = Latency()
+        for seconds in [0.003] * 90 + [0.2] * 9 + [3.0]:
+            latency.add(seconds)
+        self.assertEqual(latency.percentile(0.5), 0.005)
+        self.assertEqual(latency.percentile(0.95), 0.25)
+        self.assertEqual(latency.percentile(1), 3.0)
+
+    def test_top_k_stays_bounded(self):
+        top = TopK(capacity=10)
+        for i in range(1000):
+            top.add('hot')
+            top.add(f'cold{i}')
+        self.assertLessEqual(len(top.counts), 20)
+        self.assertEqual(top.most_common(1), [('hot', 1000)])
+
+
+class AccessLogTests(TestCase):
+    def test_one_line_per_request(self):
+        User.objects.create_user(username='john', password='123')
+        self.client.login(username='john', password='123')
+        with self.assertLogs('boards.access') as logs:
+            self.client.get(reverse('home'))
+        line, = logs.records
+        self.assertRegex(line.getMessage(), r'^"GET /" 200 \d+\.\d{3}s view=home user=john$')
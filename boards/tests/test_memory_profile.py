@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..memory_profile import Profiler, format_report, profiler
+
+
+class ProfilerTests(SimpleTestCase):
+    def setUp(self):
+        self.profiler = Profiler(every=2)
+        self.addCleanup(self.profiler.stop)
+
+    def test_views_and_sites(self):
+        self.profiler.start()
+        before = self.profiler.begin_request()
+        kept = [bytearray(1024) for _ in range(200)]  # allocated here, in boards/ code
+        self.profiler.end_request('home', before)
+        self.profiler.end_request('home', self.profiler.begin_request())  # second request: snapshot
+        report = self.profiler.report()
+        home, = report['views']
+        self.assertEqual((home['view'], home['requests']), ('home', 2))
+        self.assertGreater(home['max_peak'], 200 * 1024)
+        site = report['sites'][0]
+        self.assertTrue(site['site'].startswith('boards/tests/test_memory_profile.py:'))
+        self.assertGreater(site['size_diff'], 200 * 1024)
+        self.assertEqual(len(kept), 200)
+
+    def test_toggle_logs_the_report(self):
+        self.profiler.toggle()
+        self.assertTrue(self.profiler.active)
+        with self.assertLogs('boards.memory_profile') as logs:
+            self.profiler.toggle()
+        self.assertFalse(self.profiler.active)
+        self.assertIn('0 requests', logs.output[-1])
+        self.assertIsNone(self.profiler.report())
+        self.assertEqual(format_report(None), 'Memory profiling is off')
+
+
+class MemoryProfileViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse('memory_profile')
+        User.objects.create_user(username='admin', password='123', is_staff=True)
+        User.objects.create_user(username='john', password='123')
+        self.addCleanup(profiler.stop)
+
+    def test_off_by_default(self):
+        self.client.login(username='admin', password='123')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(MEMORY_PROFILING=True)
+    def test_staff_only(self):
+        self.client.login(username='john', password='123')
+        self.assertEqual(self.client.post(self.url, {'action': 'start'}).status_code, 302)
+        self.assertFalse(profiler.active)
+
+    @override_settings(MEMORY_PROFILING=True)
+    def test_profile_requests(self):
+        self.client.login(username='admin', password='123')
+        self.assertTrue(self.client.post(self.url, {'action': 'start'}).json()['active'])
+        self.client.get(reverse('home'))
+        self.client.post(self.url, {'action': 'snapshot'})
+        report = self.client.get(self.url).json()['report']
+        self.assertIn('home', [view['view'] for view in report['views']])
+        self.assertIn('auth.User', [model['model'] for model in report['instances']])
+        stopped = self.client.post(self.url, {'action': 'stop'}).json()
+        self.assertFalse(stopped['active'])
+        self.assertTrue(stopped['report']['views'])
+        self.assertEqual(self.client.post(self.url, {'action': 'dump'}).status_code, 400)
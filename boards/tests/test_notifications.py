@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import notifications
+from ..models import Board, Post, ReplyNotification, Subscription, Topic
+
+
+class NotificationTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.author = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.author)
+        Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=self.author)
+        self.reply_url = reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def make_followers(self, count, **target):
+        users = User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@doe.com') for i in range(count)
+        )
+        Subscription.objects.bulk_create(Subscription(user=user, **target) for user in users)
+        return users
+
+
+class FollowViewTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.author)
+
+    def test_follow_topic_toggles(self):
+        url = reverse('follow_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.client.post(url)
+        self.assertTrue(notifications.is_subscribed(self.author, topic=self.topic))
+        self.client.post(url)
+        self.assertFalse(notifications.is_subscribed(self.author, topic=self.topic))
+
+    def test_follow_board_redirects(self):
+        response = self.client.post(reverse('follow_board', kwargs={'pk': self.board.pk}))
+        self.assertRedirects(response, reverse('board_topics', kwargs={'pk': self.board.pk}))
+        self.assertTrue(notifications.is_subscribed(self.author, board=self.board))
+
+
+class ReplyQueueTests(NotificationTestCase):
+    def test_reply_cost_does_not_depend_on_followers(self):
+        self.client.force_login(self.author)
+        self.client.post(self.reply_url, {'message': 'warm up'})
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(self.reply_url, {'message': 'first'})
+        self.make_followers(50, topic=self.topic)
+        with self.assertNumQueries(len(few.captured_queries)):
+            self.client.post(self.reply_url, {'message': 'second'})
+        self.assertEqual(ReplyNotification.objects.count(), 3)
+
+
+class SendDigestsTests(NotificationTestCase):
+    databases = '__all__'
+    def setUp(self):
+        super().setUp()
+        self.topic_followers = self.make_followers(2, topic=self.topic)
+        Subscription.objects.create(user=self.topic_followers[0], board=self.board)
+        self.client.force_login(self.author)
+        for message in ('first reply', 'second reply'):
+            self.client.post(self.reply_url, {'message': message})
+
+    def test_one_digest_per_user(self):
+        call_command('send_digests', stdout=None)
+        self.assertEqual(sorted(email.to[0] for email in mail.outbox), ['user0@doe.com', 'user1@doe.com'])
+        self.assertIn('first reply', mail.outbox[0].body)
+        self.assertIn('second reply', mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].body.count('first reply'), 1)
+
+    def test_queue_is_drained(self):
+        notifications.send_digests()
+        self.assertFalse(ReplyNotification.objects.exists())
+
+    def test_author_is_not_notified_of_own_posts(self):
+        Subscription.objects.create(user=self.author, topic=self.topic)
+        notifications.send_digests()
+        self.assertNotIn(['john@doe.com'], [email.to for email in mail.outbox])
+
+    def test_bulk_queries(self):
+        # queue batch, posts (+ boards, authors), subscriptions (+ users), delete batch
+        with self.assertNumQueries(7):
+            notifications.send_digests()
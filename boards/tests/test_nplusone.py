@@ -0,0 +1,114 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import caching, nplusone, unread
+from ..middleware import NPlusOneMiddleware
+from ..models import Board, Post, Topic
+
+
+class DetectorTests(TestCase):
+    def setUp(self):
+        self.boards = [Board.objects.create(name=f'Board {i}', description='A board.') for i in range(6)]
+
+    def loop(self):
+        for board in self.boards:
+            Board.objects.filter(pk=board.pk).first()
+
+    def test_repeated_shape_attributed(self):
+        with nplusone.Detector(threshold=5) as detector:
+            self.loop()
+            Board.objects.count()
+        (shape, count, code, template), = detector.repeated()
+        self.assertEqual(count, 6)
+        self.assertIn('WHERE ("boards_board"."deleted_at" IS NULL AND "boards_board"."id" = ?)', shape)
+        self.assertIn('DetectorTests.loop', code)
+        self.assertIsNone(template)
+        self.assertEqual(detector.total, 7)
+
+    def test_below_threshold(self):
+        with nplusone.Detector(threshold=6) as detector:
+            self.loop()
+        self.assertEqual(detector.repeated(), [])
+
+    def middleware(self):
+        def view(request):
+            self.loop()
+            return HttpResponse()
+        return NPlusOneMiddleware(view)
+
+    @override_settings(NPLUSONE_DETECTION='raise')
+    def test_middleware_raises(self):
+        with self.assertRaisesMessage(nplusone.NPlusOneError, '6 x SELECT'):
+            self.middleware()(RequestFactory().get('/'))
+
+    @override_settings(NPLUSONE_DETECTION='log')
+    def test_middleware_logs(self):
+        with self.assertLogs('boards.middleware', 'WARNING') as logs:
+            self.middleware()(RequestFactory().get('/'))
+        self.assertIn('DetectorTests.loop', logs.output[0])
+
+    @override_settings(NPLUSONE_DETECTION='')
+    def test_middleware_off_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware()
+
+
+class QueryCountTests(TestCase):
+    """The queries of a list page don't grow with the number of items on it"""
+
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.client.login(username='john', password='123')
+
+    def add_topic(self, replies=0):
+        starter = User.objects.create_user(username=f'user{User.objects.count()}', email='a@b.com')
+        topic = Topic.objects.create(subject='Hello', board=self.board, starter=starter)
+        for i in range(replies + 1):
+            author = User.objects.create_user(username=f'user{User.objects.count()}', email='a@b.com')
+            Post.objects.create(message=f'Post {i}', topic=topic, created_by=author)
+        return topic
+
+    def count(self, url):
+        self.client.get(url)  # first visits record the view, move the read mark...
+        caching.get_cache().clear()
+        with nplusone.Detector() as detector:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return detector.total
+
+    def assertConstant(self, url, add_items):
+        before = self.count(url)
+        add_items()
+        self.assertEqual(self.count(url), before)
+
+    def test_home(self):
+        self.add_topic()
+        self.assertConstant(reverse('home'), lambda: [
+            Board.objects.create(name=f'Board {i}', description='A board.') for i in range(5)
+        ])
+
+    def test_board_topics(self):
+        self.add_topic(1)
+        self.assertConstant(reverse('board_topics', kwargs={'pk': self.board.pk}), lambda: [self.add_topic(1) for _ in range(6)])
+
+    def test_topic_posts(self):
+        topic = self.add_topic(1)
+        url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': topic.pk})
+        # the first page grows from one reply to a full page
+        def add_replies():
+            for i in range(5):
+                Post.objects.create(message='More', topic=topic, created_by=User.objects.create_user(username=f'x{i}'))
+            # replies left on other pages keep the read mark from moving: count with none unread
+            unread.mark_board_read(self.user, self.board)
+        self.assertConstant(url, add_replies)
+
+    def test_reply_form(self):
+        topic = self.add_topic(1)
+        url = reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': topic.pk})
+        self.assertConstant(url, lambda: [
+            Post.objects.create(message='More', topic=topic, created_by=User.objects.create_user(username=f'x{i}'))
+            for i in range(5)
+        ])
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import caching, page_cache
+from ..models import Board, Post, Topic, TopicReadMark
+
+
+class SharedTopicPageTests(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.author = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.reader = User.objects.create_user(username='jane', email='jane@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.author)
+        Post.objects.create(message='First post', topic=self.topic, created_by=self.author)
+        self.reply = Post.objects.create(message='A reply', topic=self.topic, created_by=self.author)
+        self.url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.edit_url = reverse('edit_post', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk, 'post_pk': self.reply.pk})
+        # an anonymous visit fills the cache
+        self.anonymous = self.client.get(self.url)
+
+    def test_anonymous_hit_runs_no_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, self.anonymous.content)
+        self.assertContains(response, 'Login')
+
+    def test_personal_fragments_filled_per_user(self):
+        self.client.login(username='john', password='123')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'john</a>')
+        self.assertContains(response, f'href="{self.edit_url}"')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.client.login(username='jane', password='123')
+        response = self.client.get(self.url)
+        self.assertContains(response, 'jane</a>')
+        self.assertNotContains(response, f'href="{self.edit_url}"')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_hit_still_records_the_reader(self):
+        self.client.login(username='jane', password='123')
+        self.client.get(self.url)
+        self.assertTrue(self.topic.views.filter(pk=self.reader.pk).exists())
+        mark = TopicReadMark.objects.get(user=self.reader, topic=self.topic)
+        self.assertEqual(mark.last_read_post_id, self.reply.pk)
+
+    def test_new_reply_changes_the_page(self):
+        Post.objects.create(message='Another reply', topic=self.topic, created_by=self.reader)
+        self.assertContains(self.client.get(self.url), 'Another reply')
+
+    def test_reply_elsewhere_keeps_the_page(self):
+        other = Topic.objects.create(subject='Another topic', board=self.board, starter=self.reader)
+        Post.objects.create(message='Elsewhere', topic=other, created_by=self.reader)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_unread_query_parameters_share_the_page(self):
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'utm_source': 'feed'})
+        self.client.get(self.url, {'page': '01'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'page': '1', 'sort': 'x'})
+
+
+class FillTests(SimpleTestCase):
+    def test_only_markers_of_the_page_token_are_filled(self):
+        holes = page_cache.Holes()
+        content = f'{holes.punch("includes/personal/user_nav.html", {})} <!--hole:0123456789abcdef:0-->'
+        page = page_cache.Page(content, 'text/html', holes.token, tuple(holes.fragments), {})
+        filled = page_cache.fill(page, RequestFactory().get('/'), {})
+        self.assertIn('Sign Up', filled)
+        self.assertIn('<!--hole:0123456789abcdef:0-->', filled)
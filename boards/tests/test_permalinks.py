@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive, permalinks
+from ..models import Board, Post, Topic
+
+
+class PermalinkTests(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.posts = [
+            Post.objects.create(message=f'Post {i}', topic=self.topic, created_by=self.user)
+            for i in range(8)
+        ]
+        # an edited reply is listed before the others
+        Post.objects.filter(pk=self.posts[2].pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        self.thread_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+
+    def test_redirects_to_the_page_showing_the_post(self):
+        for post in self.posts:
+            response = self.client.get(reverse('post_permalink', kwargs={'pk': self.board.pk, 'post_pk': post.pk}))
+            url, anchor = response.url.split('#')
+            self.assertEqual(anchor, f'post-{post.pk}')
+            # pages are served from the shared page cache after the first visit
+            self.assertContains(self.client.get(url), f'id="post-{post.pk}"')
+
+    def test_first_post_is_on_the_first_page(self):
+        self.assertEqual(permalinks.page_number(self.posts[0], 2), 1)
+
+    def test_rank_follows_thread_order(self):
+        replies = list(self.client.get(self.thread_url).context['paginator'].object_list)
+        self.assertEqual([permalinks.rank(post) for post in replies], list(range(len(replies))))
+
+    def test_last_post_url_is_a_permalink(self):
+        self.assertEqual(
+            self.topic.get_last_post_url(),
+            reverse('post_permalink', kwargs={'pk': self.board.pk, 'post_pk': self.posts[-1].pk}),
+        )
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('post_permalink', kwargs={'pk': self.board.pk, 'post_pk': 99}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_rank_is_counted_in_one_query(self):
+        with self.assertNumQueries(2):  # the first post, then the counts
+            permalinks.rank(self.posts[5])
+
+    def test_post_of_an_archived_topic(self):
+        expected = {
+            post.pk: self.client.get(reverse('post_permalink', kwargs={'pk': self.board.pk, 'post_pk': post.pk})).url
+            for post in self.posts
+        }
+        archive.archive_topic(self.topic)
+        for post in self.posts:
+            response = self.client.get(reverse('post_permalink', kwargs={'pk': self.board.pk, 'post_pk': post.pk}))
+            self.assertEqual(response.url, expected[post.pk])
+            self.assertContains(self.client.get(response.url.split('#')[0]), f'id="post-{post.pk}"')
+
+    def test_post_of_another_board_archive(self):
+        archive.archive_topic(self.topic)
+        other = Board.objects.create(name='Python', description='Python board.')
+        response = self.client.get(reverse('post_permalink', kwargs={'pk': other.pk, 'post_pk': self.posts[1].pk}))
+        self.assertEqual(response.status_code, 404)
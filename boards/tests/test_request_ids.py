@@ -0,0 +1,79 @@
+import logging
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import context, slow_queries, sql_comments
+from ..log_handlers import RequestIdFilter
+from ..models import Board
+
+
+class RequestIdHeaderTests(TestCase):
+    def test_id_drawn_and_returned(self):
+        first = self.client.get(reverse('home'))['X-Request-ID']
+        second = self.client.get(reverse('home'))['X-Request-ID']
+        self.assertRegex(first, r'^[0-9a-f]{32}$')
+        self.assertNotEqual(first, second)
+
+    def test_proxy_id_kept(self):
+        response = self.client.get(reverse('home'), headers={'X-Request-ID': 'lb-1234.abc'})
+        self.assertEqual(response['X-Request-ID'], 'lb-1234.abc')
+
+    def test_unsafe_id_replaced(self):
+        response = self.client.get(reverse('home'), headers={'X-Request-ID': 'x */ DROP TABLE y; /*'})
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+
+class SqlCommentTests(TestCase):
+    def sent(self, func):
+        """The statements ``func`` sends to the database, comments included"""
+        statements = []
+
+        def capture(execute, sql, params, many, query_context):
+            statements.append(sql)
+            return execute(sql, params, many, query_context)
+        with connection.execute_wrapper(capture):
+            func()
+        return statements
+
+    def test_request_statements_commented(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        url = reverse('board_topics', kwargs={'pk': board.pk})
+        statements = self.sent(lambda: self.client.get(url, headers={'X-Request-ID': 'abc123'}))
+        self.assertTrue(statements)
+        for sql in statements:
+            self.assertTrue(sql.endswith('/* request_id=abc123, view=board_topics */'), sql)
+
+    def test_other_statements_left_alone(self):
+        sql, = self.sent(Board.objects.count)
+        self.assertNotIn('/*', sql)
+
+    def test_turned_off(self):
+        new_connection = SimpleNamespace(execute_wrappers=[])
+        with self.settings(SQL_COMMENTS=False):
+            sql_comments.install(None, new_connection)
+        self.assertEqual(new_connection.execute_wrappers, [])
+
+    def test_slow_query_log_groups_without_comment(self):
+        self.assertEqual(
+            slow_queries.normalize('SELECT 1 FROM "t" /* request_id=ab12, view=home */'), 'SELECT ? FROM "t"'
+        )
+
+
+class RequestIdFilterTests(SimpleTestCase):
+    def record(self):
+        record = logging.LogRecord('boards.views', logging.INFO, __file__, 1, 'hello', None, None)
+        self.assertTrue(RequestIdFilter().filter(record))
+        return record
+
+    def test_outside_requests(self):
+        self.assertEqual(self.record().request_id, '-')
+
+    def test_inside_a_request(self):
+        token = context.activate(context.RequestInfo('/', 'home', 'abc123'))
+        try:
+            self.assertEqual(self.record().request_id, 'abc123')
+        finally:
+            context.deactivate(token)
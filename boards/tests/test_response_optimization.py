@@ -0,0 +1,92 @@
+import gzip
+import unittest
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import middleware
+from ..middleware import CompressionMiddleware
+from ..template_loaders import minify
+from ..templatetags.assets import fingerprint
+
+
+class MinifyTests(SimpleTestCase):
+    def test_strips_indentation_blank_lines_and_comments(self):
+        source = '<div>\n    <!-- a comment -->\n\n    <p>Hello</p>\n</div>\n'
+        self.assertEqual(minify(source), '<div>\n<p>Hello</p>\n</div>\n')
+
+    def test_keeps_pre_textarea_and_script(self):
+        source = '<pre>\n  a\n\n  b</pre>\n  <script>\n  if (a) {\n    b();\n  }\n</script>'
+        self.assertEqual(minify(source), '<pre>\n  a\n\n  b</pre>\n<script>\n  if (a) {\n    b();\n  }\n</script>')
+
+    def test_keeps_comments_holding_template_tags(self):
+        source = '<!-- {% if a %} -->'
+        self.assertEqual(minify(source), source)
+
+    def test_project_templates_are_minified(self):
+        template = engines['django'].get_template('base.html')
+        self.assertNotIn('\n    ', template.template.source)
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_url_carries_content_hash(self):
+        self.assertRegex(fingerprint('css/boardhub.css'), r'^/static/css/boardhub\.css\?v=[0-9a-f]{12}$')
+
+    def test_unknown_file(self):
+        self.assertEqual(fingerprint('css/missing.css'), '/static/css/missing.css')
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = b'<p>Lorem ipsum dolor sit amet</p>' * 50
+
+    def respond(self, response, accept_encoding):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        response = self.respond(HttpResponse(self.body), 'gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @unittest.skipUnless(middleware.brotli, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        response = self.respond(HttpResponse(self.body), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.body)
+
+    @unittest.skipUnless(middleware.brotli, 'brotli is not installed')
+    def test_csrf_token_never_brotli(self):
+        body = self.body + b'<input type="hidden" name="csrfmiddlewaretoken" value="abc">'
+        response = self.respond(HttpResponse(body), 'br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.respond(HttpResponse(body), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_refused_encoding(self):
+        response = self.respond(HttpResponse(self.body), 'gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        response = self.respond(StreamingHttpResponse(iter([self.body, self.body])), 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.body * 2)
+
+    def test_event_stream_left_alone(self):
+        response = StreamingHttpResponse(iter([self.body]), content_type='text/event-stream')
+        self.assertFalse(self.respond(response, 'gzip').has_header('Content-Encoding'))
+
+    def test_weakens_etag(self):
+        response = HttpResponse(self.body)
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.respond(response, 'gzip')['ETag'], 'W/"abc"')
+
+
+class CompressedPagesTests(TestCase):
+    def test_home_page_gzipped(self):
+        response = self.client.get(reverse('home'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'boardhub.css?v=', gzip.decompress(response.content))
@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import revisions
+from ..models import Board, Post, PostRevision, Topic
+
+
+class DeltaTests(SimpleTestCase):
+    def test_round_trip(self):
+        old = 'The quick brown fox jumps over the lazy dog'
+        new = 'The quick red fox leaps over the lazy dog!'
+        self.assertEqual(revisions.apply_delta(old, revisions.make_delta(old, new)), new)
+
+    def test_delta_copies_unchanged_text(self):
+        old = 'x ' * 500
+        delta = revisions.make_delta(old, old + 'y')
+        self.assertEqual(delta, [[0, 1000], 'y'])
+
+    def test_costly_edits_get_no_delta(self):
+        self.assertIsNone(revisions.make_delta('a' * 5000, 'b' + 'a' * 4999))
+        self.assertIsNone(revisions.make_delta('ab ' * 1500, 'b ' + 'ab ' * 1500))
+
+
+class RevisionTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.post = Post.objects.create(message='version 0', topic=self.topic, created_by=self.user)
+        self.edit_url = reverse('edit_post', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk, 'post_pk': self.post.pk})
+        self.history_url = reverse('post_history', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk, 'post_pk': self.post.pk})
+
+    def edit(self, times):
+        for i in range(1, times + 1):
+            old = self.post.message
+            self.post.message = f'version {i}'
+            self.post.save()
+            revisions.record_edit(self.post, old, self.user, timezone.now(), revisions.make_delta(old, self.post.message))
+
+
+class RecordEditTests(RevisionTestCase):
+    def test_edit_view_records_revisions(self):
+        self.client.force_login(self.user)
+        self.client.post(self.edit_url, {'message': 'version 1'})
+        self.assertEqual(list(self.post.revisions.values_list('number', 'is_snapshot')), [(0, True), (1, False)])
+        self.assertEqual(revisions.get_revision_text(self.post, 0), 'version 0')
+        self.assertEqual(revisions.get_revision_text(self.post, 1), 'version 1')
+
+    def test_rewritten_message_stored_whole(self):
+        self.client.force_login(self.user)
+        self.client.post(self.edit_url, {'message': 'something else entirely'})
+        self.assertEqual(list(self.post.revisions.values_list('number', 'is_snapshot')), [(0, True), (1, True)])
+        self.assertEqual(revisions.get_revision_text(self.post, 1), 'something else entirely')
+
+    def test_unchanged_message_records_nothing(self):
+        self.client.force_login(self.user)
+        self.client.post(self.edit_url, {'message': 'version 0'})
+        self.assertFalse(PostRevision.objects.exists())
+
+    def test_periodic_snapshots(self):
+        self.edit(25)
+        snapshots = list(self.post.revisions.filter(is_snapshot=True).values_list('number', flat=True))
+        self.assertEqual(snapshots, [0, 10, 20])
+
+    def test_reconstruction_is_bounded_by_snapshot_interval(self):
+        self.edit(25)
+        with self.assertNumQueries(1):
+            self.assertEqual(revisions.get_revision_text(self.post, 19), 'version 19')
+        self.assertEqual(revisions.get_revision_text(self.post, 20), 'version 20')
+
+
+class PostHistoryViewTests(RevisionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.edit(2)
+
+    def test_author_sees_diffs(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.history_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '+version 2')
+        self.assertContains(response, '-version 1')
+
+    def test_other_users_get_404(self):
+        User.objects.create_user(username='jane', email='jane@doe.com', password='123')
+        self.client.login(username='jane', password='123')
+        self.assertEqual(self.client.get(self.history_url).status_code, 404)
+
+    def test_staff_can_see_history(self):
+        User.objects.create_user(username='mod', email='mod@doe.com', password='123', is_staff=True)
+        self.client.login(username='mod', password='123')
+        self.assertEqual(self.client.get(self.history_url).status_code, 200)
@@ -0,0 +1,166 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import sharding
+from ..models import Board, BoardPlacement, Post, Topic
+
+SHARD = next((alias for alias in settings.DATABASES if alias != 'default'), None)
+
+
+class PlacementTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+
+    def tearDown(self):
+        sharding.forget(self.board.pk)
+
+    def place(self, alias, read_only=False):
+        BoardPlacement.objects.update_or_create(board=self.board, defaults={'alias': alias, 'read_only': read_only})
+        sharding.forget(self.board.pk)
+
+
+class PlacementTests(PlacementTestCase):
+    def test_unplaced_board_lives_on_default(self):
+        self.assertEqual(sharding.db_for_board(self.board.pk), 'default')
+
+    def test_placement_is_cached(self):
+        self.place('shard9')
+        self.assertEqual(sharding.db_for_board(self.board.pk), 'shard9')
+        with self.assertNumQueries(0):
+            self.assertEqual(sharding.db_for_board(self.board.pk), 'shard9')
+
+    def test_read_only_board_refuses_writes(self):
+        self.place('default', read_only=True)
+        self.assertEqual(sharding.db_for_board(self.board.pk), 'default')
+        with self.assertRaises(sharding.BoardReadOnly):
+            sharding.db_for_board(self.board.pk, write=True)
+
+    def test_moving_board_answers_503(self):
+        topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        self.place('default', read_only=True)
+        self.client.force_login(self.user)
+        url = reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': topic.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.post(url, {'message': 'Hello'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+
+class RouterTests(PlacementTestCase):
+    def setUp(self):
+        super().setUp()
+        self.router = sharding.BoardShardRouter()
+        self.place('shard9')
+
+    def test_global_models_stay_on_default(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(Board, instance=self.board), 'default')
+
+    def test_new_topic_goes_to_board_shard(self):
+        topic = Topic(subject='Hello', board=self.board, starter=self.user)
+        self.assertEqual(self.router.db_for_write(Topic, instance=topic), 'shard9')
+
+    def test_related_manager_of_board(self):
+        self.assertEqual(self.router.db_for_read(Topic, instance=self.board), 'shard9')
+
+    def test_new_post_follows_its_topic(self):
+        topic = Topic(subject='Hello', board=self.board, starter=self.user)
+        topic._state.db = 'shard9'
+        post = Post(message='Hello', topic=topic, created_by=self.user)
+        self.assertEqual(self.router.db_for_write(Post, instance=post), 'shard9')
+
+
+class NextIdTests(TestCase):
+    def test_ids_continue_above_existing_rows(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', password='123')
+        first = Topic.objects.create(subject='Hello', board=board, starter=user)
+        self.assertEqual(sharding.next_id(Topic), first.pk + 1)
+        self.assertEqual(Topic.objects.create(subject='Again', board=board, starter=user).pk, first.pk + 2)
+
+    def test_migrate_moves_sequence_above_rows(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', password='123')
+        Topic.objects.create(pk=1000, subject='Imported', board=board, starter=user)
+        sharding.seed_id_sequences(using='default')
+        self.assertEqual(sharding.next_id(Topic), 1001)
+
+
+class MapShardsTests(SimpleTestCase):
+    def test_results_per_shard(self):
+        result = sharding.map_shards(lambda alias, items: sum(items), {'default': [1, 2]})
+        self.assertEqual(result, {'default': 3})
+
+
+@skipUnless(SHARD, 'needs a second database, set SHARD_DATABASE_URLS')
+class MoveBoardTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.other = Board.objects.create(name='Python', description='Python board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.user)
+        self.topic.views.add(self.user)
+        Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=self.user)
+        Post.objects.create(message='Dolor sit amet', topic=self.topic, created_by=self.user)
+        call_command('move_board', self.board.pk, SHARD, '--wait', '0', stdout=StringIO())
+
+    def tearDown(self):
+        sharding.forget(self.board.pk)
+
+    def test_rows_moved(self):
+        self.assertEqual(sharding.db_for_board(self.board.pk), SHARD)
+        self.assertEqual(Post.objects.using(SHARD).count(), 2)
+        self.assertEqual(Topic.views.through.objects.using(SHARD).count(), 1)
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Topic.objects.using('default').exists())
+
+    def test_views_read_and_write_the_shard(self):
+        self.client.force_login(self.user)
+        topic_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.assertContains(self.client.get(topic_url), 'Dolor sit amet')
+        self.client.post(
+            reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk}),
+            {'message': 'Hello from the shard'},
+        )
+        self.assertTrue(Post.objects.using(SHARD).filter(message='Hello from the shard').exists())
+        new_topic_url = reverse('new_topic', kwargs={'pk': self.board.pk})
+        self.client.post(new_topic_url, {'subject': 'Sharded', 'message': 'Lorem'})
+        self.assertTrue(Topic.objects.using(SHARD).filter(subject='Sharded').exists())
+
+    def test_home_aggregates_every_shard(self):
+        topic = Topic.objects.create(subject='Default topic', board=self.other, starter=self.user)
+        Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        boards = {board.name: board for board in self.client.get(reverse('home')).context['boards']}
+        self.assertEqual((boards['Django'].topics_count, boards['Django'].posts_count), (1, 2))
+        self.assertEqual((boards['Python'].topics_count, boards['Python'].posts_count), (1, 1))
+
+    def test_move_onto_shard_with_rows(self):
+        # the other board lives on the shard already, with topics and posts of its own
+        BoardPlacement.objects.create(board=self.other, alias=SHARD)
+        sharding.forget(self.other.pk)
+        topic = Topic.objects.using(SHARD).create(subject='Shard topic', board=self.other, starter=self.user)
+        topic.views.add(self.user)
+        Post.objects.using(SHARD).create(message='On the shard', topic=topic, created_by=self.user)
+        call_command('move_board', self.board.pk, 'default', '--wait', '0', stdout=StringIO())
+        moved = Topic.objects.create(subject='Default again', board=self.board, starter=self.user)
+        self.assertNotIn(moved.pk, {self.topic.pk, topic.pk})
+        call_command('move_board', self.other.pk, 'default', '--wait', '0', stdout=StringIO())
+        self.assertEqual(Topic.objects.using('default').count(), 3)
+        self.assertEqual(Post.objects.using('default').count(), 3)
+        self.assertEqual(Topic.views.through.objects.using('default').count(), 2)
+        sharding.forget(self.other.pk)
+
+    def test_move_back(self):
+        call_command('move_board', self.board.pk, 'default', '--wait', '0', stdout=StringIO())
+        self.assertEqual(Post.objects.using('default').count(), 2)
+        self.assertFalse(Post.objects.using(SHARD).exists())
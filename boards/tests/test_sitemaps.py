@@ -0,0 +1,89 @@
+import gzip
+import os
+import re
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import deletion, sitemaps
+from ..models import Board, Topic
+
+
+class SitemapTestCase(TestCase):
+    databases = '__all__'
+    def setUp(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        self.user = user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.topics = [
+            Topic.objects.create(subject=f'Topic {i}', board=board, starter=user)
+            for i in range(5)
+        ]
+
+    def topic_url(self, topic):
+        return reverse('topic_posts', kwargs={'pk': topic.board_id, 'topic_pk': topic.pk})
+
+
+class SitemapViewTests(SitemapTestCase):
+    def test_page_lists_topics_with_lastmod(self):
+        response = self.client.get(reverse('sitemap_page', kwargs={'shard': 0, 'after': 0}))
+        content = b''.join(response.streaming_content).decode()
+        topic = self.topics[0]
+        self.assertIn(f'<loc>http://testserver{self.topic_url(topic)}</loc>', content)
+        self.assertIn(f'<lastmod>{topic.last_update.isoformat()}</lastmod>', content)
+        self.assertEqual(content.count('<url>'), 5)
+
+    def pages(self):
+        index = b''.join(self.client.get(reverse('sitemap_index')).streaming_content).decode()
+        return [
+            b''.join(self.client.get(location.removeprefix('http://testserver')).streaming_content).decode()
+            for location in re.findall(r'<loc>(.*?)</loc>', index)
+        ]
+
+    def test_pages_split_by_primary_key(self):
+        with mock.patch.object(sitemaps, 'MAX_URLS', 2), mock.patch.object(sitemaps, 'BATCH_SIZE', 1):
+            pages = self.pages()
+        self.assertEqual([page.count('<url>') for page in pages], [2, 2, 1])
+        self.assertIn(self.topic_url(self.topics[-1]), pages[-1])
+
+    def test_sparse_ids_fill_pages(self):
+        # ids are drawn from the sequence of every shard, with gaps between a shard's topics
+        Topic.objects.filter(pk=self.topics[-1].pk).update(id=10 ** 9)
+        with mock.patch.object(sitemaps, 'MAX_URLS', 2):
+            pages = self.pages()
+        self.assertEqual([page.count('<url>') for page in pages], [2, 2, 1])
+
+    def test_topics_of_deleted_boards_left_out(self):
+        board = Board.objects.create(name='Python', description='Python board.')
+        topic = Topic.objects.create(subject='Going away', board=board, starter=self.user)
+        deletion.schedule(board)
+        content = b''.join(self.client.get(reverse('sitemap_page', kwargs={'shard': 0, 'after': 0})).streaming_content).decode()
+        self.assertNotIn(self.topic_url(topic), content)
+        self.assertEqual(content.count('<url>'), 5)
+
+    def test_unknown_shard(self):
+        response = self.client.get(reverse('sitemap_page', kwargs={'shard': 99, 'after': 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+class GenerateSitemapsTests(SitemapTestCase):
+    def test_writes_gzip_files_and_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('generate_sitemaps', directory, '--base-url', 'https://example.com', '--max-urls', '2', stdout=StringIO())
+            self.assertEqual(sorted(os.listdir(directory)), ['sitemap-0.xml.gz', 'sitemap-1.xml.gz', 'sitemap-2.xml.gz', 'sitemap.xml'])
+            with gzip.open(os.path.join(directory, 'sitemap-2.xml.gz'), 'rt') as sitemap:
+                content = sitemap.read()
+            with open(os.path.join(directory, 'sitemap.xml')) as index:
+                self.assertIn('<loc>https://example.com/sitemap-0.xml.gz</loc>', index.read())
+        self.assertIn(f'<loc>https://example.com{self.topic_url(self.topics[-1])}</loc>', content)
+        self.assertTrue(content.endswith('</urlset>\n'))
+
+    def test_removes_files_left_by_a_longer_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('generate_sitemaps', directory, '--max-urls', '1', stdout=StringIO())
+            call_command('generate_sitemaps', directory, '--max-urls', '2', stdout=StringIO())
+            self.assertEqual(sorted(os.listdir(directory)), ['sitemap-0.xml.gz', 'sitemap-1.xml.gz', 'sitemap-2.xml.gz', 'sitemap.xml'])
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import caching, slow_queries
+from ..models import Board, Post, Topic
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_literals_and_lists_folded(self):
+        sql = 'SELECT * FROM "t" WHERE "a" = %s AND "b" IN (%s, %s, %s) AND "c" = \'x\'  LIMIT 21'
+        self.assertEqual(slow_queries.normalize(sql), 'SELECT * FROM "t" WHERE "a" = ? AND "b" IN (...) AND "c" = ? LIMIT ?')
+
+    def test_identifiers_kept(self):
+        self.assertEqual(slow_queries.normalize('SELECT "shard1"."id" FROM "boards_post"'), 'SELECT "shard1"."id" FROM "boards_post"')
+
+
+class SlowQueryLogTests(TestCase):
+    def entries(self, logs):
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def log_everything(self):
+        return self.settings(SLOW_QUERY_THRESHOLD=0)
+
+    def test_query_attributed_to_our_code(self):
+        with self.log_everything(), self.assertLogs('boards.slow_queries') as logs:
+            Board.objects.count()
+        entry, = self.entries(logs)
+        self.assertIn('SELECT COUNT(*)', entry['sql'])
+        self.assertEqual(entry['db'], 'default')
+        self.assertTrue(entry['origin'].startswith('boards/tests/test_slow_queries.py:'))
+        self.assertIsNone(entry['url_name'])
+
+    def test_template_and_url_name(self):
+        caching.get_cache().clear()
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', password='123')
+        topic = Topic.objects.create(subject='Hello', board=board, starter=user)
+        Post.objects.create(message='First', topic=topic, created_by=user)
+        with self.log_everything(), self.assertLogs('boards.slow_queries') as logs:
+            self.client.get(reverse('board_topics', kwargs={'pk': board.pk}))
+        entries = [entry for entry in self.entries(logs) if entry['template']]
+        self.assertTrue(entries)
+        self.assertTrue(all(entry['url_name'] == 'board_topics' for entry in entries))
+        # the topic list query runs when the template loops over the page
+        entry = next(entry for entry in entries if 'FROM "boards_topic"' in entry['sql'])
+        self.assertEqual(entry['template'], 'includes/topic_list.html {% for topic in topics %}')
+        # rendered once the view has returned: the template is the only attribution
+        self.assertTrue(entry['origin'].startswith('boards/tests/'))
+
+
+class SummaryTests(SimpleTestCase):
+    def test_top_offenders_by_total_time(self):
+        lines = [
+            {'duration': 0.2, 'sql': 'SELECT a', 'origin': 'x.py:1 f', 'template': None, 'url_name': 'home'},
+            {'duration': 0.2, 'sql': 'SELECT a', 'origin': 'x.py:1 f', 'template': None, 'url_name': 'trending'},
+            {'duration': 0.3, 'sql': 'SELECT b', 'origin': 'y.py:2 g', 'template': None, 'url_name': 'home'},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.log')
+            with open(path, 'w') as file:
+                file.write('\n'.join(json.dumps(line) for line in lines) + '\n{"cut')
+            out = StringIO()
+            call_command('slow_queries', path, stdout=out)
+        output = out.getvalue()
+        self.assertLess(output.index('SELECT a'), output.index('SELECT b'))
+        self.assertIn('0.400s total       2 queries', output)
+        self.assertIn('on home, trending', output)
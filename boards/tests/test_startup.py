@@ -0,0 +1,34 @@
+from django.test import SimpleTestCase
+
+from .. import startup
+
+
+class StartupImportsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.timings = startup.measure()
+
+    def test_setup_within_budget(self):
+        self.assertLess(self.timings['setup'], startup.SETUP_BUDGET)
+
+    def test_heavy_modules_are_lazy(self):
+        eager = [name for name in startup.LAZY_MODULES if name in self.timings['loaded']]
+        self.assertEqual(eager, [])
+
+    def test_admin_modules_are_loaded(self):
+        self.assertIn('boards.admin', self.timings['loaded'])
+
+
+class ParseImporttimeTests(SimpleTestCase):
+    def test_parse(self):
+        lines = [
+            'import time: self [us] | cumulative | imported package',
+            'import time:       366 |      25047 |   markdown.core',
+            'import time:       221 |      25511 | markdown',
+            '[INFO] not an import line',
+        ]
+        self.assertEqual(startup.parse_importtime(lines), [
+            ('markdown.core', 0.000366, 0.025047, 1),
+            ('markdown', 0.000221, 0.025511, 0),
+        ])
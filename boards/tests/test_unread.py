@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import unread
+from ..models import Board, BoardReadMark, Post, Topic, TopicReadMark
+
+
+class UnreadTestCase(TestCase):
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.author = User.objects.create_user(username='jane', email='jane@doe.com', password='123')
+        self.topic = Topic.objects.create(subject='Hello, world', board=self.board, starter=self.author)
+        self.first = Post.objects.create(message='Lorem ipsum', topic=self.topic, created_by=self.author)
+        self.board_topics_url = reverse('board_topics', kwargs={'pk': self.board.pk})
+        self.topic_posts_url = reverse('topic_posts', kwargs={'pk': self.board.pk, 'topic_pk': self.topic.pk})
+        self.client.force_login(self.user)
+
+    def get_unread(self):
+        response = self.client.get(self.board_topics_url)
+        return response.context['topics'][0].unread
+
+
+class UnreadCountTests(UnreadTestCase):
+    def test_unvisited_topic_is_all_unread(self):
+        self.assertEqual(self.get_unread(), 1)
+
+    def test_visiting_topic_marks_it_read(self):
+        self.client.get(self.topic_posts_url)
+        self.assertEqual(self.get_unread(), 0)
+
+    def test_new_replies_since_last_visit(self):
+        self.client.get(self.topic_posts_url)
+        for _ in range(3):
+            Post.objects.create(message='Reply', topic=self.topic, created_by=self.author)
+        self.assertEqual(self.get_unread(), 3)
+        self.assertContains(self.client.get(self.board_topics_url), '3 new')
+
+    def test_unread_counts_in_one_query(self):
+        for i in range(5):
+            topic = Topic.objects.create(subject=f'Topic {i}', board=self.board, starter=self.author)
+            Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.author)
+        queryset = unread.with_unread_counts(Topic.objects.filter(board=self.board), self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual([topic.unread for topic in queryset], [1] * 6)
+
+
+class MarkTopicReadTests(UnreadTestCase):
+    def test_watermark_only_moves_forward(self):
+        unread.mark_topic_read(self.user, self.topic, 10)
+        unread.mark_topic_read(self.user, self.topic, 5)
+        mark = TopicReadMark.objects.get(user=self.user, topic=self.topic)
+        self.assertEqual(mark.last_read_post_id, 10)
+
+    def test_unchanged_mark_not_written(self):
+        unread.mark_topic_read(self.user, self.topic, self.first.pk)
+        with self.assertNumQueries(2):  # the topic and board marks, no write
+            unread.mark_posts_read(self.user, self.topic, [self.first.pk])
+
+    def test_board_mark_makes_topic_mark_redundant(self):
+        BoardReadMark.objects.create(user=self.user, board=self.board, last_read_post_id=self.first.pk)
+        self.client.get(self.topic_posts_url)
+        self.assertFalse(TopicReadMark.objects.filter(user=self.user).exists())
+
+    def test_posts_on_other_pages_stay_unread(self):
+        replies = [Post.objects.create(message=f'Reply {i}', topic=self.topic, created_by=self.author) for i in range(4)]
+        # the first page shows the topic post and the newest replies
+        self.client.get(self.topic_posts_url)
+        self.assertEqual(self.get_unread(), 4)
+        self.client.get(self.topic_posts_url, {'page': 2})
+        self.assertEqual(TopicReadMark.objects.get(user=self.user).last_read_post_id, replies[1].pk)
+        self.assertEqual(self.get_unread(), 2)
+
+    def test_one_row_per_user_and_topic(self):
+        self.client.get(self.topic_posts_url)
+        self.client.get(self.topic_posts_url)
+        self.assertEqual(TopicReadMark.objects.filter(user=self.user).count(), 1)
+
+
+class MarkBoardReadTests(UnreadTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.get(self.topic_posts_url)
+        Post.objects.create(message='Reply', topic=self.topic, created_by=self.author)
+        self.response = self.client.post(reverse('mark_board_read', kwargs={'pk': self.board.pk}))
+
+    def test_redirection(self):
+        self.assertRedirects(self.response, self.board_topics_url)
+
+    def test_board_is_read(self):
+        self.assertEqual(self.get_unread(), 0)
+
+    def test_single_row_per_board(self):
+        self.assertEqual(BoardReadMark.objects.filter(user=self.user, board=self.board).count(), 1)
+        self.assertFalse(TopicReadMark.objects.filter(user=self.user).exists())
@@ -0,0 +1,63 @@
+import math
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from tasks import queue
+
+from .. import deletion, trending
+from ..models import Board, Post, Topic
+from ..views import TrendingTopicListView
+
+
+class TrendingTopicsTests(TestCase):
+    databases = '__all__'
+    def setUp(self):
+        self.board = Board.objects.create(name='Django', description='Django board.')
+        self.user = User.objects.create_user(username='john', email='john@doe.com', password='123')
+        self.quiet = Topic.objects.create(subject='Quiet topic', board=self.board, starter=self.user)
+        self.busy = Topic.objects.create(subject='Busy topic', board=self.board, starter=self.user)
+        for topic in (self.quiet, self.busy):
+            Post.objects.create(message='Lorem ipsum', topic=topic, created_by=self.user)
+        self.url = reverse('trending')
+
+    def test_status_code(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_url_resolves_trending_view(self):
+        view = resolve('/trending/')
+        self.assertEqual(view.func.view_class, TrendingTopicListView)
+
+    def test_reply_moves_topic_to_top(self):
+        last_update = Topic.objects.get(pk=self.busy.pk).last_update
+        self.client.force_login(self.user)
+        reply_url = reverse('reply_topic', kwargs={'pk': self.board.pk, 'topic_pk': self.busy.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reply_url, {'message': 'Hello, world!'})
+        busy = Topic.objects.get(pk=self.busy.pk)
+        self.assertGreater(busy.last_update, last_update)  # in the request, before any worker ran
+        self.assertEqual(busy.hot_score, 0)
+        for task in queue.claim('w1'):
+            self.assertTrue(queue.run(task))
+        self.assertGreater(Topic.objects.get(pk=self.busy.pk).hot_score, 0)
+        response = self.client.get(self.url)
+        self.assertEqual(list(response.context['topics']), [self.busy, self.quiet])
+
+    def test_reply_scores_more_than_view(self):
+        trending.record_view(self.quiet)
+        trending.record_reply(self.busy)
+        self.assertEqual(list(trending.trending_topics()), [self.busy, self.quiet])
+
+    def test_topics_of_deleted_boards_left_out(self):
+        trending.record_reply(self.busy)
+        deletion.schedule(self.board)
+        self.assertEqual(list(trending.trending_topics()), [])
+
+    def test_event_score_halves_after_half_life(self):
+        now = timezone.now()
+        later = now + timedelta(seconds=trending.HALF_LIFE)
+        self.assertAlmostEqual(trending.event_score(1, later) - trending.event_score(1, now), math.log(2))
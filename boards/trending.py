@@ -0,0 +1,80 @@
+"""
+Trending topics.
+
+Every topic carries a ``hot_score``: the sum of all its activity (replies and
+views), each event weighted by ``exp(DECAY * (t - EPOCH))``.  Because every
+score grows by the same factor as time passes, comparing the stored scores is
+the same as comparing the time-decayed scores "now", so the ranking never needs
+a global recompute.  The score is kept in log space to avoid float overflow,
+and each event is folded in with a single UPDATE:
+
+    hot_score = b + ln(1 + exp(hot_score - b)),  b = ln(weight) + DECAY * (t - EPOCH)
+
+The column is indexed, so the trending page is a cheap index range read.
+"""
+import heapq
+import itertools
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import F, Value, prefetch_related_objects
+from django.db.models.functions import Exp, Greatest, Ln
+from django.utils import timezone
+
+from . import sharding
+from .models import Topic
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = 12 * 60 * 60  # seconds
+DECAY = math.log(2) / HALF_LIFE
+
+REPLY_WEIGHT = 3.0
+VIEW_WEIGHT = 1.0
+
+# the trending page is cached for a short while (see boards/caching.py)
+CACHE_KEY = 'boards:trending'
+CACHE_TTL = 30
+
+
+def event_score(weight, when=None):
+    """Log-space contribution of one event of the given weight at ``when``"""
+    when = when or timezone.now()
+    return math.log(weight) + DECAY * (when - EPOCH).total_seconds()
+
+
+def _add_event(topic, weight, when=None, **extra):
+    b = event_score(weight, when)
+    Topic.objects.using(topic._state.db).filter(pk=topic.pk).update(
+        hot_score=b + Ln(1 + Exp(F('hot_score') - b)),
+        **extra
+    )
+
+
+def record_reply(topic, when=None):
+    """A post was added to the topic at ``when`` (default: now): bump its score and its last_update"""
+    when = when or timezone.now()
+    # replies recorded out of order don't move last_update back
+    _add_event(topic, REPLY_WEIGHT, when, last_update=Greatest(F('last_update'), Value(when)))
+
+
+def score_reply(topic, when):
+    """The score half of record_reply(), for a reply whose request already set last_update"""
+    _add_event(topic, REPLY_WEIGHT, when)
+
+
+def record_view(topic):
+    """A user viewed the topic for the first time"""
+    _add_event(topic, VIEW_WEIGHT)
+
+
+def trending_topics(limit=20):
+    """Top ``limit`` topics site-wide, hottest first: the top of every shard, merged"""
+    deleted = sharding.deleted_board_ids()
+
+    def top(alias, _):
+        return list(Topic.objects.using(alias).exclude(board_id__in=deleted).order_by('-hot_score')[:limit])
+    per_shard = sharding.map_shards(top, dict.fromkeys(sharding.shard_aliases()))
+    topics = heapq.nlargest(limit, itertools.chain(*per_shard.values()), key=lambda topic: topic.hot_score)
+    # boards and users live in the default database, so no select_related()
+    prefetch_related_objects(topics, 'board', 'starter')
+    return topics
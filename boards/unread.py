@@ -0,0 +1,94 @@
+"""
+Unread tracking.
+
+Instead of a row per (user, post) we keep one watermark per (user, topic): the
+highest post id the user has seen.  "Mark board as read" stores a single
+watermark per (user, board) and drops the topic rows it makes redundant.  A
+topic's effective watermark is the larger of the two, and every post above it
+is unread.
+"""
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import sharding
+from .models import BoardReadMark, Post, TopicReadMark
+
+
+def watermark(user, topic):
+    """The user's effective watermark for ``topic``: the larger of its topic and board marks"""
+    db = topic._state.db
+    topic_mark = TopicReadMark.objects.using(db).filter(user=user, topic=topic).values_list('last_read_post_id', flat=True)
+    board_mark = BoardReadMark.objects.using(db).filter(user=user, board_id=topic.board_id).values_list('last_read_post_id', flat=True)
+    return max(topic_mark.first() or 0, board_mark.first() or 0)
+
+
+def mark_topic_read(user, topic, post_id, current=None):
+    """
+    Move the user's watermark for ``topic`` forward to ``post_id``.
+
+    Writes are coalesced: nothing is written unless ``post_id`` is above both
+    the topic and the board mark (``current``, looked up when not given).
+    """
+    if current is None:
+        current = watermark(user, topic)
+    if post_id <= current:
+        return
+    marks = TopicReadMark.objects.using(topic._state.db)
+    advanced = marks.filter(
+        user=user, topic=topic, last_read_post_id__lt=post_id
+    ).update(last_read_post_id=post_id)
+    if not advanced:
+        # No row yet (or a concurrent request moved it further, in which case this is a no-op)
+        marks.bulk_create(
+            [TopicReadMark(user=user, topic=topic, last_read_post_id=post_id)],
+            ignore_conflicts=True,
+        )
+
+
+def mark_posts_read(user, topic, post_ids):
+    """
+    Record that the user has seen the posts ``post_ids`` of ``topic``.
+
+    Pages aren't in id order (edited posts first, then newest), so the
+    watermark only moves over the unread posts that are all on the page: it
+    stops below the first one the user hasn't seen.  Archived threads have no
+    live posts, and nothing unread to mark.
+    """
+    seen = set(post_ids)
+    current = watermark(user, topic)
+    if max(seen, default=0) <= current:
+        return
+    following = Post.objects.using(topic._state.db).filter(topic=topic, pk__gt=current).order_by('pk')
+    last = current
+    for pk in following.values_list('pk', flat=True)[:len(seen) + 1]:
+        if pk not in seen:
+            break
+        last = pk
+    mark_topic_read(user, topic, last, current)
+
+
+def mark_board_read(user, board):
+    """Mark every post currently in ``board`` as read with a single row"""
+    db = sharding.db_for_board(board.pk, write=True)
+    last_post_id = Post.objects.using(db).filter(topic__board=board).aggregate(last=Max('pk'))['last'] or 0
+    BoardReadMark.objects.using(db).update_or_create(
+        user=user, board=board, defaults={'last_read_post_id': last_post_id}
+    )
+    TopicReadMark.objects.using(db).filter(
+        user=user, topic__board=board, last_read_post_id__lte=last_post_id
+    ).delete()
+
+
+def with_unread_counts(queryset, user):
+    """
+    Annotate a Topic queryset with ``unread``, the number of posts above the
+    user's watermark.  The watermarks are correlated subqueries, so a whole
+    page of topics is counted by the list query itself.
+    """
+    topic_mark = TopicReadMark.objects.filter(user=user, topic=OuterRef('pk')).values('last_read_post_id')[:1]
+    board_mark = BoardReadMark.objects.filter(user=user, board=OuterRef('board')).values('last_read_post_id')[:1]
+    watermark = Greatest(
+        Coalesce(Subquery(topic_mark), Value(0)),
+        Coalesce(Subquery(board_mark), Value(0)),
+    )
+    return queryset.annotate(unread=Count('posts', filter=Q(posts__pk__gt=watermark)))
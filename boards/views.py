@@ -1,16 +1,22 @@
 # Create your views here.
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.models import User
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Board, Topic, Post
-from django.db.models import Count
+from .models import REPLY_ORDERING, Board, Topic, Post, set_author_posts_counts
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from .forms import NewTopicForm, PostForm
-from django.contrib.auth.decorators import login_required
-from django.urls import reverse_lazy
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.urls import reverse, reverse_lazy
 from django.views.generic import CreateView, UpdateView, ListView
 from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.cache import patch_cache_control
 from django.core.paginator import Paginator
+from . import archive, board_index, caching, fragments, live, memory_profile, notifications, page_cache, permalinks, sitemaps, revisions, sharding, tasks, trending, unread
 
 #logging system
 import logging
@@ -26,7 +32,58 @@ def test_log(request):
     return HttpResponse("Logging test done! Check your terminal.")
 
 '''
-class BoardlistView(ListView): #home page
+def live_board_db(board_id, write=False):
+    """Database of a board, 404 once the board is marked for deletion"""
+    # boards are in the default database: a topic query on the board's shard can't join them
+    if not Board.objects.filter(pk=board_id).exists():
+        raise Http404("No such board")
+    return sharding.db_for_board(board_id, write=write)
+
+class SharedPageMixin:
+    """
+    Serve GET requests through boards/page_cache.py: the page is rendered once
+    for all readers and its {% hole %} fragments are filled in per request.
+    get_page_data() is stored with the page, get_personal_context(data) runs
+    on every request, hit or miss, for whatever is the reader's own.  The
+    cached copy is shared by every query string that agrees on page_params,
+    and replaced when get_page_version() changes.
+    """
+    page_params = ()
+
+    def get(self, request, *args, **kwargs):
+        key = page_cache.page_key(request, self.get_page_version(), self.page_params)
+        page = page_cache.lookup(key)
+        if page is None:
+            response = super().get(request, *args, **kwargs)
+            page = page_cache.store(key, response.render(), self.get_page_data())
+        return page_cache.respond(request, page, self.get_personal_context(page.data))
+
+    def get_page_version(self):
+        raise NotImplementedError
+
+    def get_context_data(self, **kwargs):
+        kwargs[page_cache.HOLES_VAR] = page_cache.Holes()
+        return super().get_context_data(**kwargs)
+
+    def get_page_data(self):
+        return {}
+
+    def get_personal_context(self, data):
+        return {}
+
+class FragmentMixin:
+    """Render fragment_template_name alone for fragment requests (see boards/fragments.py)"""
+    fragment_template_name = None
+
+    def get(self, request, *args, **kwargs):
+        return fragments.vary(super().get(request, *args, **kwargs))
+
+    def get_template_names(self):
+        if fragments.requested(self.request):
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+class BoardlistView(SharedPageMixin, ListView): #home page
     model=Board
     context_object_name='boards'
     template_name='home.html'
@@ -35,15 +92,33 @@ class BoardlistView(ListView): #home page
         logger.info("home page is viewd by user:%s",request.user)
         return super().get(request,*args, **kwargs)
 
-class TopicListView(ListView):#within each board , what are the topics listed
+    def get_queryset(self):
+        return board_index.boards()
+
+    def get_page_version(self):
+        return board_index.version()
+
+class TrendingTopicListView(ListView): #hottest topics across all boards
+    context_object_name = 'topics'
+    template_name = 'trending.html'
+
+    def get_queryset(self):
+        logger.info("trending topics viewed by user:%s", self.request.user)
+        return caching.get_or_compute(trending.CACHE_KEY, trending.trending_topics, trending.CACHE_TTL)
+
+class TopicListView(FragmentMixin, ListView):#within each board , what are the topics listed
 
     model = Topic
     context_object_name = 'topics'
     template_name = 'topics.html'
+    fragment_template_name = 'includes/topic_list.html'
     paginate_by = 8
 
     def get_context_data(self, **kwargs):
         kwargs['board'] = self.board 
+        # the board header with the Follow button isn't part of the fragment
+        if self.request.user.is_authenticated and not fragments.requested(self.request):
+            kwargs['following'] = notifications.is_subscribed(self.request.user, board=self.board)
         return super().get_context_data(**kwargs)
 
     def get_queryset(self):
@@ -51,18 +126,35 @@ class TopicListView(ListView):#within each board , what are the topics listed
         try:
             self.board = get_object_or_404(Board, pk=board_id)
             logger.info("user %s viewing topics of board id %s",self.request.user,board_id)
-            queryset = self.board.topics.order_by('-last_update').annotate(replies=Count('posts') - 1)
+            # archived topics keep their post count on the archive row
+            views = Topic.views.through.objects.filter(topic=OuterRef('pk')).values('topic').annotate(n=Count('*')).values('n')
+            last_post = Post.objects.filter(topic=OuterRef('pk')).order_by('-created_at').values('pk')[:1]
+            # everything a topic card shows comes with the list query (starters: one more query)
+            queryset = self.board.topics.order_by('-last_update').annotate(
+                replies=Count('posts') + Coalesce(F('archive__post_count'), 0) - 1,
+                views_count=Coalesce(Subquery(views), 0),
+                last_post_at=Max('posts__created_at'),
+                last_post_pk=Subquery(last_post),
+            ).prefetch_related('starter')
+            if self.request.user.is_authenticated:
+                queryset = unread.with_unread_counts(queryset, self.request.user)
             return queryset
         except Exception as e:
             logger.error("error in fetching topisc for the board %s:%s",board_id,e)
             raise
 
-class PostListView(ListView): #innside the topic what are post avail
+class PostListView(FragmentMixin, SharedPageMixin, ListView): #innside the topic what are post avail
 
     model = Post
     context_object_name = 'posts'
     template_name = 'topic_post.html'
+    fragment_template_name = 'includes/reply_list.html'
     paginate_by = 2  # pagination still works
+    page_params = ('page',)
+
+    def get(self, request, *args, **kwargs):
+        logger.info("User %s viewing topic ID %s on board %s", request.user, kwargs.get('topic_pk'), kwargs.get('pk'))
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         # Get the topic
@@ -70,12 +162,19 @@ class PostListView(ListView): #innside the topic what are post avail
         topic_id=self.kwargs.get('topic_pk')
      
         try:
-            self.topic = get_object_or_404(Topic, board__pk=board_id, pk=topic_id)
-            logger.info("User %s viewing topic ID %s on board %s", self.request.user, topic_id, board_id)
+            topics = Topic.objects.using(live_board_db(board_id)).select_related('archive')
+            self.topic = get_object_or_404(topics, board__pk=board_id, pk=topic_id)
+            self.archived = hasattr(self.topic, 'archive')
+            if self.archived:
+                # read-only thread served from the compressed archive
+                self.main_post, *replies = archive.load_posts(self.topic)
+                # same order as the live query below: edited posts first, newest first
+                archive.sort_replies(replies)
+                return replies
             # Separate the first post (main topic post) from replies
-            self.main_post = self.topic.posts.first()
-            replies = self.topic.posts.exclude(id=self.main_post.id).order_by('-updated_at', '-created_at')
-            # updated_at descending, then created_at descending if updated_at is null
+            self.main_post = self.topic.posts.order_by('pk').first()
+            # edited posts first, then newest first (see REPLY_ORDERING)
+            replies = self.topic.posts.exclude(id=self.main_post.id).order_by(*REPLY_ORDERING)
             return replies
         
         except Exception as e:
@@ -87,13 +186,86 @@ class PostListView(ListView): #innside the topic what are post avail
         context = super().get_context_data(**kwargs)
         context['topic'] = self.topic
         context['main_post'] = self.main_post
-
-        if self.request.user.is_authenticated:
-            if not self.topic.views.filter(id=self.request.user.id).exists():
-                self.topic.views.add(self.request.user)
-                logger.debug("User %s marked as viewed for topic %s", self.request.user, self.topic.id)
+        context['archived'] = self.archived
+        posts = [self.main_post, *context['posts']]
+        # one query per page for the authors and their post counts, not one per card
+        prefetch_related_objects(posts, 'created_by')
+        set_author_posts_counts(posts)
+        self.seen = sorted(post.pk for post in posts)
         return context
 
+    def get_page_version(self):
+        # the board's version covers its name in the breadcrumbs and its deletion
+        board, topic = self.kwargs['pk'], self.kwargs['topic_pk']
+        return f"{page_cache.version(f'board:{board}')}.{page_cache.version(f'topic:{topic}')}"
+
+    def get_page_data(self):
+        return {'db': self.topic._state.db, 'topic_pk': self.topic.pk, 'seen': self.seen}
+
+    def get_personal_context(self, data):
+        # view tracking, read marks and the Follow button: the cached page is shared
+        if not self.request.user.is_authenticated:
+            return {}
+        topic = get_object_or_404(Topic.objects.using(data['db']), pk=data['topic_pk'])
+        # ask the through table: topic.views would look for users on the topic's shard
+        viewers = Topic.views.through.objects.using(topic._state.db)
+        if not viewers.filter(topic=topic, user_id=self.request.user.id).exists():
+            topic.views.add(self.request.user)
+            trending.record_view(topic)
+            logger.debug("User %s marked as viewed for topic %s", self.request.user, topic.id)
+        unread.mark_posts_read(self.request.user, topic, data['seen'])
+        if fragments.requested(self.request):
+            return {}
+        return {'following': notifications.is_subscribed(self.request.user, topic=topic)}
+
+async def topic_stream(request, pk, topic_pk):
+    """Server-Sent Events stream of new and edited posts (needs an ASGI server)"""
+    db = await sync_to_async(sharding.db_for_board)(pk)
+    if not await Topic.objects.using(db).filter(board__pk=pk, pk=topic_pk).aexists():
+        raise Http404("No topic matches the given query.")
+    logger.debug("Live updates subscription opened for topic %s", topic_pk)
+    response = StreamingHttpResponse(live.event_stream(live.topic_channel(topic_pk)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+def sitemap_index(request): #lists the sitemap pages of every shard
+    base_url = request.build_absolute_uri('/').rstrip('/')
+    locations = (
+        base_url + reverse('sitemap_page', kwargs={'shard': shard, 'after': after})
+        for shard, after in sitemaps.pages()
+    )
+    response = StreamingHttpResponse(sitemaps.index_lines(locations), content_type='application/xml')
+    patch_cache_control(response, public=True, max_age=sitemaps.MAX_AGE)
+    return response
+
+def sitemap_page(request, shard, after): #topic URLs, streamed straight from the database
+    if shard >= len(sharding.shard_aliases()):
+        raise Http404("No sitemap matches the given query.")
+    logger.debug("Sitemap page after topic %s of shard %s requested", after, shard)
+    base_url = request.build_absolute_uri('/').rstrip('/')
+    response = StreamingHttpResponse(sitemaps.page_lines(shard, after, base_url), content_type='application/xml')
+    patch_cache_control(response, public=True, max_age=sitemaps.MAX_AGE)
+    return response
+
+def post_permalink(request, pk, post_pk): #stable link to a post, whatever page it ends up on
+    db = live_board_db(pk)
+    post = Post.objects.using(db).filter(topic__board__pk=pk, topic__deleted_at__isnull=True, pk=post_pk).first()
+    if post is not None:
+        topic_id = post.topic_id
+        page = permalinks.page_number(post, PostListView.paginate_by)
+    else:
+        topic = archive.find_topic(post_pk, pk, using=db)
+        if topic is None:
+            raise Http404("No post matches the given query.")
+        topic_id = topic.pk
+        page = permalinks.archived_page_number(topic, post_pk, PostListView.paginate_by)
+    url = reverse('topic_posts', kwargs={'pk': pk, 'topic_pk': topic_id})
+    if page > 1:
+        url += f'?page={page}'
+    logger.debug("Permalink of post %s resolved to page %s", post_pk, page)
+    return redirect(f'{url}#post-{post_pk}')
+
 @login_required
 def new_topic(request, pk): #when the user wants to create a new topic
 
@@ -102,6 +274,7 @@ def new_topic(request, pk): #when the user wants to create a new topic
     
 
     if request.method == 'POST':
+        sharding.db_for_board(pk, write=True)  # refuse while the board is being moved
         form = NewTopicForm(request.POST)
         if form.is_valid():
             topic = form.save(commit=False)  # create Topic instance but don't save yet
@@ -110,11 +283,13 @@ def new_topic(request, pk): #when the user wants to create a new topic
             topic.save()  # save Topic
             logger.info("New topic '%s' created by user %s in board %s", topic.subject, request.user, board)
 
-            Post.objects.create(
+            post = Post.objects.using(topic._state.db).create(
                 message=form.cleaned_data.get('message'),  # get Post message
                 topic=topic,
                 created_by=request.user
             )
+            trending.record_reply(topic, post.created_at)
+            notifications.queue_reply(post)
             return redirect('topic_posts', pk=pk, topic_pk=topic.pk) # redirect to the created topic page
         else:
           logger.warning("Invalid topic form submitted by user %s: %s", request.user, form.errors)  
@@ -124,10 +299,35 @@ def new_topic(request, pk): #when the user wants to create a new topic
 
     return render(request, 'new_topic.html', {'board': board, 'form': form})
 
+@login_required
+def mark_board_read(request, pk):
+    board = get_object_or_404(Board, pk=pk)
+    if request.method == 'POST':
+        unread.mark_board_read(request.user, board)
+        logger.info("User %s marked board %s as read", request.user, board)
+    return redirect('board_topics', pk=pk)
+
+@login_required
+def follow_board(request, pk):
+    board = get_object_or_404(Board, pk=pk)
+    if request.method == 'POST':
+        following = notifications.toggle_subscription(request.user, board=board)
+        logger.info("User %s %s board %s", request.user, 'followed' if following else 'unfollowed', board)
+    return redirect('board_topics', pk=pk)
+
+@login_required
+def follow_topic(request, pk, topic_pk):
+    topic = get_object_or_404(Topic.objects.using(sharding.db_for_board(pk)), board__pk=pk, pk=topic_pk)
+    if request.method == 'POST':
+        following = notifications.toggle_subscription(request.user, topic=topic)
+        logger.info("User %s %s topic %s", request.user, 'followed' if following else 'unfollowed', topic)
+    return redirect('topic_posts', pk=pk, topic_pk=topic_pk)
+
 @login_required
 def reply_topic(request, pk, topic_pk):#with each post reply 
 
-    topic = get_object_or_404(Topic, board__pk=pk, pk=topic_pk)
+    db = live_board_db(pk, write=request.method == 'POST')
+    topic = get_object_or_404(Topic.objects.using(db), board__pk=pk, pk=topic_pk)
     logger.info("User %s opened reply form for topic %s", request.user, topic)
     if request.method == 'POST':
         form = PostForm(request.POST)
@@ -135,15 +335,29 @@ def reply_topic(request, pk, topic_pk):#with each post reply
             post = form.save(commit=False)
             post.topic = topic
             post.created_by = request.user
-            post.save()
+            with transaction.atomic(using=db):
+                if archive.restore_topic(topic):
+                    logger.info("Topic %s restored from the archive by a reply", topic.pk)
+                post.save()
+                # feeds, the archiver and board listings go by last_update: it can't wait for a worker
+                Topic.objects.using(db).filter(pk=topic.pk, last_update__lt=post.created_at).update(last_update=post.created_at)
+            # the score's exp/ln update is the costly part of the bump, it runs off the request
+            tasks.record_reply.enqueue(db, topic.pk, post.created_at.isoformat())
+            live.publish_post(post, 'post')
+            notifications.queue_reply(post)
             logger.info("User %s replied to topic %s", request.user, topic)
+            if fragments.requested(request):
+                return fragments.vary(render(request, 'includes/post_card.html', {'post': post}, status=201))
             return redirect('topic_posts', pk=pk, topic_pk=topic_pk)
         else:
             logger.warning("Invalid reply form by %s: %s", request.user, form.errors)
     else:
         logger.debug("Reply page opened by user %s", request.user)
         form = PostForm()
-    return render(request, 'reply_topic.html', {'topic': topic, 'form': form})
+    template_name = 'includes/reply_form.html' if fragments.requested(request) else 'reply_topic.html'
+    # lazy: only evaluated by the full page, with the authors in one query
+    posts = topic.posts.order_by('pk').prefetch_related('created_by')
+    return fragments.vary(render(request, template_name, {'topic': topic, 'form': form, 'posts': posts}))
 
 @method_decorator(login_required, name='dispatch')
 class PostUpdateView(UpdateView): #modifing existing post or reply
@@ -155,7 +369,8 @@ class PostUpdateView(UpdateView): #modifing existing post or reply
 
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        db = sharding.db_for_board(self.kwargs['pk'], write=self.request.method == 'POST')
+        queryset = super().get_queryset().using(db)
         logger.debug("Fetching posts editable by user %s", self.request.user)
         return queryset.filter(created_by=self.request.user)
     
@@ -163,6 +378,39 @@ class PostUpdateView(UpdateView): #modifing existing post or reply
         post=form.save(commit=False)
         post.updated_by=self.request.user
         post.updated_at=timezone.now()
-        post.save()
+        # the diff runs before the transaction, not while it holds the row
+        delta = revisions.make_delta(form.initial['message'], post.message) if form.has_changed() else None
+        with transaction.atomic(using=post._state.db):
+            post.save()
+            if form.has_changed():
+                revisions.record_edit(post, form.initial['message'], self.request.user, post.updated_at, delta)
+        live.publish_post(post, 'edit')
         logger.info("User %s updated post %s", self.request.user, post.id)
-        return redirect("topic_posts",pk=post.topic.board.pk,topic_pk=post.topic.pk)
\ No newline at end of file
+        return redirect("topic_posts",pk=post.topic.board.pk,topic_pk=post.topic.pk)
+
+@login_required
+def post_history(request, pk, topic_pk, post_pk): #edit history of a post, for its author and staff
+    posts = Post.objects.using(sharding.db_for_board(pk)).select_related('topic')
+    post = get_object_or_404(posts, topic__board__pk=pk, topic__pk=topic_pk, pk=post_pk)
+    if not (request.user.is_staff or post.created_by_id == request.user.pk):
+        raise Http404("No post matches the given query.")
+    logger.info("User %s viewing edit history of post %s", request.user, post.pk)
+    return render(request, 'post_history.html', {'post': post, 'entries': revisions.history(post)})
+
+@user_passes_test(lambda user: user.is_active and user.is_staff)
+def memory_profile_view(request): #staff: start, stop and read the memory profile (boards/memory_profile.py)
+    if not settings.MEMORY_PROFILING:
+        raise Http404("Memory profiling is off.")
+    profiler = memory_profile.profiler
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'start':
+            profiler.start()
+        elif action == 'stop':
+            return JsonResponse({'active': False, 'report': profiler.stop()})
+        elif action == 'snapshot':
+            profiler.compare()
+        else:
+            return JsonResponse({'error': 'action must be start, stop or snapshot'}, status=400)
+        logger.info("User %s: memory profiling %s", request.user, action)
+    return JsonResponse({'active': profiler.active, 'report': profiler.report()})
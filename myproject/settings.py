@@ -43,14 +43,20 @@ INSTALLED_APPS = [
     "boards",
     'widget_tweaks',
     "accounts",
+    "tasks",
 ]
 
 MIDDLEWARE = [
+    "boards.middleware.RequestContextMiddleware",
+    "boards.middleware.NPlusOneMiddleware",
+    "boards.middleware.MemoryProfileMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "boards.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "boards.middleware.AdmissionControlMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -61,8 +67,15 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [ os.path.join(BASE_DIR,"templates")],
-        "APP_DIRS": True,
+        "APP_DIRS": False,
         "OPTIONS": {
+            # project templates are minified once when loaded, see boards/template_loaders.py
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    ("boards.template_loaders.MinifyingLoader", ["django.template.loaders.filesystem.Loader"]),
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -85,6 +98,16 @@ DATABASES = {
     )
 }
 
+# Board shards (see boards/sharding.py): extra databases for the topics and posts
+# of the boards placed on them, as comma separated "alias=url" pairs, e.g.
+# SHARD_DATABASE_URLS=shard1=sqlite:////srv/shard1.sqlite3,shard2=sqlite:////srv/shard2.sqlite3
+for shard in config('SHARD_DATABASE_URLS', default='', cast=Csv()):
+    alias, url = shard.split('=', 1)
+    DATABASES[alias] = dj_database_url.parse(url)
+
+BOARD_SHARDS = list(DATABASES)
+DATABASE_ROUTERS = ['boards.sharding.BoardShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,6 +157,36 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Admission control (boards.middleware.AdmissionControlMiddleware)
+# expensive requests (POSTs, list pages past ADMISSION_DEEP_PAGE) allowed to run at once per URL name
+ADMISSION_CONCURRENCY = {'reply_topic': 10, 'new_topic': 10, 'board_topics': 4}
+ADMISSION_DEEP_PAGE = 10
+# per-user POST token buckets: URL name -> (burst, seconds to refill the burst)
+ADMISSION_RATE_LIMITS = {'reply_topic': (10, 60), 'new_topic': (3, 300)}
+ADMISSION_CACHE = None  # cache alias for rate limits shared by workers (atomic counters per window), None keeps buckets in process memory
+
+# cache alias for board/topic figures and the trending page (boards/caching.py)
+BOARDS_CACHE = 'default'
+
+# queries slower than this many seconds go to logs/slow_queries.log (boards/slow_queries.py)
+SLOW_QUERY_THRESHOLD = config('SLOW_QUERY_THRESHOLD', default=0.1, cast=float)
+
+# append /* request_id=..., view=... */ to the statements of requests (boards/sql_comments.py)
+SQL_COMMENTS = config('SQL_COMMENTS', default=True, cast=bool)
+
+# N+1 detection (boards/nplusone.py): 'log' on staging, 'raise' in tests (manage.py test --detect-nplusone)
+NPLUSONE_DETECTION = config('NPLUSONE_DETECTION', default='')
+NPLUSONE_THRESHOLD = 5  # runs of one query shape per request before it is reported
+TEST_RUNNER = 'boards.test_runner.DiscoverRunner'
+
+# background tasks (tasks/queue.py) are run by `manage.py runworker`, which must be running: replies are scored
+# for the trending page from there; without a worker, TASKS_INLINE runs each task in the request after the commit
+TASKS_INLINE = config('TASKS_INLINE', default=False, cast=bool)
+
+# tracemalloc profiling (boards/memory_profile.py), started and stopped by staff at /debug/memory/ or with SIGUSR2
+MEMORY_PROFILING = config('MEMORY_PROFILING', default=False, cast=bool)
+
+
 #for login logout 
 LOGIN_REDIRECT_URL = 'home'      # after login
 LOGOUT_REDIRECT_URL = 'home'     # after logout
@@ -149,6 +202,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # Email subject prefix
 EMAIL_SUBJECT_PREFIX = '[BoardHub] '
 
+# Absolute base for links in emails sent outside a request (reply digests)
+SITE_URL = config('SITE_URL', default='http://localhost:8000')
+
 
 
 #logging sytem
@@ -183,13 +239,22 @@ LOGGING = {
 
     "formatters": {
         "verbose": {
-            "format": "{asctime} [{levelname}] {name} {message}",
+            "format": "{asctime} [{levelname}] [{request_id}] {name} {message}",
             "style": "{",
         },
         "simple": {
             "format": "[{levelname}] {message}",
             "style": "{",
         },
+        "message": {
+            "format": "{message}",
+            "style": "{",
+        },
+    },
+
+    "filters": {
+        # the id of the request being served, also in SQL comments and the X-Request-ID header
+        "request_id": {"()": "boards.log_handlers.RequestIdFilter"},
     },
 
     "handlers": {
@@ -199,8 +264,16 @@ LOGGING = {
             "maxBytes": 5 * 1024 * 1024,  # 5 MB before rotation
             "backupCount": 5,              # keep last 5 log files
             "formatter": "verbose",
+            "filters": ["request_id"],
             "level": "DEBUG",              # write everything from DEBUG and up
         },
+        "slow_queries": {
+            "class": "boards.log_handlers.QueuedFileHandler",  # written by a background thread
+            "filename": os.path.join(BASE_DIR, "logs", "slow_queries.log"),
+            "maxBytes": 5 * 1024 * 1024,
+            "backupCount": 5,
+            "formatter": "message",
+        },
         "console": {
         "class": "logging.StreamHandler",  # sends logs to terminal
         "formatter": "simple",              # use our simple style
@@ -220,6 +293,18 @@ LOGGING = {
             "level": "INFO",
             "propagate": True,
         },
+        # one line per request, read by manage.py log_report (boards/log_analytics.py)
+        "boards.access": {
+            "handlers": ["file"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        # one JSON line per query slower than SLOW_QUERY_THRESHOLD (boards/slow_queries.py)
+        "boards.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "INFO",
+            "propagate": False,
+        },
         # You can also add your own app logger if needed
         "myapp": {
             "handlers": ["file"],
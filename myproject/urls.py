@@ -15,9 +15,9 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin 
+from django.contrib import admin
 from django.urls import path
-from boards import views
+from boards import feeds, views
 from accounts import views as acc_views
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import AuthenticationForm
@@ -26,8 +26,16 @@ from django.contrib.auth.forms import AuthenticationForm
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("",views.BoardlistView.as_view(), name="home"),
+    path("trending/",views.TrendingTopicListView.as_view(),name="trending"),
+    path("sitemap.xml",views.sitemap_index,name="sitemap_index"),
+    path("sitemap-<int:shard>-<int:after>.xml",views.sitemap_page,name="sitemap_page"),
+    path("debug/memory/",views.memory_profile_view,name="memory_profile"),
     path("boards/<int:pk>/",views.TopicListView.as_view(),name="board_topics"),
     path("boards/<int:pk>/new/",views.new_topic,name="new_topic"),
+    path("boards/<int:pk>/mark-read/",views.mark_board_read,name="mark_board_read"),
+    path("boards/<int:pk>/follow/",views.follow_board,name="follow_board"),
+    path("boards/<int:pk>/feed/rss/",feeds.board_rss,name="board_feed_rss"),
+    path("boards/<int:pk>/feed/atom/",feeds.board_atom,name="board_feed_atom"),
     path("signup/",acc_views.signup,name="signup"),
     path('login/',auth_views.LoginView.as_view(template_name='login.html',authentication_form=AuthenticationForm),name='login'),
     path('logout/', acc_views.logout_view, name='logout'), 
@@ -50,9 +58,15 @@ urlpatterns = [
 
     #post
     path('boards/<int:pk>/topics/<int:topic_pk>/', views.PostListView.as_view(), name='topic_posts'),
+    path('boards/<int:pk>/topics/<int:topic_pk>/live/', views.topic_stream, name='topic_stream'),
+    path('boards/<int:pk>/topics/<int:topic_pk>/follow/', views.follow_topic, name='follow_topic'),
+    path('boards/<int:pk>/topics/<int:topic_pk>/feed/rss/', feeds.topic_rss, name='topic_feed_rss'),
+    path('boards/<int:pk>/topics/<int:topic_pk>/feed/atom/', feeds.topic_atom, name='topic_feed_atom'),
     #post-reply
     path('boards/<int:pk>/topics/<int:topic_pk>/reply/', views.reply_topic, name='reply_topic'),
 
     path('boards/<int:pk>/topics/<int:topic_pk>/posts/<int:post_pk>/edit/',views.PostUpdateView.as_view(),name='edit_post'),
+    path('boards/<int:pk>/topics/<int:topic_pk>/posts/<int:post_pk>/history/',views.post_history,name='post_history'),
+    path('boards/<int:pk>/posts/<int:post_pk>/',views.post_permalink,name='post_permalink'),
 
 ]
@@ -0,0 +1,68 @@
+// Pagination without full page loads: fetch the list fragment of the next
+// page (see boards/fragments.py) and swap in the elements with the same ids.
+// Replies are posted the same way and their card is added to the thread.
+(function () {
+  function swap(html) {
+    const template = document.createElement("template");
+    template.innerHTML = html;
+    Array.from(template.content.children).forEach(function (element) {
+      const current = element.id && document.getElementById(element.id);
+      if (current) current.replaceWith(element);
+    });
+  }
+
+  function load(url, push) {
+    return fetch(url, { headers: { "X-Fragment": "1" } }).then(function (response) {
+      if (!response.ok) throw new Error(response.status);
+      return response.text();
+    }).then(function (html) {
+      swap(html);
+      if (push) {
+        // mark the entry we leave too, so going back to it reloads its list
+        if (!history.state) history.replaceState({ fragment: true }, "");
+        history.pushState({ fragment: true }, "", url);
+      }
+    });
+  }
+
+  document.addEventListener("click", function (e) {
+    const link = e.target.closest("#pagination a[href]");
+    if (!link || e.ctrlKey || e.metaKey || e.shiftKey) return;
+    e.preventDefault();
+    load(link.href, true).then(function () {
+      window.scrollTo({ top: 0 });
+    }).catch(function () {
+      window.location = link.href;
+    });
+  });
+
+  document.addEventListener("submit", function (e) {
+    const form = e.target.closest("#reply-form form");
+    const posts = document.getElementById("reply-posts");
+    if (!form || !posts) return;
+    e.preventDefault();
+    fetch(form.action, {
+      method: "POST",
+      body: new FormData(form),
+      headers: { "X-Fragment": "1" },
+    }).then(function (response) {
+      // 201 is the card of the new post, anything else (form errors...) gets the full page
+      if (response.status !== 201) throw new Error(response.status);
+      return response.text();
+    }).then(function (html) {
+      posts.insertAdjacentHTML("beforeend", html);
+      posts.lastElementChild.scrollIntoView({ behavior: "smooth" });
+      form.reset();
+      form.dispatchEvent(new CustomEvent("fragment:posted"));
+    }).catch(function () {
+      form.submit();
+    });
+  });
+
+  window.addEventListener("popstate", function (e) {
+    if (!e.state || !e.state.fragment) return;
+    load(window.location.href, false).catch(function () {
+      window.location.reload();
+    });
+  });
+})();
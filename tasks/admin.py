@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Background tasks with their attempts and timings, read-only"""
+    list_display = ('id', 'name', 'state', 'attempts', 'created_at', 'started_at', 'duration', 'worker')
+    list_filter = ('state', 'name')
+    search_fields = ('name',)
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,49 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.queue import BATCH_SIZE, claim, keep_alive, purge_done, requeue_stale, run, worker_name
+
+
+def _run(task):
+    try:
+        return run(task)
+    finally:
+        # pool threads open their own connections
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks on a pool of threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running, polling for due tasks every INTERVAL seconds once the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        stop = threading.Event()
+        threading.Thread(target=keep_alive, args=(worker, stop), daemon=True).start()
+        try:
+            self.work(worker, options)
+        finally:
+            stop.set()
+
+    def work(self, worker, options):
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            while True:
+                requeue_stale()
+                tasks = claim(worker, options['batch_size'])
+                if tasks:
+                    results = list(executor.map(_run, tasks))
+                    self.stdout.write(f'Ran {len(results)} tasks, {results.count(False)} failed')
+                    continue
+                purge_done()
+                if not options['interval']:
+                    return
+                time.sleep(options['interval'])
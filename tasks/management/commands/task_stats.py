@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from tasks.queue import stats
+
+
+class Command(BaseCommand):
+    help = 'Show queue length, failures and run times of the background tasks, per task'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"task":<50} {"queued":>7} {"running":>7} {"done":>7} {"failed":>7} {"avg s":>8} {"max s":>8} {"max wait":>10}')
+        for row in stats():
+            avg = f'{row["avg_duration"]:.3f}' if row['avg_duration'] is not None else '-'
+            top = f'{row["max_duration"]:.3f}' if row['max_duration'] is not None else '-'
+            wait = f'{row["max_wait"].total_seconds():.1f}s' if row['max_wait'] is not None else '-'
+            self.stdout.write(
+                f'{row["name"]:<50} {row["queued"]:>7} {row["running"]:>7} {row["done"]:>7} {row["failed"]:>7} {avg:>8} {top:>8} {wait:>10}'
+            )
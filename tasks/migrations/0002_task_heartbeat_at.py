@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="heartbeat_at",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """A deferred call of a registered function, run by ``manage.py runworker`` (tasks/queue.py)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATE_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name=models.CharField(max_length=200)
+    args=models.JSONField(default=list)
+    kwargs=models.JSONField(default=dict)
+    state=models.CharField(max_length=10,choices=STATE_CHOICES,default=QUEUED)
+    attempts=models.PositiveIntegerField(default=0)
+    max_attempts=models.PositiveIntegerField(default=3)
+    run_after=models.DateTimeField(default=timezone.now)  # retries wait here
+    created_at=models.DateTimeField(auto_now_add=True)
+    started_at=models.DateTimeField(null=True)
+    heartbeat_at=models.DateTimeField(null=True)  # last sign of life of the worker running it
+    finished_at=models.DateTimeField(null=True)
+    duration=models.FloatField(null=True)  # seconds the last attempt ran
+    worker=models.CharField(max_length=100,blank=True)
+    error=models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # what the workers poll: due tasks of a state, oldest first
+            models.Index(fields=['state', 'run_after'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,172 @@
+"""
+Database-backed task queue.
+
+Functions decorated with ``@task`` (in an app's ``tasks.py``) can be deferred
+with ``func.enqueue(*args, **kwargs)``: the call is written to the Task table
+once the surrounding transaction commits, so a task never runs for a write
+that was rolled back, and survives restarts until a worker has run it.
+Arguments must be JSON-serialisable; pass ids, not model instances.
+
+``manage.py runworker`` claims due tasks in batches and runs them on a thread
+pool.  On databases with ``SELECT ... FOR UPDATE SKIP LOCKED`` concurrent
+workers pick disjoint batches without waiting on each other; elsewhere
+(SQLite) the claiming UPDATE only takes rows still queued, so two workers
+never run the same task either.  A failing task is retried after an
+exponential backoff until ``max_attempts``.  While a worker runs tasks it
+stamps their ``heartbeat_at`` every HEARTBEAT_INTERVAL; a task whose worker
+has been silent for RUNNING_TIMEOUT is taken for the task of a dead worker and
+requeued, however long it legitimately runs.  Every attempt records its
+duration; ``stats()`` sums them up per task name.
+
+Nothing runs the tasks but ``runworker``, so a deployment needs at least one
+running.  Where there is none (development, small setups), TASKS_INLINE runs
+every task in the process that queued it, right after the commit.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 20
+RETRY_DELAY = 10  # seconds before the first retry, doubled at every attempt
+HEARTBEAT_INTERVAL = 30  # seconds
+RUNNING_TIMEOUT = timedelta(minutes=5)  # without a heartbeat
+KEEP_DONE = timedelta(days=7)  # finished tasks kept for stats()
+
+registry = {}
+
+
+def task(func=None, *, max_attempts=3):
+    """Register a function as a task; adds ``func.enqueue(*args, **kwargs)``"""
+    def register(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        registry[name] = func
+        func.enqueue = lambda *args, **kwargs: enqueue(name, args, kwargs, max_attempts=max_attempts)
+        return func
+    return register(func) if func else register
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=3, using=None):
+    """
+    Queue a call of the task ``name`` when the current transaction on
+    ``using`` (default: where the task table lives) commits; at once outside
+    of a transaction.
+    """
+    def create():
+        Task.objects.create(name=name, args=list(args), kwargs=kwargs or {}, max_attempts=max_attempts)
+
+    def run_inline():
+        registry[name](*args, **(kwargs or {}))
+
+    if getattr(settings, 'TASKS_INLINE', False):
+        # robust: a failing task is logged, it doesn't fail the request that committed
+        transaction.on_commit(run_inline, using=using or router.db_for_write(Task), robust=True)
+    else:
+        transaction.on_commit(create, using=using or router.db_for_write(Task))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker, batch_size=BATCH_SIZE):
+    """Mark up to ``batch_size`` due tasks running for ``worker`` and return them"""
+    db = router.db_for_write(Task)
+    now = timezone.now()
+    with transaction.atomic(using=db):
+        due = Task.objects.using(db).filter(state=Task.QUEUED, run_after__lte=now).order_by('run_after', 'pk')
+        if connections[db].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        pks = list(due.values_list('pk', flat=True)[:batch_size])
+        # the state filter keeps the claim exclusive where rows can't be locked
+        Task.objects.using(db).filter(pk__in=pks, state=Task.QUEUED).update(
+            state=Task.RUNNING, worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Task.objects.using(db).filter(pk__in=pks, state=Task.RUNNING, worker=worker, started_at=now))
+
+
+def run(task):
+    """Run a claimed task and record the outcome; returns True when it succeeded"""
+    start = time.perf_counter()
+    try:
+        func = registry[task.name]
+        func(*task.args, **task.kwargs)
+    except Exception:
+        task.duration = time.perf_counter() - start
+        task.error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.state = Task.QUEUED
+            task.run_after = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (task.attempts - 1))
+            logger.warning("Task %s failed (attempt %s), retrying at %s", task, task.attempts, task.run_after)
+        else:
+            task.state = Task.FAILED
+            task.finished_at = timezone.now()
+            logger.error("Task %s failed after %s attempts:\n%s", task, task.attempts, task.error)
+        task.save(update_fields=['state', 'run_after', 'finished_at', 'duration', 'error'])
+        return False
+    task.duration = time.perf_counter() - start
+    task.state = Task.DONE
+    task.finished_at = timezone.now()
+    task.save(update_fields=['state', 'finished_at', 'duration'])
+    logger.info("Task %s done in %.3fs", task, task.duration)
+    return True
+
+
+def heartbeat(worker):
+    """Mark the tasks ``worker`` is running as still alive"""
+    return Task.objects.filter(state=Task.RUNNING, worker=worker).update(heartbeat_at=timezone.now())
+
+
+def keep_alive(worker, stop, interval=HEARTBEAT_INTERVAL):
+    """Beat for ``worker`` every ``interval`` seconds until ``stop`` is set; run it on a thread"""
+    try:
+        while not stop.wait(interval):
+            try:
+                heartbeat(worker)
+            except Exception:
+                logger.exception("Heartbeat of %s failed", worker)
+    finally:
+        connections.close_all()
+
+
+def requeue_stale():
+    """Queue again the tasks of workers that died while running them"""
+    cutoff = timezone.now() - RUNNING_TIMEOUT
+    # tasks claimed before heartbeats existed only have started_at
+    silent = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    stale = Task.objects.filter(silent, state=Task.RUNNING)
+    count = stale.update(state=Task.QUEUED, worker='')
+    if count:
+        logger.warning("Requeued %s tasks left running", count)
+    return count
+
+
+def purge_done():
+    return Task.objects.filter(state=Task.DONE, finished_at__lt=timezone.now() - KEEP_DONE).delete()[0]
+
+
+def stats():
+    """Per task name: counts per state, attempt timings and time spent waiting in the queue"""
+    waited = F('started_at') - F('created_at')
+    return list(
+        Task.objects.values('name').annotate(
+            queued=Count('pk', filter=Q(state=Task.QUEUED)),
+            running=Count('pk', filter=Q(state=Task.RUNNING)),
+            done=Count('pk', filter=Q(state=Task.DONE)),
+            failed=Count('pk', filter=Q(state=Task.FAILED)),
+            avg_duration=Avg('duration'),
+            max_duration=Max('duration'),
+            max_wait=Max(waited, filter=Q(state=Task.DONE)),
+        ).order_by('name')
+    )
@@ -0,0 +1,166 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from boards import tasks, trending
+from boards.models import Board, Post, Topic
+
+from .. import queue
+from ..models import Task
+
+calls = []
+
+
+@queue.task
+def remember(value):
+    calls.append(value)
+
+
+@queue.task(max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+class EnqueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_written_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            remember.enqueue(1)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        task = Task.objects.get()
+        self.assertEqual((task.name, task.args, task.state), (f'{__name__}.remember', [1], Task.QUEUED))
+
+    def test_not_written_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    remember.enqueue(1)
+                    raise ValueError
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_INLINE=True)
+    def test_inline_without_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            remember.enqueue(1)
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+
+class WorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def enqueue(self, func, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            func.enqueue(*args)
+
+    def test_claim_takes_due_tasks_once(self):
+        self.enqueue(remember, 1)
+        self.enqueue(remember, 2)
+        Task.objects.filter(args=[2]).update(run_after=timezone.now() + timedelta(minutes=1))
+        claimed = queue.claim('w1')
+        self.assertEqual([task.args for task in claimed], [[1]])
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(queue.claim('w2'), [])
+
+    def test_run_records_timing(self):
+        self.enqueue(remember, 'a')
+        task, = queue.claim('w1')
+        self.assertTrue(queue.run(task))
+        task.refresh_from_db()
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(task.state, Task.DONE)
+        self.assertIsNotNone(task.duration)
+
+    def test_failure_is_retried_then_failed(self):
+        self.enqueue(explode)
+        task, = queue.claim('w1')
+        self.assertFalse(queue.run(task))
+        task.refresh_from_db()
+        self.assertEqual(task.state, Task.QUEUED)
+        self.assertIn('ValueError: boom', task.error)
+        self.assertGreater(task.run_after, timezone.now())
+        Task.objects.update(run_after=timezone.now())
+        task, = queue.claim('w1')
+        queue.run(task)
+        task.refresh_from_db()
+        self.assertEqual((task.state, task.attempts), (Task.FAILED, 2))
+
+    def test_stale_running_task_requeued(self):
+        self.enqueue(remember, 1)
+        queue.claim('dead')
+        silent_since = timezone.now() - queue.RUNNING_TIMEOUT - timedelta(seconds=1)
+        Task.objects.update(started_at=silent_since, heartbeat_at=silent_since)
+        self.assertEqual(queue.requeue_stale(), 1)
+        self.assertEqual(len(queue.claim('w1')), 1)
+
+    def test_long_task_with_heartbeat_kept(self):
+        self.enqueue(remember, 1)
+        queue.claim('busy')
+        Task.objects.update(started_at=timezone.now() - queue.RUNNING_TIMEOUT * 3)
+        queue.heartbeat('busy')
+        self.assertEqual(queue.requeue_stale(), 0)
+
+    def test_stats(self):
+        self.enqueue(remember, 1)
+        self.enqueue(explode)
+        for task in queue.claim('w1'):
+            queue.run(task)
+        rows = {row['name']: row for row in queue.stats()}
+        self.assertEqual(rows[f'{__name__}.remember']['done'], 1)
+        self.assertEqual(rows[f'{__name__}.explode']['queued'], 1)
+        out = StringIO()
+        call_command('task_stats', stdout=out)
+        self.assertIn(f'{__name__}.remember', out.getvalue())
+
+
+class RunWorkerTests(TransactionTestCase):
+    def test_drains_the_queue_on_threads(self):
+        calls.clear()
+        for i in range(5):
+            remember.enqueue(i)
+        out = StringIO()
+        call_command('runworker', threads=2, batch_size=2, stdout=out)
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertEqual(Task.objects.filter(state=Task.DONE).count(), 5)
+        self.assertIn('Ran 1 tasks, 0 failed', out.getvalue())
+
+
+class ReplyTaskTests(TestCase):
+    def test_reply_bumps_the_topic_in_the_background(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', password='123')
+        topic = Topic.objects.create(subject='Hello', board=board, starter=user)
+        Post.objects.create(message='First', topic=topic, created_by=user)
+        score = Topic.objects.get(pk=topic.pk).hot_score
+        self.client.login(username='john', password='123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('reply_topic', kwargs={'pk': board.pk, 'topic_pk': topic.pk}), {'message': 'Reply'})
+        self.assertEqual(Topic.objects.get(pk=topic.pk).hot_score, score)
+        for task in queue.claim('w1'):
+            self.assertTrue(queue.run(task))
+        self.assertGreater(Topic.objects.get(pk=topic.pk).hot_score, score)
+
+    def test_reply_time_comes_from_the_post(self):
+        board = Board.objects.create(name='Django', description='Django board.')
+        user = User.objects.create_user(username='john', password='123')
+        topic = Topic.objects.create(subject='Hello', board=board, starter=user)
+        post = Post.objects.create(message='Reply', topic=topic, created_by=user)
+        replied_at = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk=post.pk).update(created_at=replied_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.record_reply.enqueue('default', topic.pk, replied_at.isoformat())
+        for task in queue.claim('w1'):
+            self.assertTrue(queue.run(task))
+        expected = trending.event_score(trending.REPLY_WEIGHT, replied_at)
+        self.assertAlmostEqual(Topic.objects.get(pk=topic.pk).hot_score, expected, places=6)